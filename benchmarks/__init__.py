@@ -0,0 +1 @@
+"""Initialization file to treat containing directory as a package"""
@@ -0,0 +1,259 @@
+"""benchmark: time the renaming engine on synthetic folders
+
+Builds folders of empty files (on tmpfs and on disk, at several sizes and
+extension mixes), then times the scan, sort, plan and rename phases on their
+own, reporting files/s per phase and the peak memory of each case.
+
+Every case runs in a fresh interpreter, so peak memory (max RSS) is the
+case's own, and each phase counts its fastest of a few runs to tame noise.
+Save a baseline on a quiet machine, later runs compare against it and exit
+with an error if any phase got slower than the tolerance allows:
+
+    python -m benchmarks.benchmark --save-baseline
+    python -m benchmarks.benchmark --sizes 1000,10000,100000,1000000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional, Sequence
+
+from file_renamer.src.file_renamer import FileRenamer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+BASELINE_PATH = Path(__file__).parent.joinpath("baselines.json")
+PHASES = ("scan", "sort", "plan", "rename")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+TMPFS_DIR = "/dev/shm"
+# Extensions of the files created, cycled through; only .jpg files are renamed
+MIXES = {
+    "jpg": (".jpg",),
+    "mixed": (".jpg", ".png", ".JPG", ".txt", ".tar.gz"),
+}
+
+
+class Case(NamedTuple):
+    """One benchmark: a folder of `size` files with the `mix` extensions"""
+
+    storage: str  # "tmpfs" or "disk"
+    size: int
+    mix: str
+
+    @property
+    def name(self) -> str:
+        """Get name of case, used as key of its baseline"""
+        return f"{self.storage}-{self.size}-{self.mix}"
+
+
+def fill_folder(folder: str, size: int, mix: str) -> None:
+    """Fill a folder with `size` empty files with the extensions of `mix`"""
+    extensions = MIXES[mix]
+    for num in range(size):
+        # Random looking names, so sorting has real work to do
+        name = f"{(num * 7919) % size:x}_{num}{extensions[num % len(extensions)]}"
+        with open(os.path.join(folder, name), "wb"):
+            pass
+
+
+def get_peak_memory() -> Optional[int]:
+    """Get peak memory (max RSS) of this process in bytes, None if unknown"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def time_phases(folder: str) -> tuple[dict[str, float], int]:
+    """Rename jpg files in folder, return seconds per phase and files renamed"""
+    renamer = FileRenamer("bench", "jpg", folder)
+    # The engine's own listing, its stats split it into scan and sort
+    files = renamer.list_relevant_files()
+    seconds = {phase: renamer.stats.seconds[phase] for phase in ("scan", "sort")}
+    start = time.perf_counter()
+    plan = renamer.plan_folder(folder)
+    seconds["plan"] = time.perf_counter() - start
+    start = time.perf_counter()
+    renamer.run_plan(plan)
+    seconds["rename"] = time.perf_counter() - start
+    return seconds, files
+
+
+def run_case(case: Case, parent: str, repeat: int = 1) -> dict[str, object]:
+    """Time the case's phases, keeping the best of `repeat` fresh folders"""
+    best: dict[str, float] = {}
+    files = 0
+    for _ in range(repeat):
+        folder = tempfile.mkdtemp(prefix="file_renamer_bench_", dir=parent)
+        try:
+            fill_folder(folder, case.size, case.mix)
+            seconds, files = time_phases(folder)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        for phase in PHASES:
+            best[phase] = min(best.get(phase, seconds[phase]), seconds[phase])
+    rates = {phase: files / max(best[phase], 1e-9) for phase in PHASES}
+    return {
+        "files": files,
+        "seconds": best,
+        "files_per_s": rates,
+        "peak_memory": get_peak_memory(),
+    }
+
+
+def run_isolated(case: Case, parent: str, repeat: int) -> dict[str, object]:
+    """Run a case in a fresh interpreter, so its peak memory is its own"""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(run_case, (case, parent, repeat))
+
+
+def get_cases(
+    sizes: Sequence[int], mixes: Sequence[str], storages: dict[str, str]
+) -> list[Case]:
+    """Get all combinations of storage, size and mix"""
+    return [
+        Case(storage, size, mix)
+        for storage in storages
+        for size in sizes
+        for mix in mixes
+    ]
+
+
+def get_storages(disk_dir: Optional[str]) -> dict[str, str]:
+    """Get parent folder per storage, skipping tmpfs if not available"""
+    storages = {"disk": disk_dir or tempfile.gettempdir()}
+    if os.path.isdir(TMPFS_DIR) and os.access(TMPFS_DIR, os.W_OK):
+        storages["tmpfs"] = TMPFS_DIR
+    return storages
+
+
+def find_regressions(
+    results: dict[str, dict], baselines: dict[str, dict], tolerance: float
+) -> list[str]:
+    """Describe phases slower (or peak memory higher) than their baseline"""
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            continue
+        for phase in PHASES:
+            rate = result["files_per_s"][phase]
+            baseline_rate = baseline["files_per_s"][phase]
+            if rate < baseline_rate * (1 - tolerance):
+                regressions.append(
+                    f"{name} {phase}: {rate:,.0f} files/s, "
+                    f"baseline {baseline_rate:,.0f} files/s"
+                )
+        memory, baseline_memory = result["peak_memory"], baseline["peak_memory"]
+        if memory and baseline_memory and memory > baseline_memory * (1 + tolerance):
+            regressions.append(
+                f"{name} peak memory: {memory / 2**20:,.0f} MiB, "
+                f"baseline {baseline_memory / 2**20:,.0f} MiB"
+            )
+    return regressions
+
+
+def describe(name: str, result: dict) -> str:
+    """Describe result of a case on one line"""
+    rates = ", ".join(
+        f"{phase} {result['files_per_s'][phase]:,.0f}/s" for phase in PHASES
+    )
+    msg = f"{name}: {rates}"
+    if result["peak_memory"] is not None:
+        msg += f", peak memory {result['peak_memory'] / 2**20:,.0f} MiB"
+    return msg
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the command line argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="benchmark", description="Benchmark renaming synthetic folders."
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help="files per folder, comma separated (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--mixes",
+        default=",".join(MIXES),
+        help="extension mixes, comma separated (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--disk-dir", help="folder on disk to create folders in (default: temp dir)"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="runs per case, the fastest of each phase counts (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--baseline", default=str(BASELINE_PATH), help="baseline file to compare to"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="save the results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=(
+            "allowed slowdown (and memory growth) against the baseline "
+            "(default: %(default)s)"
+        ),
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run benchmarks, return exit code (1 on regressions)"""
+    args = get_parser().parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    mixes = args.mixes.split(",")
+    storages = get_storages(args.disk_dir)
+    results = {}
+    for case in get_cases(sizes, mixes, storages):
+        try:
+            results[case.name] = run_isolated(case, storages[case.storage], args.repeat)
+        except OSError as error:
+            # A small tmpfs runs out of space (or inodes) with big cases
+            print(f"Skipped {case.name}: {error}", file=sys.stderr, flush=True)
+            continue
+        print(describe(case.name, results[case.name]), flush=True)
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baselines = {}
+        if baseline_path.exists():
+            baselines = json.loads(baseline_path.read_text())
+        baselines.update(results)
+        baseline_path.write_text(json.dumps(baselines, indent=2, sort_keys=True))
+        print(f"Saved baseline to {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print("No baseline to compare to, save one with --save-baseline")
+        return 0
+    regressions = find_regressions(
+        results, json.loads(baseline_path.read_text()), args.tolerance
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-"""Run the kivy GUI"""
+"""Run the kivy GUI (or the headless CLI when given command line arguments)"""
 from file_renamer.__main__ import main
 
 if __name__ == "__main__":
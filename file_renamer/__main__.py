@@ -1,12 +1,23 @@
-"""__main__: main module for running file_renamer"""
+"""__main__: main module for running file_renamer
+
+With command line arguments the headless CLI is run, otherwise the Kivy GUI.
+Kivy is only imported when the GUI is actually started.
+"""
+import multiprocessing
 import sys
-from file_renamer.src.gui import FileRenamerApp
 
 is_windows = sys.platform.lower().startswith("win")
 
 
 def main():
-    """Main function for running Kivy GUI"""
+    """Main function for running the CLI (with arguments) or Kivy GUI"""
+    # Frozen apps start pool workers by running this executable again
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        from file_renamer.src.cli import main as cli_main
+
+        sys.exit(cli_main(sys.argv[1:]))
+
     if is_windows:
         # Hide console
         import ctypes
@@ -14,6 +25,12 @@ def main():
         if whnd != 0:
             ctypes.windll.user32.ShowWindow(whnd, 0)
 
+    from file_renamer.src.gui import FileRenamerApp
+
     app = FileRenamerApp()
     app.run()
     sys.exit()
+
+
+if __name__ == "__main__":
+    main()
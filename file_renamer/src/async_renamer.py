@@ -0,0 +1,196 @@
+"""async_renamer: run renames from asyncio code (ingest services, ...)
+
+Blocking calls (scandir, stat, rename) run on one thread pool of max_workers
+threads, shared by every run of an AsyncRenamer, so one event loop can drive
+any number of folder jobs with a bounded number of threads. A run's folders
+are scanned, planned and renamed as separate calls on that pool, instead of
+each recursive run starting a pool of its own. Runs report progress and
+messages through an async iterator of events, and cancelling the task stops
+them between files (see RunControl).
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, NamedTuple, Optional, TypeVar
+
+from file_renamer.src.control import RenameCancelled
+from file_renamer.src.file_renamer import NO_FILES_MESSAGE, FileRenamer
+from file_renamer.src.planner import RenameCollisionError, RenamePlan
+from file_renamer.src.progress import Progress, ProgressSnapshot
+
+# Seconds between progress events
+EVENT_INTERVAL = 0.1
+# Event kinds
+PROGRESS = "progress"
+MESSAGE = "message"
+DONE = "done"
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RenameEvent(NamedTuple):
+    """Something that happened in a run"""
+
+    kind: str  # PROGRESS, MESSAGE or DONE
+    progress: ProgressSnapshot
+    message: str = ""  # MESSAGE events only
+    result: Optional[bool] = None  # DONE events only, True if no errors
+
+
+class AsyncRenamer:
+    """Run renames on an asyncio event loop, blocking calls on a bounded pool
+
+    Use as an async context manager, or call `close` when done.
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, interval: float = EVENT_INTERVAL
+    ) -> None:
+        """Initialize class
+
+        max_workers: max threads making blocking calls, for all runs together
+        interval: seconds between progress events
+        """
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="file_renamer"
+        )
+        self.interval = interval
+
+    async def __aenter__(self) -> "AsyncRenamer":
+        """Use as async context manager"""
+        return self
+
+    async def __aexit__(self, *_exc_info: Any) -> None:
+        """Shut the thread pool down when done"""
+        self.close()
+
+    def close(self) -> None:
+        """Shut the thread pool down (runs wait for their calls, so it's idle)"""
+        self.executor.shutdown()
+
+    def call(self, func: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        """Call func(*args) on the thread pool"""
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def call_all(self, func: Callable[[T], R], items: Iterable[T]) -> list[R]:
+        """Call func on every item on the thread pool, return the results
+
+        Waits for every call before raising the first error, so no call is
+        still running once this returns.
+        """
+        results = await asyncio.gather(
+            *(self.call(func, item) for item in items), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results  # type: ignore[return-value]
+
+    async def rename_files(self, **options: Any) -> AsyncIterator[RenameEvent]:
+        """Rename files as FileRenamer(**options) would, yielding its events
+
+        Yields a PROGRESS event every interval while the progress changed, a
+        MESSAGE event for every message, then one DONE event. Cancelling the
+        task iterating (or closing the iterator) stops the run between files.
+        """
+        progress = Progress()
+        messages: list[str] = []  # appended to from the pool's threads
+        file_renamer = FileRenamer(
+            progress=progress, message=messages.append, **options
+        )
+        run = asyncio.ensure_future(self.run(file_renamer))
+        sent = 0
+        last_progress = (0, 0)
+        try:
+            while True:
+                await asyncio.wait({run}, timeout=self.interval)
+                snapshot = progress.snapshot()
+                while sent < len(messages):
+                    yield RenameEvent(MESSAGE, snapshot, messages[sent])
+                    sent += 1
+                if (snapshot.done, snapshot.total) != last_progress:
+                    last_progress = (snapshot.done, snapshot.total)
+                    yield RenameEvent(PROGRESS, snapshot)
+                if run.done():
+                    break
+            yield RenameEvent(DONE, progress.snapshot(), result=run.result())
+        finally:
+            if not run.done():
+                run.cancel()
+                await asyncio.wait({run})
+
+    async def run(self, file_renamer: FileRenamer) -> bool:
+        """Run file_renamer (like its rename_files), return True if no errors
+
+        If cancelled, file_renamer is stopped between files and waited for
+        before CancelledError is raised, so nothing is renamed after.
+        """
+        task = asyncio.ensure_future(self.run_files(file_renamer))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            file_renamer.control.cancel()
+            await asyncio.wait({task})
+            raise
+
+    async def run_files(self, file_renamer: FileRenamer) -> bool:
+        """Check inputs and rename files of file_renamer"""
+        if await self.call(file_renamer.check_inputs):
+            return False
+        with file_renamer.stats.run():
+            try:
+                return await self.run_folders(file_renamer)
+            except RenameCancelled:
+                file_renamer.report_cancelled()
+                return False
+
+    async def run_folders(self, file_renamer: FileRenamer) -> bool:
+        """Rename files of all folders, every folder a call of its own
+
+        Every folder is planned before any file is renamed, so a collision
+        leaves all folders untouched (as with FileRenamer.rename_folders).
+        """
+        await self.list_folder_tree(file_renamer)
+        if not file_renamer.count_relevant_files():
+            file_renamer.message(NO_FILES_MESSAGE)
+            return True
+        if file_renamer.duplicates:
+            await self.call(file_renamer.remove_duplicates, file_renamer.duplicates)
+        if file_renamer.plan_writer:
+            return await self.call(file_renamer.write_plan, file_renamer.plan_writer)
+        try:
+            plans: list[RenamePlan] = await self.call_all(
+                file_renamer.plan_folder, list(file_renamer.folder_files)
+            )
+            await self.call_all(file_renamer.run_plan, plans)
+        except RenameCollisionError as error:
+            file_renamer.message(str(error))
+            return False
+        return file_renamer.report_done(plans)
+
+    async def list_folder_tree(self, file_renamer: FileRenamer) -> None:
+        """List relevant files of the folder (and subfolders if recursive)
+
+        Waits for every listing before raising the first error.
+        """
+        assert file_renamer.folder_loc
+        pending = {self.call(file_renamer.list_folder, str(file_renamer.folder_loc))}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception():
+                    error = error or future.exception()
+                    continue
+                folder, names, subfolders = future.result()
+                if names:
+                    file_renamer.folder_files[folder] = names
+                if not error:
+                    pending.update(
+                        self.call(file_renamer.list_folder, subfolder)
+                        for subfolder in subfolders
+                    )
+        if error:
+            raise error
@@ -0,0 +1,481 @@
+"""cli: headless command line interface for renaming files
+
+Only imports the renaming engine (never Kivy), so it starts quickly and runs
+on machines without a display (cron jobs, CI boxes, ...).
+"""
+
+import argparse
+import io
+import json
+import sys
+import threading
+from typing import Callable, Optional, Sequence
+
+from file_renamer.src.__init__ import __version__
+from file_renamer.src.control import RunControl
+from file_renamer.src.duplicates import (
+    HASH_CACHE_NAME,
+    DuplicateFinder,
+    HashCache,
+    get_cache_dir,
+)
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.jobs import MAX_JOBS, PROGRESS_INTERVAL, JobQueue, read_jobs
+from file_renamer.src.mover import MAX_COPIES
+from file_renamer.src.patterns import FileFilter, PatternError, split_patterns
+from file_renamer.src.plan_writer import PLAN_FORMATS, PlanWriter
+from file_renamer.src.profiling import PROFILE_ENV, RunProfiler, get_profile_dir
+from file_renamer.src.sorting import SORT_ORDERS
+from file_renamer.src.template import DEFAULT_TEMPLATE, NameTemplate, TemplateError
+from file_renamer.src.watcher import SETTLE_SECONDS, FolderWatcher
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the command line argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="file_renamer",
+        description=(
+            "Rename all files with the given extension(s) in a folder with a "
+            "prepend followed by a sequential number "
+            "(cool_pic_1.jpg, cool_pic_2.jpg, ...)."
+        ),
+    )
+    parser.add_argument("folder", nargs="?", help="folder with files to rename")
+    parser.add_argument(
+        "-p",
+        "--prepend",
+        help="prepend renamed files with this (example: cool_pic)",
+    )
+    parser.add_argument(
+        "-e",
+        "--extensions",
+        type=get_patterns,
+        help=(
+            "affected extensions, comma separated (example: jpg,png,tar.gz), "
+            "or globs (IMG_*.jpg), regexes (re:^\\d+\\.png$) and excludes "
+            "(!*_thumb.jpg)"
+        ),
+    )
+    parser.add_argument(
+        "-t",
+        "--template",
+        type=get_template,
+        default=DEFAULT_TEMPLATE,
+        help=(
+            "naming template of new names, with fields {prefix}, {n} (or {n:05}), "
+            "{ext}, {name}, {parent} and {date} (or {date:%%Y-%%m-%%d}) "
+            "(default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "-s",
+        "--sort",
+        choices=SORT_ORDERS,
+        default="name",
+        help=(
+            "order files are numbered in: name, natural (IMG_2 before IMG_10), "
+            "mtime, ctime or size (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "-d",
+        "--skip-duplicates",
+        action="store_true",
+        help="leave files identical to an earlier file out of the numbering",
+    )
+    parser.add_argument(
+        "--hash-cache",
+        metavar="PATH",
+        help=(
+            "file caching digests of compared files for --skip-duplicates "
+            f"(default: {get_cache_dir().joinpath(HASH_CACHE_NAME)})"
+        ),
+    )
+    parser.add_argument(
+        "--move-to",
+        metavar="FOLDER",
+        help=(
+            "move numbered files into FOLDER instead of renaming them in place, "
+            "copying them if it is on another filesystem"
+        ),
+    )
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=MAX_COPIES,
+        help=(
+            "with --move-to, max files copied at the same time to another "
+            "filesystem (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="also rename files in all subfolders, numbering each folder on its own",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="max threads scanning/renaming folders in recursive mode",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help=(
+            "only number files added since the last incremental run, "
+            "continuing from the highest number (keeps an index file in the folder)"
+        ),
+    )
+    parser.add_argument(
+        "--stable",
+        action="store_true",
+        help=(
+            "renumber with the fewest renames: files already numbered up to the "
+            "file count keep their numbers, the rest fill the gaps"
+        ),
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help=(
+            "keep running, numbering files as they arrive (implies --incremental, "
+            "stop with Ctrl+C)"
+        ),
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=SETTLE_SECONDS,
+        help=(
+            "with --watch, seconds a file must stay unchanged before renaming, "
+            "unless its writer is seen closing it (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        metavar="FILE",
+        help=(
+            "rename many folders instead of one, FILE has a folder,prepend,"
+            "extension[,extension...] line per folder"
+        ),
+    )
+    parser.add_argument(
+        "-J",
+        "--max-jobs",
+        type=int,
+        default=MAX_JOBS,
+        help="with --jobs, max folders renamed at the same time (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        metavar="RATE",
+        type=get_rate_limit,
+        help=(
+            "max files renamed (or moved) per second, to keep the disk free for "
+            "other work (for all --jobs together)"
+        ),
+    )
+    parser.add_argument(
+        "--journal",
+        action="store_true",
+        help="keep a journal of renames in the folder to allow --resume and --undo",
+    )
+    parser.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="don't rename anything, write the planned renames instead",
+    )
+    parser.add_argument(
+        "--plan-output",
+        default="-",
+        help="file to write the --dry-run plan to (default: stdout)",
+    )
+    parser.add_argument(
+        "--plan-format",
+        choices=PLAN_FORMATS,
+        help="format of the --dry-run plan (default: csv for .csv files, else jsonl)",
+    )
+    parser.add_argument(
+        "--report",
+        metavar="PATH",
+        help="write timing per phase and system call counts of the run as JSON",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        nargs="?",
+        const=".",
+        help=(
+            "profile the run, writing cProfile stats and a memory report "
+            f"(tracemalloc) to DIR (default: current folder, or ${PROFILE_ENV})"
+        ),
+    )
+    run_mode = parser.add_mutually_exclusive_group()
+    run_mode.add_argument(
+        "--resume",
+        action="store_true",
+        help="finish the renames of an interrupted --journal run",
+    )
+    run_mode.add_argument(
+        "--undo",
+        action="store_true",
+        help="undo the renames of the last --journal run",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="don't print status messages"
+    )
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    return parser
+
+
+def get_template(template: str) -> str:
+    """Check a naming template given on the command line"""
+    try:
+        NameTemplate(template)
+    except TemplateError as error:
+        raise argparse.ArgumentTypeError(str(error)) from None
+    return template
+
+
+def get_patterns(patterns: str) -> str:
+    """Check file patterns given on the command line"""
+    try:
+        FileFilter(split_patterns(patterns))
+    except PatternError as error:
+        raise argparse.ArgumentTypeError(str(error)) from None
+    return patterns
+
+
+def get_rate_limit(rate_limit: str) -> float:
+    """Check a rate limit given on the command line"""
+    try:
+        rate = float(rate_limit)
+    except ValueError:
+        rate = 0.0
+    if not rate > 0:
+        raise argparse.ArgumentTypeError("must be a number of files per second")
+    return rate
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Rename files from the command line, return exit code"""
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.jobs:
+        if args.folder or args.resume or args.undo or args.dry_run or args.watch:
+            parser.error(
+                "--jobs can't be combined with a folder, --resume, --undo, "
+                "--dry-run or --watch"
+            )
+        # Options the jobs aren't run with
+        ignored = [
+            option
+            for option, value in (
+                ("--skip-duplicates", args.skip_duplicates),
+                ("--hash-cache", args.hash_cache),
+                ("--move-to", args.move_to),
+                ("--copies", args.copies != MAX_COPIES),
+                ("--report", args.report),
+            )
+            if value
+        ]
+        if ignored:
+            parser.error(f"--jobs can't be combined with {', '.join(ignored)}")
+        if args.profile:
+            # Jobs run on other threads, which cProfile doesn't see
+            parser.error("--jobs can't be combined with --profile")
+        return run_jobs(args)
+    if args.folder is None:
+        parser.error("the folder argument is required")
+    if not (args.resume or args.undo) and None in (args.prepend, args.extensions):
+        parser.error("-p/--prepend and -e/--extensions are required to rename files")
+    if args.dry_run and (args.resume or args.undo):
+        parser.error("--dry-run can't be combined with --resume or --undo")
+    if args.move_to and (args.resume or args.undo):
+        parser.error("--move-to can't be combined with --resume or --undo")
+    if args.watch and (args.dry_run or args.resume or args.undo):
+        parser.error("--watch can't be combined with --dry-run, --resume or --undo")
+    if args.watch and args.recursive:
+        parser.error("--watch only watches one folder, not --recursive")
+    messages: list[str] = []
+    duplicates = None
+    if args.skip_duplicates:
+        duplicates = DuplicateFinder(HashCache(args.hash_cache))
+    file_renamer = FileRenamer(
+        prepend=args.prepend or "",
+        extensions=args.extensions or "",
+        folder_loc=args.folder,
+        # Watching runs until stopped, show its messages right away
+        message=get_printer(args.quiet) if args.watch else messages.append,
+        recursive=args.recursive,
+        max_workers=args.workers,
+        incremental=args.incremental,
+        stable=args.stable,
+        journal=args.journal,
+        sort_order=args.sort,
+        duplicates=duplicates,
+        template=args.template,
+        destination=args.move_to,
+        max_copies=args.copies,
+        control=RunControl(args.rate_limit),
+    )
+    try:
+        if file_renamer.folder_loc and not file_renamer.folder_loc.is_dir():
+            print(f"Folder not found: {args.folder}", file=sys.stderr)
+            return 1
+        if args.report:
+            try:
+                # Made now (kept if there), so a bad path is found before renaming
+                open(args.report, "a", encoding="utf-8").close()
+            except OSError as error:
+                print(f"Can't write report to {args.report}: {error}", file=sys.stderr)
+                return 1
+        profile_dir = get_profile_dir(args.profile)
+        if profile_dir:
+            profiler = RunProfiler(profile_dir)
+            try:
+                profiler.check_folder()
+            except OSError as error:
+                print(
+                    f"Can't write profiles to {profile_dir}: {error}", file=sys.stderr
+                )
+                return 1
+            with profiler.profile():
+                success = run(file_renamer, args)
+            messages.append(profiler.describe())
+        else:
+            success = run(file_renamer, args)
+    finally:
+        # Also stops the hashing processes after an error or Ctrl+C
+        if duplicates:
+            duplicates.close()
+    if args.report:
+        try:
+            with open(args.report, "w", encoding="utf-8") as report_file:
+                json.dump(file_renamer.stats.report(), report_file, indent=2)
+        except OSError as error:
+            messages.append(f"Couldn't write report: {error}")
+            success = False
+    # Keep stdout clean for a plan written to it
+    plan_to_stdout = args.dry_run and args.plan_output == "-"
+    for msg in messages:
+        if not success:
+            print(msg, file=sys.stderr)
+        elif not args.quiet:
+            print(msg, file=sys.stderr if plan_to_stdout else sys.stdout)
+    return 0 if success else 1
+
+
+def run(file_renamer: FileRenamer, args: argparse.Namespace) -> bool:
+    """Run the rename (or resume, undo, ...) asked for, return True if no errors"""
+    if args.resume:
+        return file_renamer.resume_files()
+    if args.undo:
+        return file_renamer.undo_files()
+    if args.watch:
+        return watch(file_renamer, args.settle)
+    if args.dry_run:
+        return dry_run(file_renamer, args.plan_output, args.plan_format)
+    return file_renamer.rename_files()
+
+
+def run_jobs(args: argparse.Namespace) -> int:
+    """Rename the folders of a jobs file, return exit code"""
+    try:
+        jobs = read_jobs(args.jobs)
+    except (OSError, ValueError) as error:
+        print(f"Can't read jobs: {error}", file=sys.stderr)
+        return 1
+    queue = JobQueue(
+        jobs,
+        max_jobs=args.max_jobs,
+        message=get_printer(args.quiet),
+        recursive=args.recursive,
+        max_workers=args.workers,
+        incremental=args.incremental,
+        stable=args.stable,
+        journal=args.journal,
+        sort_order=args.sort,
+        template=args.template,
+        # Shared, so the rate limit is for all jobs together
+        control=RunControl(args.rate_limit),
+    )
+    if args.quiet:
+        return 0 if queue.run() else 1
+    stop = threading.Event()
+    reporter = threading.Thread(
+        target=print_progress, args=(queue, stop, PROGRESS_INTERVAL), daemon=True
+    )
+    reporter.start()
+    try:
+        success = queue.run()
+    finally:
+        stop.set()
+        reporter.join()
+    return 0 if success else 1
+
+
+def print_progress(queue: JobQueue, stop: threading.Event, interval: float) -> None:
+    """Print progress of the jobs every interval seconds until stop is set"""
+    while not stop.wait(interval):
+        print("\n".join(queue.describe_progress()), flush=True)
+
+
+def get_printer(quiet: bool) -> Callable[[str], None]:
+    """Get message callback printing messages as they come"""
+
+    def print_message(msg: str) -> None:
+        """Print message unless quiet"""
+        if not quiet:
+            print(msg, flush=True)
+
+    return print_message
+
+
+def watch(file_renamer: FileRenamer, settle_seconds: float) -> bool:
+    """Number files as they arrive until interrupted (Ctrl+C)"""
+    watcher = FolderWatcher(file_renamer, settle_seconds=settle_seconds)
+    try:
+        return watcher.watch()
+    except KeyboardInterrupt:
+        return True
+
+
+def dry_run(
+    file_renamer: FileRenamer, plan_output: str, plan_format: Optional[str]
+) -> bool:
+    """Write planned renames to plan_output ("-" for stdout)
+
+    Names that aren't valid in the filesystem encoding are written as their
+    original bytes.
+    """
+    plan_format = plan_format or PlanWriter.get_format(plan_output)
+    if plan_output == "-":
+        stdout = sys.stdout
+        if not isinstance(stdout, io.TextIOWrapper):
+            file_renamer.plan_writer = PlanWriter(stdout, plan_format)
+            return file_renamer.rename_files()
+        errors = stdout.errors
+        stdout.reconfigure(errors="surrogateescape")
+        try:
+            file_renamer.plan_writer = PlanWriter(stdout, plan_format)
+            return file_renamer.rename_files()
+        finally:
+            stdout.reconfigure(errors=errors)
+    with open(
+        plan_output, "w", encoding="utf-8", errors="surrogateescape", newline=""
+    ) as output:
+        file_renamer.plan_writer = PlanWriter(output, plan_format)
+        return file_renamer.rename_files()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""control: pause, resume, cancel and throttle a rename run from another thread
+
+The run checks its RunControl before every file (a couple of flag reads at
+full speed), so pausing or cancelling never leaves a file half done. Renames
+breaking a cycle through a temporary name can be paused but not cancelled
+midway, so no temporary names are left. Before waiting on a pause the run
+checkpoints its progress (journal, index), so a paused run that never gets
+resumed (app closed, machine off) can still be resumed from its journal.
+
+The rate limit spaces files out evenly over all threads of the run, so a
+background run keeps to a known number of renames per second.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+
+class RenameCancelled(Exception):
+    """The run was cancelled before it was done"""
+
+
+class RunControl:
+    """Lets other threads (GUI, asyncio event loop, ...) steer a run"""
+
+    def __init__(
+        self,
+        rate_limit: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize class
+
+        rate_limit: max files renamed (or moved) per second, None for no limit
+        """
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("Rate limit must be more than 0 files per second")
+        self.interval = 1 / rate_limit if rate_limit else 0.0
+        self.clock = clock
+        self.next_turn = clock()
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.running = threading.Event()  # cleared while paused
+        self.running.set()
+
+    @property
+    def paused(self) -> bool:
+        """Whether the run is paused"""
+        return not self.running.is_set()
+
+    def pause(self) -> None:
+        """Hold the run before its next file until resumed"""
+        with self.lock:
+            if not self.cancelled.is_set():
+                self.running.clear()
+
+    def resume(self) -> None:
+        """Continue a paused run"""
+        self.running.set()
+
+    def cancel(self) -> None:
+        """Stop the run before its next file (also if paused)"""
+        with self.lock:
+            self.cancelled.set()
+            self.running.set()
+
+    def check(self) -> None:
+        """Raise RenameCancelled if the run was cancelled"""
+        if self.cancelled.is_set():
+            raise RenameCancelled("Rename run cancelled")
+
+    def wait(self, checkpoint: Optional[Callable[[], None]] = None) -> None:
+        """Wait while paused, then for the next file's turn under the rate limit
+
+        checkpoint: called before waiting on a pause, to save progress
+        Returns right away once cancelled, `check` raises then.
+        """
+        if not self.running.is_set():
+            if checkpoint:
+                checkpoint()
+            self.running.wait()
+        if self.interval:
+            self.wait_turn()
+
+    def wait_turn(self) -> None:
+        """Wait until interval after the previous file's turn"""
+        with self.lock:
+            now = self.clock()
+            # No burst making up for time spent paused, scanning, ...
+            turn = max(now, self.next_turn)
+            self.next_turn = turn + self.interval
+        if turn > now:
+            self.cancelled.wait(turn - now)
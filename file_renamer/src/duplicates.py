@@ -0,0 +1,189 @@
+"""duplicates: find byte-identical files before numbering them
+
+Only files sharing their size with another file can be duplicates, so files
+are grouped by size first and only those are hashed, spread over a process
+pool. Digests are kept in a SQLite cache keyed by (device, inode, size,
+mtime), so unchanged files are never read again on later runs.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+from file_renamer.src.scanner import StrPath
+
+HASH_CHUNK_SIZE = 1 << 20
+HASH_CACHE_NAME = "hashes.sqlite3"
+
+FileKey = tuple[int, int, int, int]  # device, inode, size, mtime (ns)
+
+
+def get_cache_dir() -> Path:
+    """Get the user's cache folder for file_renamer"""
+    home = Path.home()
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or home.joinpath("AppData", "Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or home.joinpath(".cache")
+    return Path(base, "file_renamer")
+
+
+def hash_file(path: str) -> str:
+    """Get BLAKE2b digest of a file's content, reading it in chunks"""
+    digest = hashlib.blake2b()
+    with open(path, "rb") as hashed_file:
+        while chunk := hashed_file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def try_hash_file(path: str) -> Optional[str]:
+    """Get digest of a file, None if it can't be read (gone, no permission)"""
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
+
+
+class HashCache:
+    """Persistent cache of file digests, shared by threads
+
+    A file's key changes whenever it is modified (mtime) or replaced (inode),
+    so a cached digest is never stale.
+    """
+
+    def __init__(self, path: Optional[StrPath] = None) -> None:
+        """Initialize class, opening (or creating) the cache database"""
+        if path is None:
+            path = get_cache_dir().joinpath(HASH_CACHE_NAME)
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS hashes (device INTEGER, inode INTEGER, "
+            "size INTEGER, mtime INTEGER, digest TEXT, "
+            "PRIMARY KEY (device, inode, size, mtime))"
+        )
+        self.lock = threading.Lock()
+
+    def get(self, keys: Iterable[FileKey]) -> dict[FileKey, str]:
+        """Get cached digests of files"""
+        found = {}
+        with self.lock:
+            for key in keys:
+                row = self.connection.execute(
+                    "SELECT digest FROM hashes WHERE device = ? AND inode = ? "
+                    "AND size = ? AND mtime = ?",
+                    key,
+                ).fetchone()
+                if row:
+                    found[key] = row[0]
+        return found
+
+    def put(self, digests: dict[FileKey, str]) -> None:
+        """Cache digests of files"""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                [(*key, digest) for key, digest in digests.items()],
+            )
+
+    def close(self) -> None:
+        """Close the cache database"""
+        self.connection.close()
+
+
+class DuplicateFinder:
+    """Find byte-identical files in folders, hashing on a process pool
+
+    The pool is only started once there is something to hash.
+    """
+
+    def __init__(
+        self, cache: Optional[HashCache] = None, max_workers: Optional[int] = None
+    ) -> None:
+        """Initialize class"""
+        self.cache = cache
+        self.max_workers = max_workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+        self.stat_calls = 0
+        self.hashed = 0  # files read, not found in cache
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """Get the hashing process pool, starting it if needed"""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.max_workers)
+            return self.executor
+
+    def close(self) -> None:
+        """Stop the process pool and close the cache"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.cache is not None:
+            self.cache.close()
+
+    def get_digests(self, paths: dict[FileKey, str]) -> dict[FileKey, str]:
+        """Get digests of files, from the cache or by hashing them
+
+        Files that can't be read are left out.
+        """
+        digests = self.cache.get(paths) if self.cache else {}
+        missing = [key for key in paths if key not in digests]
+        if missing:
+            # Few big chunks per worker, small files cost less than the handoff
+            workers = self.max_workers or os.cpu_count() or 1
+            chunksize = max(1, len(missing) // (4 * workers))
+            hashed = self.get_executor().map(
+                try_hash_file, [paths[key] for key in missing], chunksize=chunksize
+            )
+            new_digests = {
+                key: digest for key, digest in zip(missing, hashed) if digest
+            }
+            self.hashed += len(missing)
+            if self.cache:
+                self.cache.put(new_digests)
+            digests.update(new_digests)
+        return digests
+
+    def find_duplicates(self, folder: str, names: Sequence[str]) -> list[str]:
+        """Get names of files with the same content as an earlier name
+
+        The first file (in the order of names) of identical files is kept. Files
+        gone since the names were listed, or that can't be read, are left out.
+        """
+        by_size: dict[int, list[tuple[str, FileKey]]] = {}
+        for name in names:
+            try:
+                file_stat = os.stat(os.path.join(folder, name))
+            except FileNotFoundError:
+                continue  # gone since the folder was listed, nothing to compare
+            key = (
+                file_stat.st_dev,
+                file_stat.st_ino,
+                file_stat.st_size,
+                file_stat.st_mtime_ns,
+            )
+            by_size.setdefault(file_stat.st_size, []).append((name, key))
+        self.stat_calls += len(names)
+        candidates = [
+            file for files in by_size.values() if len(files) > 1 for file in files
+        ]
+        if not candidates:
+            return []
+        paths = {key: os.path.join(folder, name) for name, key in candidates}
+        digests = self.get_digests(paths)
+        seen: set[tuple[int, str]] = set()
+        duplicates = set()
+        for name, key in candidates:
+            if key not in digests:
+                continue  # can't be read, nothing to compare
+            content = (key[2], digests[key])
+            if content in seen:
+                duplicates.add(name)
+            seen.add(content)
+        return [name for name in names if name in duplicates]
@@ -1,51 +1,162 @@
-"""file_renamer: module for renaming files"""
+"""file_renamer: module for renaming files
+
+The renaming engine is kept free of any GUI imports so it can be driven
+headlessly (see `file_renamer.src.cli`) as well as from the Kivy GUI.
+"""
+
+import errno
+import os
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import Callable, Iterable, Iterator, Optional, Sequence, Union
+
+from file_renamer.src.control import RenameCancelled, RunControl
+from file_renamer.src.duplicates import DuplicateFinder
+from file_renamer.src.index import FolderIndex
+from file_renamer.src.journal import Journal, JournalError, check_renames
+from file_renamer.src.mover import MAX_COPIES, FileMover
+from file_renamer.src.noclobber import NoClobberRenamer
+from file_renamer.src.packed import PackedNames
+from file_renamer.src.patterns import FileFilter, split_patterns
+from file_renamer.src.plan_writer import PlanWriter
+from file_renamer.src.planner import (
+    RenameCollisionError,
+    RenamePlan,
+    is_temp_name,
+    plan_moves,
+    plan_renames,
+)
+from file_renamer.src.progress import Progress
+from file_renamer.src.scanner import RESERVED_PREFIX, scan_files
+from file_renamer.src.sorting import STAT_SORT_ORDERS, get_entry_key
+from file_renamer.src.stats import RunStats
+from file_renamer.src.template import DEFAULT_TEMPLATE, NameTemplate, TemplateError
+
+MessageCallback = Callable[[str], None]
+
+NO_FILES_MESSAGE = "No files with provided file extension(s) found in folder!"
+
+# Filenames are compared case insensitively on Windows, as `Path` sorting does
+SORT_KEY = str.lower if os.name == "nt" else None
 
-if TYPE_CHECKING:  # pragma: no cover
-    from file_renamer.src.main import MainPage
+
+def ignore(_value: object) -> None:
+    """Default callback, does nothing"""
 
 
 class FileRenamer:
     """A class for renaming files"""
 
-    def __init__(self, kivy_gui: "MainPage") -> None:
-        """Initialize class"""
+    def __init__(
+        self,
+        prepend: str,
+        extensions: str,
+        folder_loc: Union[str, Path, None],
+        progress: Optional[Progress] = None,
+        message: MessageCallback = ignore,
+        recursive: bool = False,
+        max_workers: Optional[int] = None,
+        incremental: bool = False,
+        journal: bool = False,
+        plan_writer: Optional[PlanWriter] = None,
+        stats: Optional[RunStats] = None,
+        sort_order: str = "name",
+        duplicates: Optional[DuplicateFinder] = None,
+        template: str = DEFAULT_TEMPLATE,
+        destination: Union[str, Path, None] = None,
+        max_copies: int = MAX_COPIES,
+        control: Optional[RunControl] = None,
+        stable: bool = False,
+    ) -> None:
+        """Initialize class
+
+        prepend: name all renamed files start with (example: cool_pic)
+        extensions: comma separated patterns of files to rename: extensions
+            (example: jpg,png), globs, regexes and excludes (see FileFilter),
+            raises PatternError if unusable
+        folder_loc: folder containing the files to rename
+        progress: updated with the number of files to rename and renamed so
+            far (safe to read from another thread), None to turn progress off
+        message: called with user facing status and error messages
+        recursive: also rename files in all subfolders, numbering each on its own
+        max_workers: max threads scanning/renaming folders in recursive mode
+        incremental: only number files new since the last incremental run,
+            continuing from the highest number given out (see FolderIndex)
+        journal: keep a journal of renames in each folder, so an interrupted
+            run can be resumed and a finished run undone (see Journal)
+        plan_writer: dry run, stream planned renames to this writer instead
+            of renaming anything
+        stats: collects per phase timing and system call counts of the run
+            (see RunStats), a new one if not given
+        sort_order: order files are numbered in, one of SORT_ORDERS
+        duplicates: leave files identical to an earlier file (in sort order)
+            out of the numbering, found with this (see DuplicateFinder)
+        template: naming template of new names (see NameTemplate), raises
+            TemplateError if unusable
+        destination: move numbered files into this folder instead of renaming
+            them in place (subfolders mirrored in recursive mode), copying
+            them if it is on another filesystem (see FileMover)
+        max_copies: max files copied at the same time to another filesystem
+        control: lets other threads pause, resume or cancel the run between
+            files, and limits its renames per second (see RunControl)
+        stable: renumber with the fewest renames, files already numbered
+            within the file count keep their numbers (see get_stable_renames)
+        """
         super().__init__()
 
-        # Attributes pulled/massaged from kivy GUI
-        self.output_row = kivy_gui.row_5
-        self.set_progressbar_max = kivy_gui.set_progressbar_max
-        self.update_progress_bar_val = kivy_gui.update_progress_bar_val
-        self.message = kivy_gui.message
-        self.prepend = (
-            kivy_gui.prepend_filename_input.text.strip()
-            .replace(" ", "_")
-            .replace(".", "")
-        )
-        self.extensions = self.get_extensions(kivy_gui.extensions_input.text.lower())
-        self.folder_loc_msg = kivy_gui.folder_loc_msg
-        self.folder_loc = self.get_path(kivy_gui.folder_loc_label.text)
+        # Callbacks for reporting back to the caller (GUI, CLI, ...)
+        self.progress = progress
+        self.message = message
+        self.control = control or RunControl()
+
+        # Inputs massaged into usable form
+        self.prepend = self.get_prepend(prepend)
+        self.extensions = split_patterns(extensions)
+        self.folder_loc = self.get_path(folder_loc)
+        self.recursive = recursive
+        self.max_workers = max_workers
+        self.incremental = incremental
+        self.stable = stable
+        self.journal = journal
+        self.plan_writer = plan_writer
+        self.stats = stats or RunStats()
+        self.sort_order = sort_order
+        self.entry_key = get_entry_key(sort_order)
+        self.duplicates = duplicates
+        self.duplicate_files = 0
+        self.template = NameTemplate(template)
+        self.destination = self.get_path(destination)
+        self.mover = FileMover(max_copies)
+        self.matcher = FileFilter(self.extensions)
 
         # Attributes calculated by `rename_files()`
-        self.relevant_files: list[Path] = []
+        # Sorted relevant filenames for each folder containing any (packed, a
+        # few bytes per name, see PackedNames)
+        self.folder_files: dict[str, PackedNames] = {}
+        # Updated numbering state of each folder (incremental mode only)
+        self.folder_indexes: dict[str, FolderIndex] = {}
         self.total_relevant_files = 0
-        self.padding = 0
 
     @staticmethod
-    def get_extensions(extensions_string: Optional[str]) -> list[str]:
-        """Get extensions in list from string"""
-        if not extensions_string:
-            return []
-        extensions = extensions_string.strip().split(",")
-        return [f".{ext.strip(' .')}" for ext in extensions]
+    def get_prepend(prepend: str) -> str:
+        """Get filename prepend usable in a filename from string"""
+        return prepend.strip().replace(" ", "_").replace(".", "")
 
-    def get_path(self, dir_path: str) -> Optional[Path]:
-        """Get path to file"""
-        if dir_path == self.folder_loc_msg:
+    @staticmethod
+    def get_path(dir_path: Union[str, Path, None]) -> Optional[Path]:
+        """Get path to folder"""
+        if not dir_path:
             return None
         return Path(dir_path)
 
+    def check_folder(self) -> bool:
+        """Check folder is input properly, Return True if errors found"""
+        if self.folder_loc:
+            return False
+        self.message("Select a folder!")
+        return True
+
     def check_inputs(self) -> bool:
         """Check inputs are input properly, Return True if errors found"""
         errors = []
@@ -55,44 +166,584 @@ class FileRenamer:
             errors.append("Add affected extensions!")
         if not self.folder_loc:
             errors.append("Select a folder!")
+        try:
+            self.template.compile(self.prepend, "folder", 1)
+        except TemplateError as error:
+            errors.append(f"{error}!")
+        if self.destination:
+            errors.extend(self.check_destination())
+        if self.stable and self.incremental:
+            errors.append("Stable renumbering can't be used in incremental runs!")
         if not errors:
             return False
         error_msg = " ".join(errors)
         self.message(error_msg)
         return True
 
-    def list_relevant_files(self) -> int:
-        """Create list of all paths with relevant file extensions in folder"""
+    def check_destination(self) -> list[str]:
+        """Check destination can be moved into, return errors found
+
+        The destination is made if missing, unless only planning (dry run).
+        """
+        if self.incremental or self.journal:
+            return ["Can't move to a destination in incremental or journal runs!"]
+        if not self.folder_loc or not self.destination:
+            return []
+        folder = self.folder_loc.resolve()
+        destination = self.destination.resolve()
+        if destination == folder:
+            return ["Destination must be another folder!"]
+        if self.recursive and folder in destination.parents:
+            return ["Destination can't be inside the folder in recursive mode!"]
+        if self.plan_writer:
+            return []
+        try:
+            destination.mkdir(parents=True, exist_ok=True)
+            if not os.access(destination, os.W_OK | os.X_OK):
+                raise PermissionError(errno.EACCES, os.strerror(errno.EACCES))
+        except OSError as error:
+            return [f"Can't use destination: {error.strerror}!"]
+        return []
+
+    def get_destination(self, folder: str) -> str:
+        """Get folder files of folder move to (the same subfolder in recursive)"""
+        assert self.folder_loc and self.destination
+        subfolder = os.path.relpath(folder, self.folder_loc)
+        return os.path.normpath(os.path.join(self.destination, subfolder))
+
+    def list_folder(self, folder: str) -> tuple[str, PackedNames, list[str]]:
+        """Get folder, its sorted relevant filenames and (if recursive) subfolders"""
+        self.control.check()
+        subfolders: Optional[list[str]] = [] if self.recursive else None
+        entry_key = self.entry_key
+        with self.stats.phase("scan"):
+            entries = scan_files(folder, self.matcher, subfolders)
+            if entry_key is None:
+                names = [entry.name for entry in entries]
+            else:
+                keyed = [(entry_key(entry), entry.name) for entry in entries]
+        self.stats.count("scandir")
+        with self.stats.phase("sort"):
+            if entry_key is None:
+                names.sort(key=SORT_KEY)
+                packed = PackedNames(names)
+            else:
+                keyed.sort()
+                packed = PackedNames(name for _, name in keyed)
+        if self.sort_order in STAT_SORT_ORDERS and os.name != "nt":
+            self.stats.count("stat", len(packed))
+        return folder, packed, subfolders or []
+
+    def list_folder_tree(self, executor: ThreadPoolExecutor) -> None:
+        """List relevant files of all folders in tree, scanning in parallel"""
         assert isinstance(self.folder_loc, Path)
-        for path in self.folder_loc.iterdir():
-            if any(str(path).lower().endswith(ext) for ext in self.extensions):
-                self.relevant_files.append(path)
-        self.relevant_files.sort()
-        self.total_relevant_files = len(self.relevant_files)
-        self.set_progressbar_max(self.total_relevant_files)
+        pending = {executor.submit(self.list_folder, str(self.folder_loc))}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                folder, names, subfolders = future.result()
+                if names:
+                    self.folder_files[folder] = names
+                for subfolder in subfolders:
+                    pending.add(executor.submit(self.list_folder, subfolder))
+
+    def list_relevant_files(self, executor: Optional[ThreadPoolExecutor] = None) -> int:
+        """Find relevant filenames in folder (and subfolders if recursive)"""
+        assert isinstance(self.folder_loc, Path)
+        if executor is None:
+            folder, names, _ = self.list_folder(str(self.folder_loc))
+            if names:
+                self.folder_files[folder] = names
+        else:
+            self.list_folder_tree(executor)
+        return self.count_relevant_files()
+
+    def count_relevant_files(self) -> int:
+        """Count listed relevant files, setting the progress total"""
+        self.total_relevant_files = sum(map(len, self.folder_files.values()))
+        self.stats.files = self.total_relevant_files
+        if self.progress:
+            self.progress.set_total(self.total_relevant_files)
         return self.total_relevant_files
 
-    def get_padding(self) -> None:
-        """Get padding size from total_relevant_files count"""
-        remaining_files = float(self.total_relevant_files)
+    @staticmethod
+    def get_padding(total_files: int) -> int:
+        """Get padding size from total files count"""
+        padding = 0
+        remaining_files = float(total_files)
         while remaining_files >= 1:
-            self.padding += 1
+            padding += 1
             remaining_files /= 10
+        return padding
 
-    def rename_files(self) -> None:
-        """Main function for renaming files"""
-        if self.check_inputs():
+    def get_new_names(
+        self,
+        folder: str,
+        names: Sequence[str],
+        start: int,
+        padding: int,
+        numbers: Optional[Iterable[int]] = None,
+    ) -> Iterator[tuple[str, str]]:
+        """Yield (name, new_name) for filenames of folder, numbering from start
+
+        numbers: number of each file instead, if not numbered in order
+        """
+        format_names = self.template.compile(
+            self.prepend, os.path.basename(folder), padding
+        )
+        if self.template.needs_stat:
+            self.stats.count("stat", len(names))
+        return format_names(folder, names, start, numbers)
+
+    def get_folder_renames(self, folder: str) -> Iterable[tuple[str, str]]:
+        """Get (name, new_name) for the files to number in a folder"""
+        names = self.folder_files[folder]
+        if self.incremental:
+            return self.get_incremental_renames(folder, names)
+        if self.stable:
+            return self.get_stable_renames(folder, names)
+        return self.get_new_names(folder, names, 1, self.get_padding(len(names)))
+
+    def get_stable_renames(
+        self, folder: str, names: Sequence[str]
+    ) -> Iterator[tuple[str, str]]:
+        """Get renames numbering files 1 to their count with the fewest changes
+
+        A file already named with a number from 1 to the file count keeps it,
+        if files share a number the first (in sort order) whose name can stay
+        as is, else the first. The other files get the numbers left over, in
+        sort order. Closing the gaps left by removed files only renames the
+        files numbered past the new count, and the rest keep their names
+        unless the count's digit width changed.
+        """
+        total = len(names)
+        padding = self.get_padding(total)
+        parse_number = self.template.compile_parser(
+            self.prepend, os.path.basename(folder), padding
+        )
+        if self.template.needs_stat:
+            self.stats.count("stat", total)
+        numbers = array("Q", [0]) * total  # 0 for files without a number yet
+        keeps_name = bytearray(total)  # 1 if named with the right padding
+        for position, name in enumerate(names):
+            parsed = parse_number(folder, name)
+            if parsed and parsed[0] <= total:
+                numbers[position], keeps_name[position] = parsed
+        taken = bytearray(total + 1)
+        for keeping_name in (True, False):
+            for position, number in enumerate(numbers):
+                if number and keeps_name[position] == keeping_name:
+                    if taken[number]:
+                        numbers[position] = 0
+                    else:
+                        taken[number] = 1
+        free = (number for number in range(1, total + 1) if not taken[number])
+        for position, number in enumerate(numbers):
+            if not number:
+                numbers[position] = next(free)
+        return self.get_new_names(folder, names, 1, padding, numbers)
+
+    def get_usable_index(
+        self, index: Optional[FolderIndex], file_count: int
+    ) -> FolderIndex:
+        """Get index to continue numbering from, a new one if index is unusable
+
+        An index is unusable if missing or made with another prepend or template.
+        """
+        if (
+            index is None
+            or index.prepend != self.prepend
+            or index.template != self.template.template
+        ):
+            return FolderIndex(
+                self.prepend,
+                padding=self.get_padding(file_count),
+                template=self.template.template,
+            )
+        return index
+
+    def get_incremental_renames(
+        self, folder: str, names: Sequence[str]
+    ) -> list[tuple[str, str]]:
+        """Get renames for only the files new since the folder's last run
+
+        Without a usable index (first run, different prepend or template) all
+        files are numbered as usual and the index is started from scratch. The
+        updated index is kept in `folder_indexes` until the renames are done.
+        """
+        index = self.get_usable_index(FolderIndex.load(folder), len(names))
+        index.keep(names)
+        new_files = [name for name in names if name not in index.names]
+        return self.number_new_files(folder, index, new_files)
+
+    def number_new_files(
+        self, folder: str, index: FolderIndex, new_files: list[str]
+    ) -> list[tuple[str, str]]:
+        """Get renames giving new files the next numbers of the folder's index"""
+        renames = list(
+            self.get_new_names(folder, new_files, index.last_number + 1, index.padding)
+        )
+        index.add([new_name for _, new_name in renames])
+        self.folder_indexes[folder] = index
+        return renames
+
+    def rename_new_files(self, names: list[str]) -> int:
+        """Number files that just arrived in folder_loc, in the order given
+
+        Used by watch mode: only the given names are looked at (no rescan),
+        names not matching the extensions or already numbered are ignored.
+        Return number of files renamed, raises RenameCollisionError without
+        renaming anything if a new name is taken by another file.
+        """
+        assert isinstance(self.folder_loc, Path)
+        folder = str(self.folder_loc)
+        index = self.folder_indexes.get(folder) or FolderIndex.load(folder)
+        index = self.get_usable_index(index, len(names))
+        new_files = [
+            name
+            for name in dict.fromkeys(names)
+            if self.matcher(name)
+            and not name.startswith(RESERVED_PREFIX)
+            and name not in index.names
+        ]
+        if not new_files:
+            return 0
+        renames = self.number_new_files(folder, index, new_files)
+        try:
+            with self.stats.phase("plan"):
+                plan = plan_renames(folder, renames)
+        except RenameCollisionError:
+            # Give the numbers back, the index is only saved by run_plan
+            index.give_back([new_name for _, new_name in renames])
+            raise
+        self.stats.count("stat", plan.stat_calls)
+        self.stats.files += len(new_files)
+        self.run_plan(plan)
+        return len(plan)
+
+    def plan_folder(self, folder: str) -> RenamePlan:
+        """Plan collision-safe renames for a folder"""
+        renames = self.get_folder_renames(folder)
+        with self.stats.phase("plan"):
+            if self.destination:
+                plan = plan_moves(folder, self.get_destination(folder), renames)
+            else:
+                plan = plan_renames(folder, renames)
+        self.stats.count("stat", plan.stat_calls)
+        if self.incremental:
+            # Files numbered by earlier runs are left alone too
+            plan.skipped = len(self.folder_indexes[folder].names) - len(plan)
+        return plan
+
+    def run_plan(self, plan: RenamePlan) -> None:
+        """Rename files in a folder as planned
+
+        A journal left by an earlier run is removed when renaming without a
+        journal, it no longer matches the files.
+        """
+        self.control.check()
+        folder = plan.folder
+        if plan.renames and not self.journal:
+            Journal.discard(folder)
+        if plan.destination:
+            self.run_moves(plan)
             return
-        if not self.list_relevant_files():
-            self.message("No files with provided file extension(s) found in folder!")
+        if plan.skipped and self.progress:
+            self.progress.add(plan.skipped)
+        index = self.folder_indexes.get(folder)
+        if not plan.renames:
+            if index:
+                index.save(folder)
             return
-        self.get_padding()
-        for file_num, path in enumerate(self.relevant_files, start=1):
-            extension = path.suffix
-            directory = path.parent
-            file_num_str = str(file_num).zfill(self.padding)
-            new_name = f"{self.prepend}_{file_num_str}{extension}"
-            new_filepath = Path(directory, new_name)
-            path.rename(new_filepath)
-            self.update_progress_bar_val(file_num)
-        self.message(f"Done! Renamed {self.total_relevant_files:,} files!")
+        journal = None
+        if self.journal:
+            journal = Journal(folder)
+            journal.start(plan.renames)
+            if index:
+                # Saved with the journal, so resuming ends up consistent
+                index.save(folder)
+        try:
+            self.run_renames(folder, plan.renames, journal, index)
+        finally:
+            if index and not journal:
+                # Also when stopped early, numbers not given out are dropped
+                # by the next run (the files are gone)
+                index.save(folder)
+
+    def run_renames(
+        self,
+        folder: str,
+        renames: Sequence[tuple[str, str]],
+        journal: Optional[Journal] = None,
+        index: Optional[FolderIndex] = None,
+    ) -> None:
+        """Rename files in a folder in order, recording them in journal
+
+        Raises RenameCollisionError if a file showed up at a new name since
+        planning, it is never overwritten (see NoClobberRenamer). Raises
+        RenameCancelled if cancelled, though never while a file of a cycle has
+        a temporary name. Progress is checkpointed before pausing: journal
+        committed, index saved.
+        """
+        progress = self.progress
+        check_control = self.control.check
+        wait_control = self.control.wait
+        done = 0
+        in_cycle = False
+        start = self.stats.clock()
+
+        def checkpoint() -> None:
+            """Save progress, the run may never be resumed"""
+            if journal:
+                journal.commit()
+            if index:
+                index.save(folder)
+
+        try:
+            with NoClobberRenamer(folder) as renamer:
+                for name, new_name in renames:
+                    wait_control(checkpoint)
+                    if not in_cycle:
+                        check_control()
+                    try:
+                        renamer.rename(name, new_name)
+                    except FileExistsError:
+                        raise RenameCollisionError(name, new_name) from None
+                    done += 1
+                    if journal:
+                        journal.record()
+                    if is_temp_name(new_name):
+                        in_cycle = True
+                        continue
+                    if in_cycle and is_temp_name(name):
+                        in_cycle = False  # the cycle is closed
+                    if progress:
+                        progress.add()
+            if journal:
+                journal.finish()
+        finally:
+            if journal:
+                journal.close()
+            self.stats.add_time("rename", self.stats.clock() - start)
+            self.stats.count("rename", done)
+
+    def run_moves(self, plan: RenamePlan) -> None:
+        """Move files of a folder into its destination as planned"""
+        assert plan.destination
+        progress = self.progress
+        stats = self.stats
+        control = self.control
+
+        def moved(copied: bool) -> None:
+            """Count a moved file, then wait or stop as the control says"""
+            stats.count("copy" if copied else "rename")
+            if progress:
+                progress.add()
+            control.wait()
+            control.check()
+
+        with stats.phase("rename"):
+            self.mover.move_files(plan.folder, plan.destination, plan.renames, moved)
+
+    def get_journals(self) -> list[Journal]:
+        """Get journals of folder (and subfolders if recursive)"""
+        assert isinstance(self.folder_loc, Path)
+        folders = [str(self.folder_loc)]
+        if self.recursive:
+            folders.extend(
+                os.path.join(parent, name)
+                for parent, subfolders, _ in os.walk(folders[0])
+                for name in subfolders
+            )
+        journals = map(Journal.load, folders)
+        return [journal for journal in journals if journal]
+
+    def resume_files(self) -> bool:
+        """Finish the renames of interrupted journaled runs
+
+        Return True if no errors. Nothing is renamed unless the files of all
+        journals still match them.
+        """
+        if self.check_folder():
+            return False
+        journals = [journal for journal in self.get_journals() if not journal.complete]
+        if not journals:
+            self.message("No interrupted renames found in folder!")
+            return True
+        try:
+            for journal in journals:
+                journal.done = journal.find_done()
+                check_renames(journal.folder, journal.remaining())
+        except (JournalError, OSError) as error:
+            self.message(str(error))
+            return False
+        remaining = [journal.remaining() for journal in journals]
+        total = sum(not is_temp_name(new_name) for r in remaining for _, new_name in r)
+        if self.progress:
+            self.progress.set_total(total)
+        try:
+            for journal, renames in zip(journals, remaining):
+                journal.reopen()
+                journal.commit()
+                self.run_renames(journal.folder, renames, journal)
+        except (RenameCollisionError, OSError) as error:
+            # Changed while resuming, the journals can be resumed again
+            self.message(str(error))
+            return False
+        self.message(f"Done! Resumed {total:,} renames!")
+        return True
+
+    def undo_files(self) -> bool:
+        """Undo the renames of finished journaled runs, return True if no errors
+
+        The undo is journaled as well, so it can be resumed (or undone).
+        Nothing is undone (or journaled) unless the files of all journals
+        still match them.
+        """
+        if self.check_folder():
+            return False
+        journals = self.get_journals()
+        if not journals:
+            self.message("No renames to undo found in folder!")
+            return True
+        if not all(journal.complete for journal in journals):
+            self.message("Resume the interrupted renames before undoing them!")
+            return False
+        undos = [(journal.folder, journal.reversed_renames()) for journal in journals]
+        try:
+            for folder, renames in undos:
+                check_renames(folder, renames)
+        except (JournalError, OSError) as error:
+            self.message(f"Can't undo: {error}")
+            return False
+        total = sum(not is_temp_name(new_name) for _, r in undos for _, new_name in r)
+        if self.progress:
+            self.progress.set_total(total)
+        try:
+            for folder, renames in undos:
+                journal = Journal(folder)
+                journal.start(renames)
+                self.run_renames(folder, renames, journal)
+        except (RenameCollisionError, OSError) as error:
+            # Changed while undoing, the undo can be resumed
+            self.message(str(error))
+            return False
+        self.message(f"Done! Undid {total:,} renames!")
+        return True
+
+    def remove_duplicates(self, duplicates: DuplicateFinder) -> None:
+        """Leave files identical to an earlier file of their folder unnumbered"""
+        with self.stats.phase("dedupe"):
+            for folder, names in self.folder_files.items():
+                found = set(duplicates.find_duplicates(folder, names))
+                if found:
+                    self.folder_files[folder] = PackedNames(
+                        name for name in names if name not in found
+                    )
+                    self.duplicate_files += len(found)
+        self.stats.count("stat", duplicates.stat_calls)
+        if self.progress:
+            self.progress.add(self.duplicate_files)
+
+    def write_plan(self, plan_writer: PlanWriter) -> bool:
+        """Stream planned renames to plan_writer without renaming anything
+
+        Renames are written as they are computed (folders in sorted order)
+        instead of being collected into plans, though the listed filenames of
+        every folder (the whole tree if recursive) are still held in memory.
+        Renames that wouldn't change a name are left out, moves to a
+        destination are written with their new path. Collisions aren't
+        checked, the real run checks them before renaming anything.
+        """
+        progress = self.progress
+        for folder in sorted(self.folder_files):
+            destination = self.get_destination(folder) if self.destination else None
+            for name, new_name in self.get_folder_renames(folder):
+                if destination:
+                    plan_writer.write(folder, name, os.path.join(destination, new_name))
+                elif name != new_name:
+                    plan_writer.write(folder, name, new_name)
+                if progress:
+                    progress.add()
+        verb = "move" if self.destination else "rename"
+        msg = f"Dry run! Would {verb} {plan_writer.count:,} files"
+        if self.recursive:
+            msg += f" in {len(self.folder_files):,} folders"
+        self.message(f"{msg}!")
+        return True
+
+    def rename_files(self) -> bool:
+        """Main function for renaming files, return True if no errors
+
+        Errors of the file system (folder gone, no permission, ...) are
+        reported as messages, files renamed before keep their new names.
+        """
+        if self.check_inputs():
+            return False
+        with self.stats.run():
+            try:
+                if not self.recursive:
+                    return self.rename_folders()
+                with ThreadPoolExecutor(self.max_workers) as executor:
+                    return self.rename_folders(executor)
+            except RenameCancelled:
+                self.report_cancelled()
+                return False
+            except OSError as error:
+                self.message(str(error))
+                return False
+
+    def report_cancelled(self) -> None:
+        """Tell the user the run was cancelled"""
+        verb = "moved" if self.destination else "renamed"
+        self.message(f"Cancelled! Files {verb} so far keep their new names!")
+
+    def rename_folders(self, executor: Optional[ThreadPoolExecutor] = None) -> bool:
+        """Rename relevant files in all folders, in parallel if executor given
+
+        Every folder is planned before any file is renamed, so a collision
+        leaves all folders untouched.
+        """
+        if not self.list_relevant_files(executor):
+            self.message(NO_FILES_MESSAGE)
+            return True
+        if self.duplicates:
+            self.remove_duplicates(self.duplicates)
+        if self.plan_writer:
+            return self.write_plan(self.plan_writer)
+        try:
+            if executor is None:
+                plans = [self.plan_folder(folder) for folder in self.folder_files]
+            else:
+                plans = list(executor.map(self.plan_folder, self.folder_files))
+        except RenameCollisionError as error:
+            self.message(str(error))
+            return False
+        try:
+            if executor is None:
+                for plan in plans:
+                    self.run_plan(plan)
+            else:
+                futures = [executor.submit(self.run_plan, plan) for plan in plans]
+                for future in futures:
+                    future.result()
+        except RenameCollisionError as error:
+            # A file showed up since planning (see run_renames)
+            self.message(str(error))
+            return False
+        return self.report_done(plans)
+
+    def report_done(self, plans: list[RenamePlan]) -> bool:
+        """Tell the user what the run did, return True (no errors)"""
+        renamed = sum(map(len, plans))
+        skipped = sum(plan.skipped for plan in plans)
+        verb = "Moved" if self.destination else "Renamed"
+        msg = f"Done! {verb} {renamed:,} files"
+        if self.recursive:
+            msg += f" in {len(self.folder_files):,} folders"
+        if skipped:
+            msg += f" ({skipped:,} already named correctly)"
+        if self.duplicate_files:
+            msg += f" ({self.duplicate_files:,} duplicates left alone)"
+        self.message(f"{msg}!")
+        return True
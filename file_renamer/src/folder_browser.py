@@ -0,0 +1,176 @@
+"""folder_browser: non-blocking, virtualized Kivy folder browser
+
+Folders are listed on a background thread, so browsing into a huge folder
+never freezes the UI, and only folders are listed by default (no stat per
+entry, `os.scandir` knows the type). Rows are recycled by a RecycleView, so
+only the rows on screen are ever built, however many entries there are.
+"""
+import os
+import threading
+from typing import Optional
+
+from kivy.clock import Clock
+from kivy.lang import Builder
+from kivy.properties import BooleanProperty, ListProperty, StringProperty
+from kivy.uix.label import Label
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+from file_renamer.src.sorting import natural_key
+
+# Rows of the folder browser, folder highlighted when selected
+KV = """
+<FolderRow>:
+    size_hint_y: None
+    height: '30dp'
+    font_size: '16dp'
+    text_size: self.width - dp(20), None
+    halign: 'left'
+    shorten: True
+    canvas.before:
+        Color:
+            rgba: (0.16, 0.6, 0.7, 0.6) if self.selected else (0, 0, 0, 0)
+        Rectangle:
+            pos: self.pos
+            size: self.size
+
+<FolderBrowser>:
+    viewclass: 'FolderRow'
+    bar_width: dp(10)
+    scroll_type: ['bars', 'content']
+    RecycleBoxLayout:
+        default_size: None, dp(30)
+        default_size_hint: 1, None
+        size_hint_y: None
+        height: self.minimum_height
+        orientation: 'vertical'
+"""
+Builder.load_string(KV)
+
+Row = dict[str, object]
+
+
+def get_row(text: str, path: str = "", is_dir: bool = False) -> Row:
+    """Get data of a row, rows without path can't be selected"""
+    return {"text": text, "path": path, "is_dir": is_dir}
+
+
+def list_folder(path: str, show_files: bool = False) -> list[Row]:
+    """List rows of a folder: its parent, then subfolders (and files)
+
+    Hidden entries are left out, the rest is in natural order.
+    """
+    folders, files = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                folders.append(entry.name)
+            elif show_files:
+                files.append(entry.name)
+    folders.sort(key=natural_key)
+    files.sort(key=natural_key)
+    rows = []
+    parent = os.path.dirname(os.path.abspath(path))
+    if parent != os.path.abspath(path):
+        rows.append(get_row(f"..{os.sep}", parent, is_dir=True))
+    rows.extend(
+        get_row(f"{name}{os.sep}", os.path.join(path, name), is_dir=True)
+        for name in folders
+    )
+    rows.extend(get_row(name, os.path.join(path, name)) for name in files)
+    return rows
+
+
+class FolderRow(RecycleDataViewBehavior, Label):
+    """Row of the folder browser, recycled for whichever entry is on screen
+
+    Tap to select, double-tap a folder to browse into it.
+    """
+
+    path = StringProperty()
+    is_dir = BooleanProperty(False)
+    selected = BooleanProperty(False)
+    browser: Optional["FolderBrowser"] = None
+
+    def refresh_view_attrs(self, rv: "FolderBrowser", index: int, data: Row) -> None:
+        """Show a row's data in this (recycled) widget"""
+        self.browser = rv
+        self.selected = bool(data["path"]) and data["path"] in rv.selection
+        super().refresh_view_attrs(rv, index, data)
+
+    def on_touch_down(self, touch) -> bool:
+        """Select the row, or browse into its folder on a double-tap"""
+        if not self.collide_point(*touch.pos) or not self.path or not self.browser:
+            return super().on_touch_down(touch)
+        if touch.is_double_tap and self.is_dir:
+            self.browser.path = self.path
+        else:
+            self.browser.selection = [self.path]
+        return True
+
+
+class FolderBrowser(RecycleView):
+    """Browser for picking a folder, listing folders in the background
+
+    Mirrors the `path` and `selection` properties of Kivy's FileChooser.
+    """
+
+    path = StringProperty()
+    selection = ListProperty()
+    show_files = BooleanProperty(False)
+
+    def __init__(self, **kwargs) -> None:
+        """Initialize class (setting path starts listing it)"""
+        self.generation = 0  # bumped on every listing, drops stale results
+        self.loader = threading.Thread()
+        super().__init__(**kwargs)
+
+    def on_path(self, _instance, _path: str) -> None:
+        """List the new folder"""
+        self.load()
+
+    def on_show_files(self, _instance, _show_files: bool) -> None:
+        """List the folder again, with or without files"""
+        self.load()
+
+    def on_selection(self, _instance, selection: list[str]) -> None:
+        """Highlight selected rows (only the rows on screen exist)"""
+        for row in self.layout_manager.children if self.layout_manager else ():
+            row.selected = bool(row.path) and row.path in selection
+
+    def load(self) -> None:
+        """Start listing path on a background thread"""
+        if not self.path:
+            return
+        self.generation += 1
+        self.data = [get_row("Loading...")]
+        self.loader = threading.Thread(
+            target=self.list_rows,
+            args=(self.path, self.show_files, self.generation),
+            daemon=True,
+        )
+        self.loader.start()
+
+    def list_rows(self, path: str, show_files: bool, generation: int) -> None:
+        """List rows of path (on the loader thread) and show them"""
+        try:
+            rows = list_folder(path, show_files)
+        except OSError as error:
+            rows = [get_row(f"Can't open folder: {error.strerror}")]
+        except Exception as error:
+            # Anything else would leave "Loading..." up for good
+            rows = [get_row(f"Can't list folder: {error!r}")]
+        Clock.schedule_once(lambda _dt: self.show_rows(rows, generation))
+
+    def show_rows(self, rows: list[Row], generation: int) -> None:
+        """Show listed rows (on the main thread), unless browsed elsewhere since"""
+        if generation != self.generation:
+            return
+        self.data = rows
+        self.scroll_y = 1
@@ -8,17 +8,21 @@ from kivy.app import App
 from kivy.clock import Clock
 from kivy.config import Config
 from kivy.core.window import Window
-from kivy.lang import Builder
 from kivy.uix.button import Button
-from kivy.uix.filechooser import FileChooserListView
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.progressbar import ProgressBar
 from kivy.uix.screenmanager import Screen, ScreenManager
 from kivy.uix.textinput import TextInput
+from kivy.uix.togglebutton import ToggleButton
 
 from file_renamer.src.__init__ import __version__
+from file_renamer.src.control import RunControl
 from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.folder_browser import FolderBrowser
+from file_renamer.src.patterns import PatternError
+from file_renamer.src.profiling import RunProfiler, get_profile_dir
+from file_renamer.src.progress import Progress
 
 # ------------------------------------------------------------------------
 # GLOBALS
@@ -29,6 +33,9 @@ VERSION = __version__
 # Paths
 HOME_DIR = Path.home()
 
+# Times per second the progress bar is updated while renaming
+PROGRESS_FPS = 15
+
 # Colors (red, green, blue, transparency) as values between 0 and 1
 TEAL = (41 / 255, 241 / 255, 255 / 255, 1)
 GREEN = (64 / 255, 255 / 255, 118 / 255, 1)
@@ -45,53 +52,6 @@ Config.set("kivy", "window_icon", "new_file.png")
 Window.size = (600, 500)
 Window.minimum_width, Window.minimum_height = (600, 350)
 
-# Kivy file for updating FileChooserListView font size
-KV = """
-#:kivy 2.0.0
-
-# Set variables
-#:set fs '16dp'
-
-[FileListEntry@FloatLayout+TreeViewNode]:
-    locked: False
-    entries: []
-    path: ctx.path
-    # FIXME: is_selected is actually a read_only treeview property. In this
-    # case, however, we're doing this because treeview only has single-selection
-    # hardcoded in it. The fix to this would be to update treeview to allow
-    # multiple selection.
-    is_selected: self.path in ctx.controller().selection
-
-    orientation: 'horizontal'
-    size_hint_y: None
-    height: '60dp' if dp(1) > 1 else '30dp'  # height must be big enough to hold font sized below
-    # Don't allow expansion of the ../ node
-    is_leaf: not ctx.isdir or ctx.name.endswith('..' + ctx.sep) or self.locked
-    on_touch_down: self.collide_point(*args[1].pos) and ctx.controller().entry_touched(self, args[1])
-    on_touch_up: self.collide_point(*args[1].pos) and ctx.controller().entry_released(self, args[1])
-    BoxLayout:
-        pos: root.pos
-        size_hint_x: None
-        width: root.width
-        Label:
-            id: filename
-            font_size: fs  # adjust this font size
-            size_hint_x: None
-            width: root.width - sz.width  # this allows filename Label to fill width less size Label
-            text_size: self.width, None
-            halign: 'left'
-            shorten: True
-            text: ctx.name
-        Label:
-            id: sz
-            font_size: fs  # adjust this font size
-            #text_size: self.width, None
-            size_hint_x: None
-            width: self.texture_size[0] + dp(18)  # this makes the size Label to minimum width
-            text: '{}'.format(ctx.get_nice_size())
-
-"""
-
 
 # ------------------------------------------------------------------------
 # Classes
@@ -108,6 +68,7 @@ class MainPage(GridLayout):
         # cols attr needed for GridLayout class
         self.cols = 1
         self.worker_thread = threading.Thread()
+        self.control = RunControl()
 
         # Row 1: Prepend filename input ----------------------------------
         self.prepend_filename_input = TextInput(multiline=False, font_size=18)
@@ -142,7 +103,7 @@ class MainPage(GridLayout):
         )
         self.folder_loc_btn = Button(text=btn_txt, font_size=18, background_color=TEAL)
         self.folder_loc_btn.bind(on_press=self.pick_folder)
-        self.folder_loc_msg = "<-- Please select"  # Also used in folder_renamer.py
+        self.folder_loc_msg = "<-- Please select"
         self.folder_loc_label = Label(
             text=self.folder_loc_msg, halign="center", valign="middle", font_size=18
         )
@@ -151,18 +112,40 @@ class MainPage(GridLayout):
         self.row_3.add_widget(self.folder_loc_label)
         self.add_widget(self.row_3)
 
-        # Row 4: Submit button -------------------------------------------
+        # Row 4: Submit, pause and cancel buttons ------------------------
         btn_text = (
             "                    Rename Files\n(cool_pic_1.jpg, cool_pic_2.jpg, ...)"
         )
-        self.submit_btn = Button(text=btn_text, font_size=18, background_color=GREEN)
+        self.submit_btn = Button(
+            text=btn_text, font_size=18, background_color=GREEN, size_hint_x=0.6
+        )
         self.submit_btn.bind(on_press=self.rename_files)
-        self.row_4 = GridLayout(cols=1)
+        self.pause_btn = Button(
+            text="Pause",
+            font_size=18,
+            background_color=TEAL,
+            size_hint_x=0.2,
+            disabled=True,
+        )
+        self.pause_btn.bind(on_press=self.toggle_pause)
+        self.cancel_btn = Button(
+            text="Cancel",
+            font_size=18,
+            background_color=RED,
+            size_hint_x=0.2,
+            disabled=True,
+        )
+        self.cancel_btn.bind(on_press=self.cancel_renames)
+        self.row_4 = GridLayout(cols=3)
         self.row_4.add_widget(self.submit_btn)
+        self.row_4.add_widget(self.pause_btn)
+        self.row_4.add_widget(self.cancel_btn)
         self.add_widget(self.row_4)
 
         # Row 5: Output row ----------------------------------------------
+        self.progress = Progress()
         self.progress_bar = ProgressBar()
+        self.progress_label = Label(halign="center", valign="middle", font_size=18)
         self.default_msg = "Fill out the form and hit the green button to rename files!"
         self.msg_label = Label(
             text=self.default_msg, halign="center", valign="middle", font_size=18
@@ -173,17 +156,28 @@ class MainPage(GridLayout):
 
     def reset_progress_bar(self) -> None:
         """Reset progress bar"""
-        self.update_progress_bar_val(0)
+        self.update_progress_bar()
         self.row_5.clear_widgets()
         self.row_5.add_widget(self.progress_bar)
+        self.row_5.add_widget(self.progress_label)
 
-    def set_progressbar_max(self, max_size: int) -> None:
-        """Set progressbar max value"""
-        self.progress_bar.max = max_size
+    def update_progress_bar(self, _dt: float = 0) -> bool:
+        """Update the progress bar from the worker thread's progress
 
-    def update_progress_bar_val(self, value: int) -> None:
-        """Update the progress bar to new value"""
-        self.progress_bar.value = value
+        Scheduled at PROGRESS_FPS while renaming, stops once the worker is done.
+        """
+        snapshot = self.progress.snapshot()
+        self.progress_bar.max = max(snapshot.total, 1)
+        self.progress_bar.value = snapshot.done
+        self.progress_label.text = snapshot.describe()
+        if self.control.paused:
+            self.progress_label.text += " (paused)"
+        if self.worker_thread.is_alive():
+            return True
+        self.submit_btn.disabled = False
+        self.pause_btn.disabled = self.cancel_btn.disabled = True
+        self.pause_btn.text = "Pause"
+        return False
 
     def message(self, msg: str) -> None:
         """Show a message to the output row"""
@@ -191,6 +185,48 @@ class MainPage(GridLayout):
         self.row_5.clear_widgets()
         self.row_5.add_widget(self.msg_label)
 
+    def message_from_thread(self, msg: str) -> None:
+        """Show a message from the worker thread (on the main thread)"""
+        Clock.schedule_once(lambda _dt: self.message(msg))
+
+    def run_file_renamer(self, file_renamer: FileRenamer, messages: list[str]) -> None:
+        """Rename files (on the worker thread), then show messages and stats
+
+        Profiled if the FILE_RENAMER_PROFILE environment variable is set
+        """
+        profile_dir = get_profile_dir()
+        if profile_dir:
+            profiler = RunProfiler(profile_dir)
+            with profiler.profile():
+                success = file_renamer.rename_files()
+        else:
+            success = file_renamer.rename_files()
+        if success and file_renamer.stats.files:
+            messages.append(file_renamer.stats.describe())
+        if profile_dir:
+            messages.append(profiler.describe())
+        self.message_from_thread("\n".join(messages))
+
+    def toggle_pause(self, _instance) -> None:
+        """Pause the running renames, or resume them if paused"""
+        if self.control.paused:
+            self.control.resume()
+            self.pause_btn.text = "Pause"
+        else:
+            self.control.pause()
+            self.pause_btn.text = "Resume"
+
+    def cancel_renames(self, _instance) -> None:
+        """Stop the running renames before the next file"""
+        self.control.cancel()
+        self.pause_btn.disabled = self.cancel_btn.disabled = True
+
+    def stop_renames(self) -> None:
+        """Cancel running renames (also if paused) and wait for them to stop"""
+        self.control.cancel()
+        if self.worker_thread.is_alive():
+            self.worker_thread.join()
+
     def pick_folder(self, _instance) -> None:
         """Open folder selector for our selected button"""
         self.app.screen_manager.transition.direction = "left"
@@ -203,12 +239,34 @@ class MainPage(GridLayout):
 
         This is the main function of this app
         """
-        if self.worker_thread.is_alive():
+        if self.submit_btn.disabled:
             return  # Don't run if already running
-        file_renamer = FileRenamer(self)
+        folder_loc = self.folder_loc_label.text
+        if folder_loc == self.folder_loc_msg:
+            folder_loc = ""
+        messages: list[str] = []
+        self.control = RunControl()
+        self.progress = Progress()
+        try:
+            file_renamer = FileRenamer(
+                prepend=self.prepend_filename_input.text,
+                extensions=self.extensions_input.text,
+                folder_loc=folder_loc,
+                progress=self.progress,
+                message=messages.append,
+                control=self.control,
+            )
+        except PatternError as error:
+            self.message(f"{error}!")
+            return
         self.reset_progress_bar()
-        self.worker_thread = threading.Thread(target=file_renamer.rename_files)
+        self.submit_btn.disabled = True
+        self.pause_btn.disabled = self.cancel_btn.disabled = False
+        self.worker_thread = threading.Thread(
+            target=self.run_file_renamer, args=(file_renamer, messages)
+        )
         self.worker_thread.start()
+        Clock.schedule_interval(self.update_progress_bar, 1 / PROGRESS_FPS)
 
 
 class FolderSelectorPage(GridLayout):
@@ -227,8 +285,11 @@ class FolderSelectorPage(GridLayout):
         self.back_btn.bind(on_press=self.go_back)
         self.select_btn = Button(text="Select", font_size=18, background_color=TEAL)
         self.select_btn.bind(on_press=self.confirm_selection)
-        self.row_1 = GridLayout(cols=2, size_hint_y=None)
+        self.show_files_btn = ToggleButton(text="Show files", font_size=18)
+        self.show_files_btn.bind(state=self.toggle_show_files)
+        self.row_1 = GridLayout(cols=3, size_hint_y=None)
         self.row_1.add_widget(self.back_btn)
+        self.row_1.add_widget(self.show_files_btn)
         self.row_1.add_widget(self.select_btn)
         self.add_widget(self.row_1)
 
@@ -252,24 +313,20 @@ class FolderSelectorPage(GridLayout):
         )
         self.add_widget(self.selected_label)
 
-        # Row 4: File chooser list view ----------------------------------
-        self.folder_select = FileChooserListView(
-            path=str(HOME_DIR),
-            dirselect=True,
-            size_hint_y=None,
-        )
+        # Row 4: Folder browser ------------------------------------------
+        self.folder_select = FolderBrowser(path=str(HOME_DIR), size_hint_y=None)
         self.add_widget(self.folder_select)
+        # Only runs when the selection changes, nothing runs while idle
+        self.folder_select.bind(selection=self.update_selected_label)
 
-        Clock.schedule_interval(self.update_selected_label, 0)
+    def update_selected_label(self, _instance, selection: list[str]) -> None:
+        """Show the selected file or folder in self.selected_label"""
+        if len(selection) == 1:
+            self.selected_label.text = selection[0]
 
-    def update_selected_label(self, _) -> None:
-        """frequently update self.selected_label"""
-        if self.app.screen_manager.current != "FolderSelect":
-            return
-        if len(self.folder_select.selection) == 1:
-            file_path = self.folder_select.selection[0]
-            self.folder_select.selection = [file_path]
-            self.selected_label.text = file_path
+    def toggle_show_files(self, _instance, state: str) -> None:
+        """Show files in the folder browser too, or folders only"""
+        self.folder_select.show_files = state == "down"
 
     def confirm_selection(self, _) -> None:
         """Called by button, confirms folder selection and returns to main screen"""
@@ -278,14 +335,12 @@ class FolderSelectorPage(GridLayout):
         selection = self.selected_label.text
         self.describing_label.text = self.describing_label_text
         path = Path(selection)
-        if path.is_dir():
-            self.app.main_page.folder_loc_label.text = selection
-        else:
-            self.app.main_page.folder_loc_label.text = str(path.parent)
+        folder = selection if path.is_dir() else str(path.parent)
+        self.app.main_page.folder_loc_label.text = folder
         self.app.screen_manager.transition.direction = "right"
         self.app.screen_manager.current = "Main"
         self.folder_select.selection = []
-        self.folder_select.path = selection
+        self.folder_select.path = folder
         self.selected_label.text = ""
 
     def go_back(self, _instance) -> None:
@@ -301,8 +356,6 @@ class FileRenamerApp(App):
         """Build the sceen manager's pages"""
         # Title of App in top bar of GUI
         self.title = f"File Renamer (V{VERSION})"
-        # Load KV string for updating FileChooserListView font size
-        self.root = Builder.load_string(KV)
         self.icon = "new_file.png"
 
         # Use screen manager to easily change between screens
@@ -327,6 +380,10 @@ class FileRenamerApp(App):
         self.on_resize()
         return self.screen_manager
 
+    def on_stop(self) -> None:
+        """Stop renames when the app closes, a paused run would never exit"""
+        self.main_page.stop_renames()
+
     def on_file_drop(self, _window, file_path: bytes) -> None:
         """Called on dropfile to get file path"""
         file_path_str = file_path.decode("utf-8")
@@ -0,0 +1,137 @@
+"""index: persistent per folder numbering state for incremental renames"""
+import json
+import os
+from typing import Collection, Iterable, Optional
+
+from file_renamer.src.scanner import RESERVED_PREFIX
+from file_renamer.src.template import DEFAULT_TEMPLATE
+
+INDEX_NAME = f"{RESERVED_PREFIX}_index.json"
+INDEX_VERSION = 1
+
+
+class FolderIndex:
+    """Numbering state of a folder, saved in the folder itself
+
+    Keeps the prepend, naming template, padding and highest number given
+    out so far, plus the names of files already numbered, so new arrivals
+    can be given the next numbers without touching files already renamed.
+
+    The index file is JSON lines: the whole index, then one line per save
+    with the names added since (watch mode saves every batch). It is written
+    whole again once appended names outnumber the rest, or names were removed.
+    """
+
+    def __init__(
+        self,
+        prepend: str,
+        padding: int,
+        last_number: int = 0,
+        names: Iterable[str] = (),
+        template: str = DEFAULT_TEMPLATE,
+    ) -> None:
+        """Initialize class"""
+        self.prepend = prepend
+        self.template = template
+        self.padding = padding
+        self.last_number = last_number
+        self.names = set(names)
+        self.path: Optional[str] = None  # file the index was loaded or saved to
+        self.unsaved: list[str] = []  # names added since, appended on save
+        self.appended = 0  # names appended to the file since written whole
+
+    @staticmethod
+    def get_path(folder: str) -> str:
+        """Get path to the index file of a folder"""
+        return os.path.join(folder, INDEX_NAME)
+
+    @classmethod
+    def load(cls, folder: str) -> Optional["FolderIndex"]:
+        """Load index of folder, None if missing or unreadable"""
+        path = cls.get_path(folder)
+        try:
+            with open(path, encoding="utf-8") as index_file:
+                line = index_file.readline()
+                data = json.loads(line)
+                if data.get("version") != INDEX_VERSION:
+                    return None
+                index = cls(
+                    prepend=data["prepend"],
+                    padding=data["padding"],
+                    last_number=data["last_number"],
+                    names=data["names"],
+                    template=data.get("template", DEFAULT_TEMPLATE),
+                )
+                complete = line.endswith("\n")
+                for line in index_file:
+                    if not complete or not line.endswith("\n"):
+                        # Cut short by a crash while appending, that save is lost
+                        complete = False
+                        break
+                    added = json.loads(line)
+                    index.names.update(added["names"])
+                    index.last_number = added["last_number"]
+                    index.appended += len(added["names"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        if complete:
+            index.path = path  # else written whole on the next save
+        return index
+
+    def save(self, folder: str) -> None:
+        """Save index to folder, appending the names added since the last save
+
+        The index is written whole instead if the folder's index file is
+        another one or appending wouldn't pay off.
+        """
+        path = self.get_path(folder)
+        appended = self.appended + len(self.unsaved)
+        if path != self.path or 2 * appended > len(self.names):
+            self.write(path)
+        elif self.unsaved:
+            added = {"names": self.unsaved, "last_number": self.last_number}
+            with open(path, "a", encoding="utf-8") as index_file:
+                index_file.write(json.dumps(added, separators=(",", ":")) + "\n")
+            self.appended = appended
+        self.unsaved = []
+
+    def write(self, path: str) -> None:
+        """Write whole index to path, atomically replacing any existing index"""
+        temp_path = f"{path}.tmp"
+        data = {
+            "version": INDEX_VERSION,
+            "prepend": self.prepend,
+            "template": self.template,
+            "padding": self.padding,
+            "last_number": self.last_number,
+            "names": sorted(self.names),
+        }
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            json.dump(data, index_file, separators=(",", ":"))
+            index_file.write("\n")
+        os.replace(temp_path, path)
+        self.path = path
+        self.appended = 0
+
+    def add(self, new_names: list[str]) -> None:
+        """Add newly numbered names"""
+        self.names.update(new_names)
+        self.last_number += len(new_names)
+        self.unsaved.extend(new_names)
+
+    def give_back(self, new_names: list[str]) -> None:
+        """Undo adding newly numbered names (their renames were never run)"""
+        self.names.difference_update(new_names)
+        self.last_number -= len(new_names)
+        given_back = set(new_names)
+        unsaved = [name for name in self.unsaved if name not in given_back]
+        if len(self.unsaved) - len(unsaved) < len(given_back):
+            self.path = None  # already saved, the file must be written whole
+        self.unsaved = unsaved
+
+    def keep(self, names: Collection[str]) -> None:
+        """Forget numbered files not among names (gone), keeping the numbers"""
+        count = len(self.names)
+        self.names.intersection_update(names)
+        if len(self.names) < count:
+            self.path = None
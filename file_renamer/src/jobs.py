@@ -0,0 +1,138 @@
+"""jobs: rename many folders (each with its own prepend) concurrently"""
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+from file_renamer.src.file_renamer import FileRenamer, MessageCallback, ignore
+from file_renamer.src.patterns import PatternError
+from file_renamer.src.progress import Progress, ProgressSnapshot
+from file_renamer.src.scanner import StrPath
+
+MAX_JOBS = 4
+PROGRESS_INTERVAL = 5.0  # seconds between progress reports of the CLI
+
+
+class RenameJob(NamedTuple):
+    """Files with extensions in folder to number with prepend"""
+
+    folder: str
+    prepend: str
+    extensions: str  # comma separated patterns, as typed in the GUI
+
+
+def read_jobs(path: StrPath) -> list[RenameJob]:
+    """Read jobs from a CSV file of folder,prepend,extension[,extension...]
+
+    Empty lines and lines starting with # are skipped.
+    """
+    jobs = []
+    with open(path, encoding="utf-8", newline="") as jobs_file:
+        for row in csv.reader(jobs_file):
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            if len(row) < 3:
+                raise ValueError(f"Expected folder,prepend,extensions, got: {row}")
+            folder, prepend, *extensions = row
+            jobs.append(RenameJob(folder.strip(), prepend, ",".join(extensions)))
+    return jobs
+
+
+class JobQueue:
+    """Run rename jobs, at most max_jobs at a time
+
+    Folders are independent, so a batch takes about as long as its slowest
+    folder (given enough max_jobs) instead of the sum of all of them. Every
+    job has its own Progress, `snapshot` sums them up for overall progress.
+    """
+
+    def __init__(
+        self,
+        jobs: Iterable[RenameJob],
+        max_jobs: int = MAX_JOBS,
+        message: MessageCallback = ignore,
+        clock: Callable[[], float] = time.monotonic,
+        **options: Any,
+    ) -> None:
+        """Initialize class
+
+        message: called with "folder: message" for every message of a job
+        options: passed on to every job's FileRenamer (recursive, ...)
+        """
+        self.jobs = list(jobs)
+        self.max_jobs = max_jobs
+        self.message = message
+        self.clock = clock
+        self.options = options
+        self.job_progress = [Progress(clock) for _ in self.jobs]
+        self.job_messages: list[list[str]] = [[] for _ in self.jobs]
+        # None while a job hasn't finished, then True if no errors
+        self.results: list[Optional[bool]] = [None] * len(self.jobs)
+        self.start_time = clock()
+
+    def run_job(self, job_num: int) -> bool:
+        """Run one job, return True if no errors"""
+        job = self.jobs[job_num]
+        messages = self.job_messages[job_num]
+        # Restarted, so time spent waiting in the queue doesn't count
+        progress = self.job_progress[job_num] = Progress(self.clock)
+        try:
+            file_renamer = FileRenamer(
+                prepend=job.prepend,
+                extensions=job.extensions,
+                folder_loc=job.folder,
+                progress=progress,
+                message=messages.append,
+                **self.options,
+            )
+            return file_renamer.rename_files()
+        except (OSError, PatternError) as error:
+            # One folder failing (gone, no permission, ...) mustn't stop the rest
+            messages.append(str(error))
+            return False
+
+    def run(self) -> bool:
+        """Run all jobs, return True if all succeeded"""
+        self.start_time = self.clock()
+        with ThreadPoolExecutor(self.max_jobs) as executor:
+            futures = {
+                executor.submit(self.run_job, job_num): job_num
+                for job_num in range(len(self.jobs))
+            }
+            for future in as_completed(futures):
+                job_num = futures[future]
+                self.results[job_num] = future.result()
+                for msg in self.job_messages[job_num]:
+                    self.message(f"{self.jobs[job_num].folder}: {msg}")
+        failed = self.results.count(False)
+        msg = f"Done! Ran {len(self.jobs):,} jobs"
+        if failed:
+            msg += f" ({failed:,} failed)"
+        self.message(f"{msg}!")
+        return not failed
+
+    def snapshot(self) -> ProgressSnapshot:
+        """Get overall progress of all jobs, with throughput and ETA"""
+        snapshots = [progress.snapshot() for progress in self.job_progress]
+        done = sum(snapshot.done for snapshot in snapshots)
+        total = sum(snapshot.total for snapshot in snapshots)
+        elapsed = self.clock() - self.start_time
+        rate = done / elapsed if elapsed > 0 else 0.0
+        # Jobs that haven't listed their files yet have no total
+        totals_known = all(
+            snapshot.total or result is not None
+            for snapshot, result in zip(snapshots, self.results)
+        )
+        eta = (total - done) / rate if rate and totals_known else None
+        return ProgressSnapshot(done, total, elapsed, rate, eta)
+
+    def describe_progress(self) -> list[str]:
+        """Describe overall progress, then that of every running job
+
+        Jobs still waiting, listing their files or finished are left out.
+        """
+        lines = [f"Overall: {self.snapshot().describe()}"]
+        for job, progress, result in zip(self.jobs, self.job_progress, self.results):
+            if result is None and progress.total:
+                lines.append(f"{job.folder}: {progress.snapshot().describe()}")
+        return lines
@@ -0,0 +1,241 @@
+"""journal: crash-safe, append-only record of a folder's renames
+
+A journal is a JSON lines file in the renamed folder:
+
+    {"version": 1, "renames": 3, ...} header with number of planned renames
+    ["a.jpg", "prep_1.jpg"]           one line per planned rename, in order
+    ...
+    {"done": 2}                       renames known to be done (batched)
+    {"done": 3, "complete": true}     all renames done
+
+The plan is synced to disk before the first rename, progress is synced every
+`batch_size` renames, so a crash loses at most one batch of progress, which
+resuming recovers by checking which of those files were already renamed.
+"""
+import json
+import os
+from typing import IO, Iterable, Optional, Sequence
+
+from file_renamer.src.planner import is_temp_name
+from file_renamer.src.scanner import RESERVED_PREFIX
+
+JOURNAL_NAME = f"{RESERVED_PREFIX}_journal.jsonl"
+JOURNAL_VERSION = 1
+JOURNAL_BATCH_SIZE = 1000
+
+
+class JournalError(Exception):
+    """A journal doesn't match the files in its folder"""
+
+
+def check_renames(folder: str, renames: Iterable[tuple[str, str]]) -> None:
+    """Check renames can be done in order in folder, raise JournalError if not
+
+    Every name must exist when it is renamed and every new name must be free,
+    as they were when the renames were journaled (one `lstat` per name).
+    """
+    exists: dict[str, bool] = {}
+
+    def check_exists(name: str) -> bool:
+        """Check if name exists at this point of the renames"""
+        if name not in exists:
+            exists[name] = os.path.lexists(os.path.join(folder, name))
+        return exists[name]
+
+    for name, new_name in renames:
+        if not check_exists(name):
+            raise JournalError(f"{name} is gone, files changed since the renames!")
+        if check_exists(new_name):
+            raise JournalError(f"{new_name} exists, files changed since the renames!")
+        exists[name] = False
+        exists[new_name] = True
+
+
+class Journal:
+    """Append-only journal of the renames in a folder"""
+
+    def __init__(
+        self,
+        folder: str,
+        renames: Optional[Sequence[tuple[str, str]]] = None,
+        done: int = 0,
+        complete: bool = False,
+        batch_size: int = JOURNAL_BATCH_SIZE,
+    ) -> None:
+        """Initialize class"""
+        self.folder = folder
+        self.renames = renames or []
+        self.done = done  # renames done (at least committed count)
+        self.committed = done  # renames synced to disk as done
+        self.complete = complete
+        self.batch_size = batch_size
+        self.journal_file: Optional[IO[str]] = None
+
+    @staticmethod
+    def get_path(folder: str) -> str:
+        """Get path to the journal of a folder"""
+        return os.path.join(folder, JOURNAL_NAME)
+
+    @classmethod
+    def load(cls, folder: str) -> Optional["Journal"]:
+        """Load journal of a folder, None if missing or never fully planned"""
+        journal = None
+        try:
+            with open(cls.get_path(folder), encoding="utf-8") as journal_file:
+                header = json.loads(journal_file.readline())
+                if header.get("version") != JOURNAL_VERSION:
+                    return None
+                renames = []
+                for _ in range(header["renames"]):
+                    name, new_name = json.loads(journal_file.readline())
+                    renames.append((name, new_name))
+                journal = cls(folder, renames, batch_size=header["batch_size"])
+                for line in journal_file:
+                    record = json.loads(line)
+                    journal.done = journal.committed = record["done"]
+                    journal.complete = record.get("complete", False)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # Nothing is renamed before the plan is synced, and a torn last
+            # progress line only loses that batch, which resuming recovers
+            pass
+        return journal
+
+    @classmethod
+    def discard(cls, folder: str) -> None:
+        """Remove the journal of a folder, if any"""
+        try:
+            os.unlink(cls.get_path(folder))
+        except FileNotFoundError:
+            pass
+
+    def write_line(self, record: object) -> None:
+        """Write a JSON line to the journal"""
+        assert self.journal_file is not None
+        self.journal_file.write(json.dumps(record, separators=(",", ":")))
+        self.journal_file.write("\n")
+
+    def sync(self) -> None:
+        """Flush journal and make sure it is on disk"""
+        assert self.journal_file is not None
+        self.journal_file.flush()
+        os.fsync(self.journal_file.fileno())
+
+    def start(self, renames: Sequence[tuple[str, str]]) -> None:
+        """Start a new journal with the planned renames, synced to disk"""
+        self.renames = renames
+        self.done = self.committed = 0
+        self.complete = False
+        self.journal_file = open(self.get_path(self.folder), "w", encoding="utf-8")
+        self.write_line(
+            {
+                "version": JOURNAL_VERSION,
+                "renames": len(self.renames),
+                "batch_size": self.batch_size,
+            }
+        )
+        for rename in self.renames:
+            self.write_line(rename)
+        self.sync()
+
+    def reopen(self) -> None:
+        """Reopen a loaded journal for appending progress"""
+        self.journal_file = open(self.get_path(self.folder), "a", encoding="utf-8")
+
+    def commit(self) -> None:
+        """Record the renames done so far, synced to disk"""
+        if self.done == self.committed and not self.complete:
+            return
+        record: dict[str, object] = {"done": self.done}
+        if self.complete:
+            record["complete"] = True
+        self.write_line(record)
+        self.sync()
+        self.committed = self.done
+
+    def record(self) -> None:
+        """Record the next rename as done, committing every batch_size renames
+
+        The first rename of a cycle (onto a temporary name) is committed right
+        away, so uncommitted renames never span a whole cycle: the files after
+        a cycle look just like before it.
+        """
+        self.done += 1
+        last_new_name = self.renames[self.done - 1][1]
+        if self.done - self.committed >= self.batch_size or is_temp_name(last_new_name):
+            self.commit()
+
+    def finish(self) -> None:
+        """Record all renames done and close the journal"""
+        self.complete = True
+        self.commit()
+        self.close()
+
+    def close(self) -> None:
+        """Close the journal file"""
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+
+    def pending(self) -> Sequence[tuple[str, str]]:
+        """Get renames that may not be done yet"""
+        committed = self.committed
+        return self.renames[committed:]
+
+    def remaining(self) -> Sequence[tuple[str, str]]:
+        """Get renames not done yet (after `find_done`)"""
+        done = self.done
+        return self.renames[done:]
+
+    def find_done(self) -> int:
+        """Find how many renames were done, checking the uncommitted ones
+
+        Uncommitted renames were done in order, so the files in the folder
+        match exactly one number of the uncommitted renames. Comparing which
+        names exist against each possibility takes one `lstat` per name.
+        Raises JournalError if the files match none (or more than one) of
+        them. A rename interrupted between linking the new name and unlinking
+        the old one (see NoClobberRenamer) is finished first.
+        """
+        # Uncommitted renames end at a batch or the first rename of a cycle
+        pending = self.pending()[: self.batch_size]
+        for uncommitted, (_, new_name) in enumerate(pending, start=1):
+            if is_temp_name(new_name):
+                pending = pending[:uncommitted]
+                break
+        # Which names exist if none of the pending renames were done
+        expected: dict[str, bool] = {}
+        for name, new_name in pending:
+            expected.setdefault(name, True)
+            expected.setdefault(new_name, False)
+        exists = {
+            name: os.path.lexists(os.path.join(self.folder, name)) for name in expected
+        }
+        for name, new_name in pending:
+            if exists[name] and exists[new_name] and self.is_linked(name, new_name):
+                os.unlink(os.path.join(self.folder, name))
+                exists[name] = False
+        mismatches = sum(expected[name] != exists[name] for name in expected)
+        matches = [0] if not mismatches else []
+        for done, (name, new_name) in enumerate(pending, start=1):
+            # name is now expected to be gone, new_name to exist
+            mismatches += 1 if exists[name] else -1
+            mismatches += -1 if exists[new_name] else 1
+            if not mismatches:
+                matches.append(done)
+        if len(matches) != 1:
+            raise JournalError(
+                "Can't tell which renames were done before the interruption, "
+                "files changed since!"
+            )
+        return self.committed + matches[0]
+
+    def is_linked(self, name: str, new_name: str) -> bool:
+        """Check if name and new_name are links to the same file"""
+        return os.path.samestat(
+            os.lstat(os.path.join(self.folder, name)),
+            os.lstat(os.path.join(self.folder, new_name)),
+        )
+
+    def reversed_renames(self) -> list[tuple[str, str]]:
+        """Get renames undoing all renames of a complete journal"""
+        return [(new_name, name) for name, new_name in reversed(self.renames)]
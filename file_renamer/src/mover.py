@@ -0,0 +1,161 @@
+"""mover: move numbered files into another folder, possibly on another mount
+
+A move within a filesystem is a rename (that never overwrites, see
+noclobber). Across filesystems (rename fails with EXDEV) files are copied by
+the kernel instead (`copy_file_range`, else `sendfile` on Linux, so file
+content never passes through Python), then the original is removed. Copies
+run in parallel, a rename is too cheap for that.
+"""
+import errno
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Sequence
+
+from file_renamer.src.noclobber import NoClobberRenamer
+from file_renamer.src.planner import RenameCollisionError
+
+MAX_COPIES = 4
+COPY_CHUNK_SIZE = 1 << 30
+# Kernel copy not possible between these files, fall back to the next way
+KERNEL_COPY_ERRORS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+}
+
+CopyCall = Callable[[int], int]  # copies up to n bytes, returns bytes copied
+
+
+def get_kernel_copies(src_fd: int, dst_fd: int) -> list[CopyCall]:
+    """Get ways to copy between file descriptors in the kernel, best first
+
+    Both copy from the current position of src_fd to that of dst_fd.
+    """
+    copies: list[CopyCall] = []
+    if hasattr(os, "copy_file_range"):
+        copies.append(lambda count: os.copy_file_range(src_fd, dst_fd, count))
+    # Only Linux sends from regular files, elsewhere the output must be a socket
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        copies.append(lambda count: os.sendfile(dst_fd, src_fd, None, count))
+    return copies
+
+
+def kernel_copy(src_fd: int, dst_fd: int, size: int) -> bool:
+    """Copy size bytes between files in the kernel
+
+    Return False (nothing copied) if no kernel copy works for these files.
+    """
+    for copy in get_kernel_copies(src_fd, dst_fd):
+        copied = 0
+        try:
+            while copied < size:
+                sent = copy(min(COPY_CHUNK_SIZE, size - copied))
+                if not sent:
+                    break  # end of file (it shrank), or this way can't copy it
+                copied += sent
+        except OSError as error:
+            if copied or error.errno not in KERNEL_COPY_ERRORS:
+                raise
+            continue
+        if copied or not size:
+            return True
+    return False
+
+
+def copy_file(src: str, dst: str) -> None:
+    """Copy file content, permissions and times, never overwriting dst
+
+    Raises FileExistsError if dst exists, a partial copy is removed.
+    """
+    with open(src, "rb") as src_file:
+        size = os.fstat(src_file.fileno()).st_size
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+        dst_fd = os.open(dst, flags, 0o666)
+        try:
+            with open(dst_fd, "wb") as dst_file:
+                if not kernel_copy(src_file.fileno(), dst_fd, size):
+                    shutil.copyfileobj(src_file, dst_file)
+            shutil.copystat(src, dst)
+        except BaseException:
+            os.unlink(dst)
+            raise
+
+
+def move_file(src: str, dst: str) -> None:
+    """Move a file across filesystems: copy it, then remove the original"""
+    copy_file(src, dst)
+    os.unlink(src)
+
+
+class FileMover:
+    """Move files from a folder into a destination folder under new names
+
+    Files are renamed until the first rename fails with EXDEV, the rest are
+    copied, max_copies at a time.
+    """
+
+    def __init__(self, max_copies: int = MAX_COPIES) -> None:
+        """Initialize class"""
+        self.max_copies = max_copies
+
+    def move_files(
+        self,
+        folder: str,
+        destination: str,
+        moves: Sequence[tuple[str, str]],
+        moved: Optional[Callable[[bool], None]] = None,
+    ) -> None:
+        """Move (name, new_name) files from folder into destination, in order
+
+        moved: called after every file, with True if it was copied
+
+        Raises RenameCollisionError if a file showed up at a new name, it is
+        never overwritten.
+        """
+        os.makedirs(destination, exist_ok=True)
+        moved = moved or (lambda _copied: None)
+        renamed = 0
+        with NoClobberRenamer(folder, destination) as renamer:
+            for name, new_name in moves:
+                try:
+                    renamer.rename(name, new_name)
+                except FileExistsError:
+                    raise RenameCollisionError(name, new_name) from None
+                except OSError as error:
+                    if error.errno != errno.EXDEV:
+                        raise
+                    break
+                renamed += 1
+                moved(False)
+        if renamed < len(moves):
+            self.copy_files(folder, destination, moves[renamed:], moved)
+
+    def copy_files(
+        self,
+        folder: str,
+        destination: str,
+        moves: Sequence[tuple[str, str]],
+        moved: Callable[[bool], None],
+    ) -> None:
+        """Move files to another filesystem, max_copies at a time"""
+
+        def move(rename: tuple[str, str]) -> None:
+            """Move one file (on a worker thread)"""
+            name, new_name = rename
+            try:
+                move_file(
+                    os.path.join(folder, name), os.path.join(destination, new_name)
+                )
+            except FileExistsError:
+                raise RenameCollisionError(name, new_name) from None
+            moved(True)
+
+        with ThreadPoolExecutor(self.max_copies) as executor:
+            # Raises the first error, copies already started still finish
+            for _ in executor.map(move, moves):
+                pass
@@ -0,0 +1,185 @@
+"""noclobber: renames relative to an open folder that never overwrite a file
+
+The folder (and destination folder) is opened once and every rename names
+files relative to it (`renameat`), so the kernel only looks up the filename
+instead of the whole path, twice per rename. Overwriting is made impossible
+by the kernel, the first of these the filesystem supports is used:
+
+1. `renameat2(RENAME_NOREPLACE)` (Linux), `renameatx_np(RENAME_EXCL)` (macOS)
+2. hard link to the new name, then unlink the old one (fails if it exists)
+3. plain rename after checking the new name is free (not atomic, last resort)
+
+On Windows, where folders can't be opened, a rename never replaces a file.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import sys
+from typing import Any, Callable, Optional
+
+# Atomic no-replace rename function and flag of each platform
+NO_REPLACE_RENAMES = {"linux": ("renameat2", 1), "darwin": ("renameatx_np", 4)}
+NO_REPLACE = "no_replace"
+LINK = "link"
+PLAIN = "plain"
+# The filesystem doesn't support the method, try the next one
+UNSUPPORTED_ERRORS = {
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EPERM,
+}
+DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_CLOEXEC", 0)
+
+RenameAt = Callable[[int, bytes, int, bytes, int], int]
+
+
+def load_no_replace_rename() -> Optional[tuple[RenameAt, int]]:
+    """Load the platform's atomic no-replace rename and its flag, if any"""
+    platform = "linux" if sys.platform.startswith("linux") else sys.platform
+    if platform not in NO_REPLACE_RENAMES:
+        return None
+    func_name, flag = NO_REPLACE_RENAMES[platform]
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        func = getattr(libc, func_name)
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_uint,
+    ]
+    func.restype = ctypes.c_int
+    return func, flag
+
+
+NO_REPLACE_RENAME = load_no_replace_rename()
+
+
+class NoClobberRenamer:
+    """Rename files of a folder (into destination) without ever overwriting
+
+    Use as a context manager, or call `close` when done. `rename` raises
+    FileExistsError if the new name is taken by another file.
+    """
+
+    def __init__(self, folder: str, destination: Optional[str] = None) -> None:
+        """Initialize class, opening the folder(s)"""
+        self.folder = folder
+        self.destination = destination or folder
+        self.fd: Optional[int] = None
+        self.dst_fd: Optional[int] = None
+        if os.rename in os.supports_dir_fd:
+            self.fd = os.open(folder, DIR_FLAGS)
+            try:
+                if destination is None:
+                    self.dst_fd = self.fd
+                else:
+                    self.dst_fd = os.open(destination, DIR_FLAGS)
+            except OSError:
+                os.close(self.fd)
+                raise
+        if self.fd is None:
+            self.method = PLAIN
+        elif NO_REPLACE_RENAME:
+            self.method = NO_REPLACE
+        else:
+            self.method = LINK if os.link in os.supports_dir_fd else PLAIN
+
+    def __enter__(self) -> "NoClobberRenamer":
+        """Use as context manager"""
+        return self
+
+    def __exit__(self, *_exc_info: Any) -> None:
+        """Close folder(s) when done"""
+        self.close()
+
+    def close(self) -> None:
+        """Close the folder(s)"""
+        if self.dst_fd is not None and self.dst_fd != self.fd:
+            os.close(self.dst_fd)
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = self.dst_fd = None
+
+    def rename(self, name: str, new_name: str) -> None:
+        """Rename file name of folder to new_name in destination"""
+        if self.method == NO_REPLACE:
+            if self.rename_no_replace(name, new_name):
+                return
+        if self.method == LINK:
+            if self.rename_link(name, new_name):
+                return
+        self.rename_plain(name, new_name)
+
+    def rename_no_replace(self, name: str, new_name: str) -> bool:
+        """Rename atomically, return False if the filesystem can't"""
+        assert NO_REPLACE_RENAME and self.fd is not None and self.dst_fd is not None
+        func, flag = NO_REPLACE_RENAME
+        if not func(
+            self.fd, os.fsencode(name), self.dst_fd, os.fsencode(new_name), flag
+        ):
+            return True
+        error = ctypes.get_errno()
+        if error in UNSUPPORTED_ERRORS:
+            self.method = LINK if os.link in os.supports_dir_fd else PLAIN
+            return False
+        if error == errno.EEXIST and self.is_same_file(name, new_name):
+            return False  # Case only rename on a case insensitive filesystem
+        raise OSError(error, os.strerror(error), name, None, new_name)
+
+    def rename_link(self, name: str, new_name: str) -> bool:
+        """Hard link new_name, then unlink name, False if the filesystem can't"""
+        try:
+            os.link(
+                name,
+                new_name,
+                src_dir_fd=self.fd,
+                dst_dir_fd=self.dst_fd,
+                follow_symlinks=False,
+            )
+        except FileExistsError:
+            if self.is_same_file(name, new_name):
+                return False
+            raise
+        except OSError as error:
+            if error.errno not in UNSUPPORTED_ERRORS:
+                raise
+            self.method = PLAIN
+            return False
+        os.unlink(name, dir_fd=self.fd)
+        return True
+
+    def rename_plain(self, name: str, new_name: str) -> None:
+        """Rename after checking new_name is free (or the same file)"""
+        if self.fd is None:
+            # Windows, where renaming never replaces a file
+            os.rename(
+                os.path.join(self.folder, name),
+                os.path.join(self.destination, new_name),
+            )
+            return
+        try:
+            os.lstat(new_name, dir_fd=self.dst_fd)
+        except FileNotFoundError:
+            pass
+        else:
+            if not self.is_same_file(name, new_name):
+                raise FileExistsError(
+                    errno.EEXIST, os.strerror(errno.EEXIST), name, None, new_name
+                )
+        os.rename(name, new_name, src_dir_fd=self.fd, dst_dir_fd=self.dst_fd)
+
+    def is_same_file(self, name: str, new_name: str) -> bool:
+        """Check if name and new_name are the same file"""
+        try:
+            return os.path.samestat(
+                os.lstat(name, dir_fd=self.fd), os.lstat(new_name, dir_fd=self.dst_fd)
+            )
+        except OSError:
+            return False
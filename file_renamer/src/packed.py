@@ -0,0 +1,171 @@
+"""packed: compact storage for millions of filenames
+
+A `list[str]` costs about 60 bytes per name besides the text itself (string
+header, list slot), and a list of (name, new_name) tuples twice that plus the
+tuple. Packed names are NUL terminated UTF-8 in one bytearray, with an array
+of offsets for indexing: the name's length plus 9 bytes, and no Python object
+per name. Strings are only made while names are used, a chunk at a time.
+Filenames can't contain NUL, so it can't show up inside a name.
+"""
+from array import array
+from itertools import accumulate, islice
+from typing import Iterable, Iterator, Sequence, Union, overload
+
+# Any str round trips, also lone surrogates (undecodable names on POSIX)
+ENCODING = "utf-8"
+ERRORS = "surrogatepass"
+CHUNK_SIZE = 4096  # names decoded (or encoded) at a time
+FILTER_BITS = 16  # bits per name in a NameFilter, about 6% false positives
+
+Rename = tuple[str, str]
+
+
+class PackedNames(Sequence[str]):
+    """Compact, append-only sequence of filenames"""
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        """Initialize class"""
+        self.data = bytearray()
+        self.ends = array("Q")  # offset of each name's end, past its NUL
+        self.extend(names)
+
+    def append(self, name: str) -> None:
+        """Add a name"""
+        self.data += name.encode(ENCODING, ERRORS)
+        self.data.append(0)
+        self.ends.append(len(self.data))
+
+    def extend(self, names: Iterable[str]) -> None:
+        """Add names, encoding a chunk of them at a time"""
+        names_iter = iter(names)
+        while chunk := list(islice(names_iter, CHUNK_SIZE)):
+            text = "\0".join(chunk) + "\0"
+            data = text.encode(ENCODING, ERRORS)
+            if len(data) == len(text):  # ASCII, lengths in bytes are the same
+                lengths: Iterable[int] = map(len, chunk)
+            else:
+                lengths = (len(name.encode(ENCODING, ERRORS)) for name in chunk)
+            ends = accumulate(
+                (length + 1 for length in lengths), initial=len(self.data)
+            )
+            next(ends)  # the initial offset is the end of the previous name
+            self.ends.extend(ends)
+            self.data += data
+
+    def __len__(self) -> int:
+        """Number of names"""
+        return len(self.ends)
+
+    @overload
+    def __getitem__(self, index: int) -> str:
+        """Get name at index"""
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]:
+        """Get names in slice"""
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, list[str]]:
+        """Get name at index, or a list of the names in a slice"""
+        if isinstance(index, slice):
+            return [self[num] for num in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("name index out of range")
+        end = self.ends[index] - 1
+        start = self.ends[index - 1] if index else 0
+        return self.data[start:end].decode(ENCODING, ERRORS)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over names, decoding a chunk of them at a time"""
+        data, ends = self.data, self.ends
+        start = 0
+        for last in range(CHUNK_SIZE, len(ends) + CHUNK_SIZE, CHUNK_SIZE):
+            end = ends[min(last, len(ends)) - 1]
+            text_end = end - 1  # without the last NUL
+            yield from data[start:text_end].decode(ENCODING, ERRORS).split("\0")
+            start = end
+
+    def __repr__(self) -> str:
+        """Get representation, with the number of names"""
+        return f"<PackedNames of {len(self):,} names>"
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the packed names"""
+        return len(self.data) + self.ends.itemsize * len(self.ends)
+
+
+class PackedRenames(Sequence[Rename]):
+    """Compact, append-only sequence of (name, new_name) renames"""
+
+    def __init__(self, renames: Iterable[Rename] = ()) -> None:
+        """Initialize class"""
+        self.names = PackedNames()
+        self.new_names = PackedNames()
+        self.extend(renames)
+
+    def append(self, rename: Rename) -> None:
+        """Add a rename"""
+        name, new_name = rename
+        self.names.append(name)
+        self.new_names.append(new_name)
+
+    def extend(self, renames: Iterable[Rename]) -> None:
+        """Add renames"""
+        for rename in renames:
+            self.append(rename)
+
+    def __len__(self) -> int:
+        """Number of renames"""
+        return len(self.names)
+
+    @overload
+    def __getitem__(self, index: int) -> Rename:
+        """Get rename at index"""
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Rename]:
+        """Get renames in slice"""
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Rename, list[Rename]]:
+        """Get rename at index, or a list of the renames in a slice"""
+        if isinstance(index, slice):
+            return list(zip(self.names[index], self.new_names[index]))
+        return self.names[index], self.new_names[index]
+
+    def __iter__(self) -> Iterator[Rename]:
+        """Iterate over renames"""
+        return zip(self.names, self.new_names)
+
+    def __repr__(self) -> str:
+        """Get representation, with the number of renames"""
+        return f"<PackedRenames of {len(self):,} renames>"
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the packed renames"""
+        return self.names.nbytes + self.new_names.nbytes
+
+
+class NameFilter:
+    """Compact filter telling which names may be in a set of names
+
+    One bit per hash of a name (FILTER_BITS bits per name), so a name that is
+    in the set is always found, others are (wrongly) found about 6% of the
+    time. Costs 2 bytes per name instead of a set's ~90 (string and slot).
+    """
+
+    def __init__(self, names: Iterable[str], size: int) -> None:
+        """Initialize class with (about) size names"""
+        self.size = max(size * FILTER_BITS, 8)
+        self.bits = bytearray(self.size // 8 + 1)
+        bits, bits_size = self.bits, self.size
+        for name in names:
+            bit = hash(name) % bits_size
+            bits[bit >> 3] |= 1 << (bit & 7)
+
+    def __contains__(self, name: object) -> bool:
+        """Check if name may be in the set"""
+        bit = hash(name) % self.size
+        return bool(self.bits[bit >> 3] & 1 << (bit & 7))
@@ -0,0 +1,172 @@
+"""patterns: filter language picking the files to rename, compiled once
+
+A filter is a list of patterns (comma separated in the GUI and `-e`):
+
+    jpg, .tar.gz       extensions, with or without the dot, multi-dot ones too
+    IMG_*.jpg          glob matched against the whole filename
+    re:^\\d{1,3}\\.png$  regular expression searched for in the filename
+                       (commas in (), [] or {} or escaped don't split it)
+    !*_thumb.jpg       `!` in front of any pattern excludes the files it matches
+
+A file matches if it matches an include pattern and no exclude pattern, a
+filter needs at least one include pattern. Case is ignored, like for
+extensions.
+
+Patterns are compiled into one matcher up front. Extensions and globs of the
+usual shapes (`*.jpg`, `*_thumb.jpg`, `IMG_*`, `IMG_*.jpg`) become set lookups
+of the filename's prefix and suffix of each length in use, so their cost per
+filename depends on how many different lengths they have, not on how many
+there are. Other globs, and regexes, are joined into one regular expression
+each, which costs more the more patterns it has.
+"""
+import fnmatch
+import re
+from typing import Iterable, Optional
+
+EXCLUDE_PREFIX = "!"
+REGEX_PREFIX = "re:"
+GLOB_CHARS = frozenset("*?[")
+
+
+class PatternError(ValueError):
+    """A filter pattern can't be used"""
+
+
+def split_patterns(patterns: str) -> list[str]:
+    """Split comma separated patterns, dropping blank ones"""
+    found = []
+    start = 0
+    while start <= len(patterns):
+        end = find_pattern_end(patterns, start)
+        found.append(patterns[start:end].strip())
+        start = end + 1
+    return [pattern for pattern in found if pattern]
+
+
+def find_pattern_end(patterns: str, start: int) -> int:
+    """Get index of the comma ending the pattern starting at start, else the end
+
+    Commas of regexes inside (), [] or {}, or escaped, are part of the regex.
+    """
+    pattern = patterns[start:].lstrip().removeprefix(EXCLUDE_PREFIX).lstrip()
+    if not pattern.startswith(REGEX_PREFIX):
+        end = patterns.find(",", start)
+        return len(patterns) if end == -1 else end
+    depth = 0  # open ( and { of the regex
+    in_class = escaped = False  # in [...], after a backslash
+    for end in range(start, len(patterns)):
+        char = patterns[end]
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char in "({":
+            depth += 1
+        elif char in ")}":
+            depth = max(depth - 1, 0)
+        elif char == "," and not depth:
+            return end
+    return len(patterns)
+
+
+def get_affixes(pattern: str) -> Optional[tuple[str, str]]:
+    """Get (prefix, suffix) of a glob made of text around one "*", else None"""
+    prefix, star, suffix = pattern.partition("*")
+    if not star or GLOB_CHARS.intersection(prefix + suffix):
+        return None
+    return prefix, suffix
+
+
+class PatternSet:
+    """Compiled patterns, matching a filename if any of them matches"""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        """Initialize class with patterns (no "!"), raise PatternError if bad"""
+        # Suffixes (and their lengths) of "prefix*suffix" patterns by prefix
+        self.affixes: dict[str, tuple[frozenset[str], tuple[int, ...]]] = {}
+        affixes: dict[str, set[str]] = {}
+        globs: list[str] = []
+        regexes: list[str] = []
+        for pattern in patterns:
+            if pattern.startswith(REGEX_PREFIX):
+                regexes.append(self.check_regex(pattern.removeprefix(REGEX_PREFIX)))
+                continue
+            pattern = pattern.lower()
+            if GLOB_CHARS.isdisjoint(pattern):
+                # An extension, the same as the glob "*.ext"
+                pattern = f"*.{pattern.strip('. ')}"
+            found = get_affixes(pattern)
+            if found is None:
+                globs.append(fnmatch.translate(pattern))
+                continue
+            prefix, suffix = found
+            affixes.setdefault(prefix, set()).add(suffix)
+        for prefix, suffixes in affixes.items():
+            lengths = tuple(sorted({len(suffix) for suffix in suffixes}))
+            self.affixes[prefix] = (frozenset(suffixes), lengths)
+        self.prefix_lengths = tuple(sorted({len(prefix) for prefix in self.affixes}))
+        # fnmatch patterns end with \Z, so `match` matches the whole name
+        self.glob = re.compile("|".join(globs)).match if globs else None
+        self.regex = None
+        if regexes:
+            regex = "|".join(f"(?:{regex})" for regex in regexes)
+            self.regex = re.compile(regex, re.IGNORECASE).search
+
+    @staticmethod
+    def check_regex(regex: str) -> str:
+        """Check regex compiles on its own, raise PatternError if not"""
+        try:
+            re.compile(regex)
+        except re.error as error:
+            raise PatternError(f"Bad regex {regex!r}: {error}") from None
+        return regex
+
+    def match(self, name: str, lower_name: str) -> bool:
+        """Check if filename (and its lowercase version) matches a pattern"""
+        size = len(lower_name)
+        for prefix_length in self.prefix_lengths:
+            found = self.affixes.get(lower_name[:prefix_length])
+            if found is None:
+                continue
+            suffixes, suffix_lengths = found
+            for suffix_length in suffix_lengths:
+                suffix_start = size - suffix_length
+                if suffix_start < prefix_length:
+                    break  # prefix and suffix would overlap
+                if lower_name[suffix_start:] in suffixes:
+                    return True
+        if self.glob and self.glob(lower_name):
+            return True
+        return bool(self.regex and self.regex(name))
+
+
+class FileFilter:
+    """Match filenames against a filter (see module docstring)"""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        """Initialize class, raise PatternError if a pattern is bad"""
+        include: list[str] = []
+        exclude: list[str] = []
+        for pattern in patterns:
+            if pattern.startswith(EXCLUDE_PREFIX):
+                exclude.append(pattern.removeprefix(EXCLUDE_PREFIX).strip())
+            else:
+                include.append(pattern)
+        if "" in exclude:
+            raise PatternError("Nothing to exclude after '!'")
+        if exclude and not include:
+            # Would match every file (README, .DS_Store, ...) but those
+            raise PatternError("Add a pattern of files to include, not only '!'")
+        self.include = PatternSet(include)
+        self.exclude = PatternSet(exclude) if exclude else None
+
+    def __call__(self, name: str) -> bool:
+        """Return True if filename passes the filter"""
+        lower_name = name.lower()
+        if not self.include.match(name, lower_name):
+            return False
+        return not (self.exclude and self.exclude.match(name, lower_name))
@@ -0,0 +1,41 @@
+"""plan_writer: stream planned renames to a file for review (dry runs)"""
+import csv
+import json
+from typing import IO
+
+PLAN_FORMATS = ("jsonl", "csv")
+PLAN_FIELDS = ("folder", "name", "new_name")
+
+
+class PlanWriter:
+    """Write planned renames one by one as JSON lines or CSV
+
+    Every rename is written as soon as it is computed, so nothing but the
+    output stream's buffer is held in memory.
+    """
+
+    def __init__(self, output: IO[str], plan_format: str = "jsonl") -> None:
+        """Initialize class"""
+        if plan_format not in PLAN_FORMATS:
+            raise ValueError(f"Unknown plan format: {plan_format}")
+        self.output = output
+        self.plan_format = plan_format
+        self.count = 0
+        if plan_format == "csv":
+            self.csv_writer = csv.writer(output)
+            self.csv_writer.writerow(PLAN_FIELDS)
+
+    @staticmethod
+    def get_format(path: str) -> str:
+        """Guess plan format from an output path, defaulting to jsonl"""
+        return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+    def write(self, folder: str, name: str, new_name: str) -> None:
+        """Write one planned rename"""
+        if self.plan_format == "csv":
+            self.csv_writer.writerow((folder, name, new_name))
+        else:
+            record = dict(zip(PLAN_FIELDS, (folder, name, new_name)))
+            self.output.write(json.dumps(record, ensure_ascii=False))
+            self.output.write("\n")
+        self.count += 1
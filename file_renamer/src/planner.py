@@ -0,0 +1,161 @@
+"""planner: plan collision-safe renames within a folder"""
+import os
+import uuid
+from typing import Iterable, Optional
+
+from file_renamer.src.packed import NameFilter, PackedNames, PackedRenames
+from file_renamer.src.scanner import RESERVED_PREFIX
+
+TEMP_PREFIX = f"{RESERVED_PREFIX}_tmp_"
+
+
+def is_temp_name(name: str) -> bool:
+    """Check if name is a temporary name given out by a plan"""
+    return name.startswith(TEMP_PREFIX)
+
+
+class RenameCollisionError(Exception):
+    """A rename would overwrite a file that isn't being renamed itself"""
+
+    def __init__(self, name: str, new_name: str) -> None:
+        """Initialize class"""
+        super().__init__(
+            f"Can't rename {name} to {new_name}, "
+            "a different file with that name already exists!"
+        )
+        self.name = name
+        self.new_name = new_name
+
+
+class RenamePlan:
+    """Ordered renames for a folder that never overwrite a file
+
+    Renames that wouldn't change a name are dropped. A rename onto a name
+    another file is still using is ordered after that file is moved away
+    (chains), and cycles (a -> b -> a) are broken with one temporary name per
+    cycle, the fewest extra renames possible.
+    """
+
+    def __init__(self, folder: str, destination: Optional[str] = None) -> None:
+        """Initialize class"""
+        self.folder = folder
+        self.destination = destination  # folder files move to, None for in place
+        self.renames = PackedRenames()  # (name, new_name) in order
+        self.temp_names: set[str] = set()  # new_names that are temporary hops
+        self.skipped = 0  # files already named correctly
+        self.stat_calls = 0  # filesystem lookups made while planning
+
+    def __len__(self) -> int:
+        """Number of files renamed (not counting temporary hops)"""
+        return len(self.renames) - len(self.temp_names)
+
+    def get_temp_name(self) -> str:
+        """Get an unused temporary filename in folder"""
+        while True:
+            temp_name = f"{TEMP_PREFIX}{uuid.uuid4().hex}"
+            self.stat_calls += 1
+            if not os.path.lexists(os.path.join(self.folder, temp_name)):
+                self.temp_names.add(temp_name)
+                return temp_name
+
+    def check_collision(self, name: str, new_name: str) -> None:
+        """Raise RenameCollisionError if new_name is taken by another file"""
+        new_path = os.path.join(self.folder, new_name)
+        self.stat_calls += 1
+        if not os.path.lexists(new_path):
+            return
+        self.stat_calls += 2
+        # Same file (case only rename on a case insensitive filesystem)
+        if os.path.samestat(
+            os.lstat(os.path.join(self.folder, name)), os.lstat(new_path)
+        ):
+            return
+        raise RenameCollisionError(name, new_name)
+
+
+def plan_renames(folder: str, renames: Iterable[tuple[str, str]]) -> RenamePlan:
+    """Plan collision-safe renames of (name, new_name) pairs within folder
+
+    All names must be distinct, as must all new names. A new name that isn't
+    one of the names being renamed is checked for an existing file (one
+    `lstat`), so files already in place cost no filesystem calls at all.
+    Raises RenameCollisionError without renaming anything on a collision.
+    Renames are kept packed, only names that may be one of the new names are
+    held as strings (see NameFilter), so memory per file stays small.
+    """
+    plan = RenamePlan(folder)
+    changes = PackedRenames()  # renames that change a name, in order
+    unchanged = PackedNames()
+    for name, new_name in renames:
+        if name == new_name:
+            unchanged.append(name)
+        else:
+            changes.append((name, new_name))
+    plan.skipped = len(unchanged)
+    if not changes:
+        return plan
+
+    # Names of the folder that are new names too, True if that file moves
+    new_names = NameFilter(changes.new_names, len(changes))
+    taken = {name: False for name in unchanged if name in new_names}
+    taken.update((name, True) for name in changes.names if name in new_names)
+
+    # Renames onto names of files being moved away wait for them, the rest
+    # are checked for collisions with files that aren't being renamed
+    moves: dict[str, str] = {}  # name -> new_name, for waiting renames
+    for name, new_name in changes:
+        moves_away = taken.get(new_name)
+        if moves_away is None:
+            plan.check_collision(name, new_name)
+        elif moves_away:
+            moves[name] = new_name
+        else:
+            raise RenameCollisionError(name, new_name)
+    del taken
+
+    # Renames onto free names go first, in order
+    if not moves:
+        plan.renames = changes
+        return plan
+    plan.renames.extend(rename for rename in changes if rename[0] not in moves)
+
+    # Name of the file waiting for each new name to be freed up
+    waiting_on = {new_name: name for name, new_name in moves.items()}
+
+    def run_chain(name: Optional[str]) -> None:
+        """Rename name, then the file waiting on its old name, and so on"""
+        while name is not None and name in moves:
+            plan.renames.append((name, moves.pop(name)))
+            name = waiting_on.get(name)
+
+    # Chains: start from the renames onto names freed up by the renames above
+    for name in [name for name, new_name in moves.items() if new_name not in moves]:
+        run_chain(name)
+
+    # Only cycles are left: park one file per cycle on a temporary name
+    while moves:
+        name = next(iter(moves))
+        new_name = moves.pop(name)
+        temp_name = plan.get_temp_name()
+        plan.renames.append((name, temp_name))
+        run_chain(waiting_on.get(name))
+        plan.renames.append((temp_name, new_name))
+    return plan
+
+
+def plan_moves(
+    folder: str, destination: str, moves: Iterable[tuple[str, str]]
+) -> RenamePlan:
+    """Plan moves of (name, new_name) pairs from folder into destination
+
+    Moves can't wait on each other, so they stay in order. Every new name is
+    checked for an existing file in destination (one `lstat`). Raises
+    RenameCollisionError without moving anything on a collision.
+    """
+    plan = RenamePlan(folder, destination)
+    for name, new_name in moves:
+        plan.stat_calls += 1
+        if os.path.lexists(os.path.join(destination, new_name)):
+            raise RenameCollisionError(name, new_name)
+        plan.renames.append((name, new_name))
+    return plan
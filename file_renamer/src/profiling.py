@@ -0,0 +1,145 @@
+"""profiling: cProfile and tracemalloc reports of a run
+
+Switched on with `--profile [DIR]` on the command line, or for any run (GUI
+included, also in the packaged app) by setting the FILE_RENAMER_PROFILE
+environment variable to DIR. Each profiled run writes two files to DIR:
+
+    file_renamer_<time>_<pid>.pstats  cProfile stats, for `python -m pstats`
+                                      or any pstats viewer (snakeviz, ...)
+    file_renamer_<time>_<pid>.txt     peak traced memory, top allocations by
+                                      line and top functions by time
+
+cProfile only sees the thread starting the run, which does all the work of a
+non-recursive run. tracemalloc sees all threads. Both slow the run down, so
+timings are only good for comparing functions with each other.
+"""
+import cProfile
+import errno
+import io
+import os
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Optional
+
+PROFILE_ENV = "FILE_RENAMER_PROFILE"
+TOP_ENTRIES = 25  # allocations and functions listed in the report
+# Allocations of profiling itself left out of the report
+IGNORED_TRACES = (
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def get_profile_dir(profile_dir: Optional[str] = None) -> Optional[str]:
+    """Get folder to write profiles to: profile_dir, else from the environment"""
+    return profile_dir or os.environ.get(PROFILE_ENV) or None
+
+
+def format_size(size: int) -> str:
+    """Format size in bytes as KiB"""
+    return f"{size / 1024:,.1f} KiB"
+
+
+class RunProfiler:
+    """Profile runs, writing a pstats dump and a text report per run"""
+
+    def __init__(self, folder: str, top: int = TOP_ENTRIES) -> None:
+        """Initialize class
+
+        folder: folder reports are written to, made if missing
+        top: number of allocations and functions listed in the text report
+        """
+        self.folder = folder
+        self.top = top
+        self.paths: list[str] = []  # files written by the last run
+        self.error: Optional[OSError] = None  # why the last run's weren't
+
+    def check_folder(self) -> None:
+        """Make the folder reports are written to, raise OSError if unusable"""
+        os.makedirs(self.folder, exist_ok=True)
+        if not os.access(self.folder, os.W_OK | os.X_OK):
+            raise PermissionError(errno.EACCES, os.strerror(errno.EACCES), self.folder)
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        """Profile the code run inside, then write its reports
+
+        Reports that can't be written don't fail the run, `describe` says why.
+        """
+        self.paths = []
+        self.error = None
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            profiling = True
+        except ValueError:
+            profiling = False  # another profiler (debugger, ...) is active
+        try:
+            yield
+        finally:
+            if profiling:
+                profiler.disable()
+            snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED_TRACES)
+            peak = tracemalloc.get_traced_memory()[1]
+            if not was_tracing:
+                tracemalloc.stop()
+            try:
+                self.write_reports(profiler if profiling else None, snapshot, peak)
+            except OSError as error:
+                self.error = error
+
+    def write_reports(
+        self,
+        profiler: Optional[cProfile.Profile],
+        snapshot: tracemalloc.Snapshot,
+        peak: int,
+    ) -> None:
+        """Write the pstats dump (if profiled) and text report of a run"""
+        self.check_folder()
+        top = self.top
+        now = datetime.now()
+        base = os.path.join(
+            self.folder, f"file_renamer_{now:%Y%m%d-%H%M%S}_{os.getpid()}"
+        )
+        report = [
+            f"file_renamer profile of {now:%Y-%m-%d %H:%M:%S}",
+            f"Peak traced memory: {format_size(peak)}",
+            "",
+            f"Top {top} allocations by line, still allocated at the end:",
+        ]
+        for stat in snapshot.statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            report.append(
+                f"  {frame.filename}:{frame.lineno}: {format_size(stat.size)} "
+                f"in {stat.count:,} blocks"
+            )
+        report.append("")
+        if profiler is None:
+            report.append("No cProfile stats, another profiler was active")
+        else:
+            # Imported when needed, it takes longer than the rest of the CLI
+            import pstats
+
+            self.paths.append(f"{base}.pstats")
+            profiler.dump_stats(self.paths[-1])
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+            report.append(f"Top {top} functions by cumulative time:")
+            report.append(stream.getvalue().strip("\n"))
+        self.paths.append(f"{base}.txt")
+        with open(self.paths[-1], "w", encoding="utf-8") as report_file:
+            report_file.write("\n".join(report) + "\n")
+
+    def describe(self) -> str:
+        """Describe where the last run's reports were written"""
+        if self.error:
+            return f"Couldn't write profile: {self.error}"
+        return f"Profile written to {' and '.join(self.paths)}"
@@ -0,0 +1,62 @@
+"""progress: thread-safe progress of a rename run
+
+Worker threads only bump a counter. Whoever displays the progress (the GUI,
+at a fixed frame rate) reads snapshots when it wants to, so the cost per file
+stays tiny however often files are renamed.
+"""
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+
+class ProgressSnapshot(NamedTuple):
+    """Progress of a run at one point in time"""
+
+    done: int
+    total: int
+    elapsed: float  # seconds since start
+    rate: float  # files per second
+    eta: Optional[float]  # seconds left, None if unknown
+
+    def describe(self) -> str:
+        """Describe progress for users"""
+        msg = f"{self.done:,}/{self.total:,} files, {self.rate:,.0f} files/s"
+        if self.eta is not None:
+            msg += f", ETA {format_seconds(self.eta)}"
+        return msg
+
+
+def format_seconds(seconds: float) -> str:
+    """Format seconds as H:MM:SS"""
+    minutes, secs = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{secs:02}"
+
+
+class Progress:
+    """Progress of a rename run, updated by any number of worker threads"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize class"""
+        self.clock = clock
+        self.start_time = clock()
+        self.total = 0
+        self.done = 0
+        self.lock = threading.Lock()
+
+    def set_total(self, total: int) -> None:
+        """Set the number of files the run will go through"""
+        self.total = total
+
+    def add(self, files: int = 1) -> None:
+        """Add files done"""
+        with self.lock:
+            self.done += files
+
+    def snapshot(self) -> ProgressSnapshot:
+        """Get the current progress, with throughput and ETA"""
+        done, total = self.done, self.total
+        elapsed = self.clock() - self.start_time
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate else None
+        return ProgressSnapshot(done, total, elapsed, rate, eta)
@@ -0,0 +1,30 @@
+"""scanner: streaming directory scanner for finding files to rename"""
+import os
+from typing import Callable, Iterator, Optional, Union
+
+StrPath = Union[str, "os.PathLike[str]"]
+
+# Files starting with this are file_renamer's own (index, temp files, ...)
+RESERVED_PREFIX = ".file_renamer"
+
+
+def scan_files(
+    folder: StrPath,
+    matcher: Callable[[str], bool],
+    subfolders: Optional[list[str]] = None,
+) -> Iterator[os.DirEntry]:
+    """Lazily yield entries for regular files in folder matching matcher
+
+    The (cheap) name match runs first, and the file type check reuses the type
+    info `os.scandir` already has, so no extra stat is needed per entry on most
+    platforms. file_renamer's own files (index, ...) are never yielded. If a
+    `subfolders` list is given, paths of subfolders (not following symlinks)
+    are appended to it while scanning.
+    """
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if matcher(entry.name) and entry.is_file():
+                if not entry.name.startswith(RESERVED_PREFIX):
+                    yield entry
+            elif subfolders is not None and entry.is_dir(follow_symlinks=False):
+                subfolders.append(entry.path)
@@ -0,0 +1,48 @@
+"""sorting: sort orders for numbering files
+
+Sort keys are computed once per file while scanning (decorate, sort,
+undecorate), so sorting a folder is a single `sort` of precomputed keys.
+"""
+import os
+import re
+from typing import Callable, Optional
+
+SORT_ORDERS = ("name", "natural", "mtime", "ctime", "size")
+# Sort orders needing file metadata (one stat per file on POSIX, none on Windows)
+STAT_SORT_ORDERS = ("mtime", "ctime", "size")
+DIGITS = re.compile(r"(\d+)")
+
+EntryKey = Callable[[os.DirEntry], object]
+
+
+def natural_key(name: str) -> tuple:
+    """Get key sorting numbers in names by value (IMG_2 before IMG_10)
+
+    Text is compared case insensitively, ties are broken by the name itself.
+    Parts alternate text and number (text first), so parts at the same place
+    are always the same type, and the name is kept out of them: names whose
+    parts start with another name's parts sort after it.
+    """
+    parts: list = DIGITS.split(name.casefold())
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts), name
+
+
+def get_entry_key(sort_order: str) -> Optional[EntryKey]:
+    """Get key of a scanned DirEntry for sort order, None to sort by name
+
+    Metadata orders use the stat result `os.DirEntry` caches (on Windows it
+    comes with the directory listing), ties are broken by name. On Windows
+    ctime is the creation time, elsewhere the last metadata change.
+    """
+    if sort_order == "name":
+        return None
+    if sort_order == "natural":
+        return lambda entry: natural_key(entry.name)
+    if sort_order == "mtime":
+        return lambda entry: (entry.stat().st_mtime_ns, entry.name)
+    if sort_order == "ctime":
+        return lambda entry: (entry.stat().st_ctime_ns, entry.name)
+    if sort_order == "size":
+        return lambda entry: (entry.stat().st_size, entry.name)
+    raise ValueError(f"Unknown sort order: {sort_order}")
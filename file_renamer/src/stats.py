@@ -0,0 +1,89 @@
+"""stats: per phase timing and system call counts of a run
+
+Phases are timed per folder, not per file, and calls are counted in bulk, so
+keeping stats costs next to nothing even for millions of files.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+PHASES = ("scan", "sort", "plan", "rename")
+
+
+class RunStats:
+    """Wall time per phase and system calls of a run, shared by worker threads
+
+    In recursive runs folders are handled in parallel, so a phase's time is
+    the sum over all worker threads and can add up to more than the run took.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        """Initialize class"""
+        self.clock = clock
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.calls: dict[str, int] = {}
+        self.files = 0
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def run(self) -> Iterator[None]:
+        """Time the whole run"""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.elapsed += self.clock() - start
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase (of one folder)"""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add_time(name, self.clock() - start)
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        """Add seconds spent in phase"""
+        with self.lock:
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    def count(self, call: str, calls: int = 1) -> None:
+        """Count system calls"""
+        if not calls:
+            return
+        with self.lock:
+            self.calls[call] = self.calls.get(call, 0) + calls
+
+    def get_rate(self) -> float:
+        """Get files gone through per second of the whole run"""
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self) -> dict[str, object]:
+        """Get stats as a JSON serializable report"""
+        return {
+            "files": self.files,
+            "seconds": self.elapsed,
+            "files_per_s": self.get_rate(),
+            "phases": dict(self.seconds),
+            "calls": dict(sorted(self.calls.items())),
+        }
+
+    def describe(self) -> str:
+        """Describe stats for users"""
+        phases = ", ".join(
+            f"{phase} {format_ms(seconds)}" for phase, seconds in self.seconds.items()
+        )
+        msg = f"{self.files:,} files in {format_ms(self.elapsed)} "
+        msg += f"({self.get_rate():,.0f} files/s): {phases}"
+        if self.calls:
+            calls = ", ".join(f"{calls:,} {call}" for call, calls in self.calls.items())
+            msg += f"; calls: {calls}"
+        return msg
+
+
+def format_ms(seconds: float) -> str:
+    """Format seconds as milliseconds"""
+    return f"{seconds * 1000:,.0f} ms"
@@ -0,0 +1,200 @@
+"""template: naming templates for numbered files
+
+A template like `{prefix}-{date:%Y%m%d}-{n:05}{ext}` is parsed once per run
+and compiled once per folder into a plain `str.format` string, with the
+per-folder fields (prefix, parent) baked in as text. Naming a file is then a
+single `format` call, only `{date}` needs to look at the file (one stat).
+Templates can also be read backwards, to find the number a file was given.
+"""
+import os
+import re
+import string
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional
+
+DEFAULT_TEMPLATE = "{prefix}_{n}{ext}"
+DEFAULT_DATE_FORMAT = "%Y%m%d"
+
+# Fields known per folder, baked into the compiled format string
+FOLDER_FIELDS = ("prefix", "parent")
+# Fields of each file, by position in the compiled format string
+FILE_FIELDS = ("n", "ext", "name", "date")
+FIELD_ALIASES = {"prepend": "prefix", "stem": "name"}
+
+# (folder, names, start, numbers) -> (name, new_name) for each name
+NameFormatter = Callable[..., Iterator[tuple[str, str]]]
+# (folder, name) -> (number the file was named with, whether with the padding
+# asked for), None if not named so
+NumberParser = Callable[[str, str], Optional[tuple[int, bool]]]
+
+
+class TemplateError(ValueError):
+    """Template can't be used to name files"""
+
+
+def escape(text: str) -> str:
+    """Escape text for use in a format string"""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def split_name(name: str) -> tuple[str, str]:
+    """Split filename into name and extension, as `os.path.splitext` does
+
+    Only filenames are split (no folders), which takes a fraction of the time.
+    """
+    dot = name.rfind(".")
+    # Leading dots don't start an extension (".bashrc", "..jpg")
+    if dot > 0 and (name[0] != "." or name[:dot].strip(".")):
+        return name[:dot], name[dot:]
+    return name, ""
+
+
+class NameTemplate:
+    """A parsed naming template
+
+    Fields: prefix (the prepend), parent (name of the file's folder), n (the
+    file's number, zero padded to the folder's file count unless given a
+    format like `{n:05}`), ext (extension, with its dot), name (filename
+    without extension) and date (modification time, `{date:%Y%m%d}` format by
+    default). Every template needs `{n}`, so new names can't clash.
+    """
+
+    def __init__(self, template: str = DEFAULT_TEMPLATE) -> None:
+        """Initialize class, raises TemplateError for unusable templates"""
+        self.template = template
+        # (literal text, field, format spec) parts, field None for trailing text
+        self.parts: list[tuple[str, Optional[str], str]] = []
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as error:
+            raise TemplateError(f"Bad template {template!r}: {error}") from None
+        for literal, field, spec, conversion in parsed:
+            if field is not None:
+                field = FIELD_ALIASES.get(field, field)
+                if field not in FOLDER_FIELDS + FILE_FIELDS:
+                    raise TemplateError(f"Unknown template field: {{{field}}}")
+                if conversion or "{" in (spec or ""):
+                    raise TemplateError(f"Unsupported format of {{{field}}}")
+            self.parts.append((literal, field, spec or ""))
+        self.fields = {field for _, field, _ in self.parts if field}
+        if "n" not in self.fields:
+            raise TemplateError("Template needs {n}, so new names are unique")
+        if any("/" in literal or os.sep in literal for literal, _, _ in self.parts):
+            raise TemplateError("Template can't contain folder separators")
+        self.needs_stat = "date" in self.fields
+        self.needs_split = bool(self.fields & {"ext", "name"})
+        self.compile("prefix", "parent", 1)  # Check formats before any run
+
+    def __repr__(self) -> str:
+        """Get representation of template"""
+        return f"NameTemplate({self.template!r})"
+
+    def get_format(self, prefix: str, parent: str, padding: int) -> str:
+        """Get format string for a folder, taking (n, ext, name, date)"""
+        values = {"prefix": prefix, "parent": parent}
+        fmt = []
+        for literal, field, spec in self.parts:
+            fmt.append(escape(literal))
+            if field in values:
+                fmt.append(escape(format(values[field], spec)))
+            elif field is not None:
+                if not spec and field == "n":
+                    spec = f"0{padding}"
+                elif not spec and field == "date":
+                    spec = DEFAULT_DATE_FORMAT
+                fmt.append(f"{{{FILE_FIELDS.index(field)}:{escape(spec)}}}")
+        return "".join(fmt)
+
+    def compile(self, prefix: str, parent: str, padding: int) -> NameFormatter:
+        """Get function naming files of a folder
+
+        Raises TemplateError if a field's format doesn't fit its value, or new
+        names would contain folder separators (from prefix or date format).
+        """
+        try:
+            fmt = self.get_format(prefix, parent, padding).format
+            sample = fmt(1, ".ext", "name", datetime(2000, 1, 1))
+        except ValueError as error:
+            raise TemplateError(f"Bad template {self.template!r}: {error}") from None
+        if "/" in sample or os.sep in sample:
+            raise TemplateError(f"Template can't make folders: {sample}")
+        needs_split = self.needs_split
+        needs_stat = self.needs_stat
+
+        def format_names(
+            folder: str,
+            names: Iterable[str],
+            start: int,
+            numbers: Optional[Iterable[int]] = None,
+        ) -> Iterator[tuple[str, str]]:
+            """Yield (name, new_name) for files of folder, numbering from start
+
+            numbers: number of each file instead, if not numbered in order
+            """
+            stem = ext = ""
+            date = None
+            numbering = (
+                enumerate(names, start) if numbers is None else zip(numbers, names)
+            )
+            for number, name in numbering:
+                if needs_split:
+                    stem, ext = split_name(name)
+                if needs_stat:
+                    mtime = os.stat(os.path.join(folder, name)).st_mtime
+                    date = datetime.fromtimestamp(mtime)
+                yield name, fmt(number, ext, stem, date)
+
+        return format_names
+
+    def compile_parser(self, prefix: str, parent: str, padding: int) -> NumberParser:
+        """Get function finding the number files of a folder were named with
+
+        Names are matched against a regex made from the template, any padding
+        of the number allowed, then named again with the number found (with
+        padding, else the name's own) to check the template really gives that
+        name (one stat only with `{date}`).
+        """
+        values = {"prefix": prefix, "parent": parent}
+        regex = []
+        number_group = r"(?P<n>\d+)"
+        for literal, field, spec in self.parts:
+            regex.append(re.escape(literal))
+            if field in values:
+                regex.append(re.escape(format(values[field], spec)))
+            elif field == "n":
+                regex.append(number_group)
+                # The same number (and format) wherever else it shows up
+                number_group = "(?P=n)"
+            elif field is not None:
+                regex.append(".*?")
+        match = re.compile("".join(regex), re.DOTALL).fullmatch
+        # Format string of each number width seen
+        formats = {padding: self.get_format(prefix, parent, padding).format}
+        needs_split = self.needs_split
+        needs_stat = self.needs_stat
+
+        def parse_number(folder: str, name: str) -> Optional[tuple[int, bool]]:
+            """Get (number, whether padded as asked) file name was named with"""
+            found = match(name)
+            if found is None:
+                return None
+            digits = found.group("n")
+            stem = ext = ""
+            date = None
+            if needs_split:
+                stem, ext = split_name(name)
+            if needs_stat:
+                mtime = os.stat(os.path.join(folder, name)).st_mtime
+                date = datetime.fromtimestamp(mtime)
+            number = int(digits)
+            if formats[padding](number, ext, stem, date) == name:
+                return number, True
+            fmt = formats.get(len(digits))
+            if fmt is None:
+                fmt = self.get_format(prefix, parent, len(digits)).format
+                formats[len(digits)] = fmt
+            if fmt(number, ext, stem, date) == name:
+                return number, False
+            return None
+
+        return parse_number
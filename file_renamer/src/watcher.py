@@ -0,0 +1,283 @@
+"""watcher: watch a folder and number files as they arrive
+
+New files are found with Linux inotify (falling back to listing the folder
+every poll elsewhere), so a busy folder is never rescanned. A file is renamed
+once it is no longer being written: right after the writer closes it (or it
+is moved in), or once its size and modification time stop changing for
+`settle_seconds`. Ready files are numbered in batches, continuing the
+folder's incremental numbering (see FolderIndex).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from typing import Callable, NamedTuple, Optional, Protocol
+
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.planner import RenameCollisionError
+from file_renamer.src.scanner import scan_files
+
+SETTLE_SECONDS = 2.0
+POLL_INTERVAL = 0.5
+WATCH_BATCH_SIZE = 1000
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (then name)
+# Files that are done: closed after writing, or moved in whole
+DONE_MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+
+
+class FileEvent(NamedTuple):
+    """A file appeared or changed in the watched folder"""
+
+    name: str
+    done: bool  # writer closed it (or it was moved in), no need to settle
+
+
+class EventSource(Protocol):
+    """Source of file events in a folder"""
+
+    overflowed: bool  # events were lost, folder needs one rescan
+
+    def read(self, timeout: float) -> list[FileEvent]:
+        """Wait up to timeout seconds for events"""
+
+    def close(self) -> None:
+        """Stop watching"""
+
+
+class InotifyEvents:
+    """File events of a folder from Linux inotify, no listing needed"""
+
+    def __init__(self, folder: str) -> None:
+        """Initialize class, start watching folder"""
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CREATE | IN_MODIFY | DONE_MASK
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Can't watch {folder}")
+        self.overflowed = False
+
+    def read(self, timeout: float) -> list[FileEvent]:
+        """Wait up to timeout seconds for events, return all queued ones"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        events: list[FileEvent] = []
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                start = offset + INOTIFY_EVENT.size
+                offset = start + length
+                name = data[start:offset].rstrip(b"\0")
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True
+                elif name:
+                    events.append(FileEvent(os.fsdecode(name), bool(mask & DONE_MASK)))
+
+    def close(self) -> None:
+        """Stop watching"""
+        os.close(self.fd)
+
+
+class PollingEvents:
+    """File events of a folder found by listing it every poll (fallback)"""
+
+    def __init__(self, folder: str) -> None:
+        """Initialize class, remembering files already in folder"""
+        self.folder = folder
+        self.seen = set(os.listdir(folder))
+        self.overflowed = False
+
+    def read(self, timeout: float) -> list[FileEvent]:
+        """Wait timeout seconds, then report files new since last poll
+
+        Arrival order within a poll is unknown, new files come sorted by name.
+        """
+        time.sleep(timeout)
+        names = set(os.listdir(self.folder))
+        new_names = names - self.seen
+        self.seen = names
+        return [FileEvent(name, done=False) for name in sorted(new_names)]
+
+    def close(self) -> None:
+        """Stop watching"""
+
+
+def get_event_source(folder: str) -> EventSource:
+    """Get inotify events for folder, or polling where not available"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyEvents(folder)
+        except (OSError, AttributeError):
+            pass
+    return PollingEvents(folder)
+
+
+class PendingFile:
+    """A new file that may still be being written"""
+
+    def __init__(self, now: float) -> None:
+        """Initialize class"""
+        self.signature: Optional[tuple[int, int]] = None  # size, mtime
+        self.changed_at = now
+        self.done = False
+
+
+class FolderWatcher:
+    """Number files arriving in a folder until stopped
+
+    The FileRenamer is switched to incremental mode: existing files are
+    numbered on start (or kept, if numbered before), new ones continue from
+    the highest number, in order of arrival.
+    """
+
+    def __init__(
+        self,
+        file_renamer: FileRenamer,
+        settle_seconds: float = SETTLE_SECONDS,
+        poll_interval: float = POLL_INTERVAL,
+        batch_size: int = WATCH_BATCH_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize class"""
+        self.file_renamer = file_renamer
+        file_renamer.incremental = True
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self.pending: dict[str, PendingFile] = {}
+        self.checked_at = clock()  # last time pending files were checked
+        self.renamed = 0
+        self.error: Optional[str] = None  # collision blocking the renames
+
+    @property
+    def folder(self) -> str:
+        """Watched folder"""
+        return str(self.file_renamer.folder_loc)
+
+    def add_events(self, events: list[FileEvent]) -> None:
+        """Track files of events until they are ready to rename"""
+        now = self.clock()
+        matcher = self.file_renamer.matcher
+        index = self.file_renamer.folder_indexes.get(self.folder)
+        numbered = index.names if index else set()
+        for name, done in events:
+            # Renamed files show up as new files too
+            if not matcher(name) or name in numbered:
+                continue
+            pending = self.pending.get(name)
+            if pending is None:
+                pending = self.pending[name] = PendingFile(now)
+            pending.done = pending.done or done
+
+    def add_folder(self) -> None:
+        """Track all matching files of folder (after lost events)"""
+        entries = scan_files(self.folder, self.file_renamer.matcher)
+        self.add_events([FileEvent(entry.name, done=False) for entry in entries])
+
+    def get_ready(self) -> list[str]:
+        """Get names of files done being written, in order of arrival
+
+        Costs one stat per pending file. Files that are gone or aren't
+        regular files are dropped.
+        """
+        now = self.clock()
+        self.checked_at = now
+        self.file_renamer.stats.count("stat", len(self.pending))
+        ready = []
+        for name, pending in list(self.pending.items()):
+            try:
+                file_stat = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                del self.pending[name]
+                continue
+            if not stat.S_ISREG(file_stat.st_mode):
+                del self.pending[name]
+                continue
+            signature = (file_stat.st_size, file_stat.st_mtime_ns)
+            if signature != pending.signature:
+                pending.signature = signature
+                pending.changed_at = now
+            if pending.done or now - pending.changed_at >= self.settle_seconds:
+                ready.append(name)
+                del self.pending[name]
+        return ready
+
+    def retry(self, names: list[str]) -> None:
+        """Track files again, ahead of later arrivals, renamed once settled"""
+        now = self.clock()
+        retried = {name: PendingFile(now) for name in names}
+        retried.update(self.pending)
+        self.pending = retried
+
+    def rename_ready(self) -> None:
+        """Rename files done being written, batch_size files at a time
+
+        After a collision, the files not renamed are retried once they settle
+        again, so the renames go on when the file in the way is moved.
+        """
+        ready = self.get_ready()
+        for start in range(0, len(ready), self.batch_size):
+            end = start + self.batch_size
+            batch = ready[start:end]
+            try:
+                renamed = self.file_renamer.rename_new_files(batch)
+            except RenameCollisionError as error:
+                self.retry(ready[start:])
+                if str(error) != self.error:  # not again on every retry
+                    self.error = str(error)
+                    self.file_renamer.message(self.error)
+                return
+            self.error = None
+            if renamed:
+                self.renamed += renamed
+                self.file_renamer.message(
+                    f"Renamed {renamed:,} new files ({self.renamed:,} while watching)!"
+                )
+
+    def watch(self, stop: Optional[threading.Event] = None) -> bool:
+        """Number existing files, then new ones until stop is set
+
+        Return False if the initial rename failed (bad input, collision).
+        """
+        stop = stop or threading.Event()
+        if self.file_renamer.check_inputs():
+            return False
+        # Watch before the first rename, so no arrival is missed
+        events = get_event_source(self.folder)
+        try:
+            if not self.file_renamer.rename_files():
+                return False
+            while not stop.is_set():
+                self.add_events(events.read(self.poll_interval))
+                if events.overflowed:
+                    events.overflowed = False
+                    self.add_folder()
+                # Check pending files once per poll, so bursts add up to batches
+                if self.clock() - self.checked_at >= self.poll_interval:
+                    self.rename_ready()
+        finally:
+            events.close()
+        return True
@@ -27,8 +27,13 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     python_requires="==3.9",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks*", "tests*"]),
     include_package_data=True,
     install_requires=["kivy==2.0.0", "pyenchant==3.2.1"],
-    entry_points={"console_scripts": ["file_renamer=file_renamer.__main__:main"]},
+    entry_points={
+        "console_scripts": [
+            "file_renamer=file_renamer.__main__:main",
+            "file_renamer_cli=file_renamer.src.cli:main",
+        ]
+    },
 )
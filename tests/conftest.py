@@ -1,12 +1,9 @@
 """conftest: pytest setup file"""
 import shutil
 from pathlib import Path
-from typing import Optional
 
 import pytest
 
-from file_renamer.src.gui import MainPage
-
 TEST_DATA_DIR = Path(__file__).parents[1].joinpath("test_data")
 TEST_FILES = sorted([path.name for path in TEST_DATA_DIR.iterdir()])
 FOLDER_LOC_MSG = "<-- Please select"
@@ -23,19 +20,6 @@ def copy_files(tmp_path: Path) -> Path:
     return test_folder
 
 
-def update_main_page(
-    main_page: MainPage,
-    prepend: str,
-    extensions: str,
-    folder_loc: Optional[str] = None,
-) -> None:
-    """Make updates to main page"""
-    main_page.prepend_filename_input.text = prepend
-    main_page.extensions_input.text = extensions
-    if folder_loc:
-        main_page.folder_loc_label.text = folder_loc
-
-
 def get_filenames(test_dir: Path) -> list[str]:
     """Get filenames from dir"""
     return sorted([path.name for path in test_dir.iterdir()])
@@ -0,0 +1,126 @@
+"""test_async_renamer: tests for src/async_renamer.py"""
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src.async_renamer import DONE, MESSAGE, PROGRESS, AsyncRenamer
+from file_renamer.src.file_renamer import NO_FILES_MESSAGE, FileRenamer
+from file_renamer.src.noclobber import NoClobberRenamer
+
+from .conftest import get_filenames
+
+
+def make_folders(folder: Path, count: int) -> list[Path]:
+    """Make count folders with a subfolder each, both with 2 jpg files"""
+    folders = []
+    for folder_num in range(count):
+        subfolder = folder.joinpath(f"folder{folder_num}", "sub")
+        subfolder.mkdir(parents=True)
+        for path in (subfolder, subfolder.parent):
+            path.joinpath("a.jpg").touch()
+            path.joinpath("b.jpg").touch()
+        folders.append(subfolder.parent)
+    return folders
+
+
+def test_rename_files_events(copy_files: Path) -> None:
+    """Test a run streams its progress and messages, then its result"""
+
+    async def collect() -> list:
+        """Rename files, collecting events"""
+        async with AsyncRenamer(interval=0.01) as renamer:
+            return [
+                event
+                async for event in renamer.rename_files(
+                    prepend="prep", extensions="jpg", folder_loc=copy_files
+                )
+            ]
+
+    events = asyncio.run(collect())
+    assert events[-1].kind == DONE and events[-1].result is True
+    assert events[-1].progress.done == 3
+    messages = [event.message for event in events if event.kind == MESSAGE]
+    assert messages == ["Done! Renamed 3 files!"]
+    assert [event.kind for event in events].count(PROGRESS) >= 1
+    assert "prep_3.jpg" in get_filenames(copy_files)
+
+
+def test_rename_files_no_files(tmp_path: Path) -> None:
+    """Test a folder without relevant files is done without errors"""
+
+    async def collect() -> list:
+        """Rename files, collecting events"""
+        async with AsyncRenamer() as renamer:
+            options = {"prepend": "prep", "extensions": "jpg", "folder_loc": tmp_path}
+            return [event async for event in renamer.rename_files(**options)]
+
+    events = asyncio.run(collect())
+    assert [event.message for event in events] == [NO_FILES_MESSAGE, ""]
+    assert events[-1].result is True
+
+
+def test_many_runs_bounded_threads(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test concurrent recursive runs make all blocking calls on a shared pool"""
+    threads: set[str] = set()
+    list_folder = FileRenamer.list_folder
+
+    def record_thread(file_renamer: FileRenamer, folder: str) -> tuple:
+        """List a folder, recording the thread it runs on"""
+        threads.add(threading.current_thread().name)
+        return list_folder(file_renamer, folder)
+
+    monkeypatch.setattr(FileRenamer, "list_folder", record_thread)
+    folders = make_folders(tmp_path, 6)
+
+    async def run_all() -> list[bool]:
+        """Run a job per folder at the same time"""
+        async with AsyncRenamer(max_workers=2) as renamer:
+            runs = [
+                renamer.run(FileRenamer(f"pre{num}", "jpg", folder, recursive=True))
+                for num, folder in enumerate(folders)
+            ]
+            return await asyncio.gather(*runs)
+
+    assert asyncio.run(run_all()) == [True] * len(folders)
+    assert len(threads) <= 2
+    assert all(name.startswith("file_renamer") for name in threads)
+    for num, folder in enumerate(folders):
+        expected = [f"pre{num}_1.jpg", f"pre{num}_2.jpg"]
+        assert get_filenames(folder) == [*expected, "sub"]
+        assert get_filenames(folder.joinpath("sub")) == expected
+
+
+def test_run_cancelled(copy_files: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test cancelling a run's task stops it between files, waiting for it"""
+    renamed_one = threading.Event()
+    messages: list[str] = []
+    file_renamer = FileRenamer("prep", "jpg", copy_files, message=messages.append)
+    rename = NoClobberRenamer.rename
+
+    def rename_until_cancelled(
+        renamer: NoClobberRenamer, name: str, new_name: str
+    ) -> None:
+        """Rename, then hold on until the run is cancelled"""
+        rename(renamer, name, new_name)
+        renamed_one.set()
+        file_renamer.control.cancelled.wait(5)
+
+    monkeypatch.setattr(NoClobberRenamer, "rename", rename_until_cancelled)
+
+    async def cancel_run() -> None:
+        """Cancel the run once a file was renamed"""
+        async with AsyncRenamer() as renamer:
+            task = asyncio.ensure_future(renamer.run(file_renamer))
+            await asyncio.get_running_loop().run_in_executor(None, renamed_one.wait, 5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(cancel_run())
+    assert messages == ["Cancelled! Files renamed so far keep their new names!"]
+    filenames = get_filenames(copy_files)
+    assert sum(name.startswith("prep_") for name in filenames) == 1
@@ -0,0 +1,59 @@
+"""test_benchmark: tests for benchmarks/benchmark.py"""
+import json
+from pathlib import Path
+
+import pytest
+
+from benchmarks.benchmark import PHASES, Case, find_regressions, main, run_case
+
+from .conftest import get_filenames
+
+
+def get_result(rate: float, peak_memory: int = 2**20) -> dict[str, object]:
+    """Get a benchmark result with the same rate for every phase"""
+    return {
+        "files": 100,
+        "seconds": {phase: 100 / rate for phase in PHASES},
+        "files_per_s": {phase: rate for phase in PHASES},
+        "peak_memory": peak_memory,
+    }
+
+
+def test_benchmark_run_case(tmp_path: Path) -> None:
+    """Test a case times every phase and cleans up its folder"""
+    result = run_case(Case("disk", 50, "mixed"), str(tmp_path), repeat=2)
+    assert result["files"] == 20  # .jpg and .JPG files
+    assert set(result["files_per_s"]) == set(PHASES)  # type: ignore
+    assert get_filenames(tmp_path) == []
+
+
+@pytest.mark.parametrize(
+    "rate, peak_memory, regressions",
+    [
+        pytest.param(900, 2**20, 0, id="within_tolerance"),
+        pytest.param(500, 2**20, len(PHASES), id="slower"),
+        pytest.param(1000, 2**22, 1, id="more_memory"),
+    ],
+)
+def test_benchmark_find_regressions(
+    rate: float, peak_memory: int, regressions: int
+) -> None:
+    """Test phases slower than the baseline are reported"""
+    results = {"case": get_result(rate, peak_memory), "new_case": get_result(1)}
+    baselines = {"case": get_result(1000)}
+    assert len(find_regressions(results, baselines, 0.25)) == regressions
+
+
+def test_benchmark_baseline(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test saving a baseline, then failing loudly against a faster one"""
+    baseline = tmp_path.joinpath("baseline.json")
+    args = ["--sizes", "20", "--mixes", "jpg", "--repeat", "1"]
+    args += ["--disk-dir", str(tmp_path), "--baseline", str(baseline)]
+    assert main([*args, "--save-baseline"]) == 0
+    baselines = json.loads(baseline.read_text())
+    assert "disk-20-jpg" in baselines
+    for result in baselines.values():
+        result["files_per_s"] = {phase: 1e12 for phase in PHASES}
+    baseline.write_text(json.dumps(baselines))
+    assert main(args) == 1
+    assert "REGRESSION disk-20-jpg scan" in capsys.readouterr().err
@@ -0,0 +1,202 @@
+"""test_cli: tests for src/cli.py"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src.cli import main
+
+from .conftest import TEST_FILES, assert_changes, get_filenames
+
+
+def test_cli_renames(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test renaming files from the command line"""
+    exit_code = main(["-p", "cool pic", "-e", "jpg,png", str(copy_files)])
+    assert exit_code == 0
+    assert_changes(
+        copy_files,
+        ["cool_pic_1.jpg", "cool_pic_4.PNG", "cool_pic_6.PNG"],
+        ["j1.jpg", "p3.PNG"],
+    )
+    assert capsys.readouterr().out == "Done! Renamed 6 files!\n"
+
+
+def test_cli_quiet(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test quiet flag suppresses status messages"""
+    assert main(["-q", "-p", "prep", "-e", "txt", str(copy_files)]) == 0
+    assert capsys.readouterr().out == ""
+    assert "prep_10.txt" in get_filenames(copy_files)
+
+
+@pytest.mark.parametrize(
+    "args, msg",
+    [
+        pytest.param(["-p", " . ", "-e", "jpg"], "Add filename prepend!", id="prep"),
+        pytest.param(["-p", "p", "-e", ""], "Add affected extensions!", id="ext"),
+    ],
+)
+def test_cli_bad_input(
+    copy_files: Path, capsys: pytest.CaptureFixture, args: list[str], msg: str
+) -> None:
+    """Test bad input returns error exit code without renaming"""
+    assert main([*args, str(copy_files)]) == 1
+    assert capsys.readouterr().err == f"{msg}\n"
+    assert get_filenames(copy_files) == TEST_FILES
+
+
+def test_cli_missing_folder(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test missing folder returns error exit code"""
+    folder = tmp_path.joinpath("missing")
+    assert main(["-p", "prep", "-e", "jpg", str(folder)]) == 1
+    assert capsys.readouterr().err == f"Folder not found: {folder}\n"
+
+
+def test_cli_imports_no_gui() -> None:
+    """Test the CLI never imports Kivy (slow, needs a display)"""
+    code = (
+        "import sys; import file_renamer.src.cli; "
+        "assert not any(m.startswith(('kivy', 'file_renamer.src.gui')) "
+        "for m in sys.modules)"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_cli_recursive(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test renaming files in subfolders from the command line"""
+    subfolder = copy_files.joinpath("sub")
+    subfolder.mkdir()
+    subfolder.joinpath("a.jpg").touch()
+    assert main(["-r", "-j", "2", "-p", "x", "-e", "jpg", str(copy_files)]) == 0
+    assert get_filenames(subfolder) == ["x_1.jpg"]
+    assert "x_3.jpg" in get_filenames(copy_files)
+    assert capsys.readouterr().out == "Done! Renamed 4 files in 2 folders!\n"
+
+
+def test_cli_journal_undo(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test undoing a journaled run from the command line"""
+    assert main(["--journal", "-p", "x", "-e", "jpg", str(copy_files)]) == 0
+    assert main(["--undo", str(copy_files)]) == 0
+    assert main(["--resume", str(copy_files)]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "Done! Renamed 3 files!",
+        "Done! Undid 3 renames!",
+        "No interrupted renames found in folder!",
+    ]
+    assert [name for name in get_filenames(copy_files) if name.endswith(".jpg")] == [
+        "j1.jpg",
+        "j2.jpg",
+        "j3.jpg",
+    ]
+
+
+def test_cli_patterns(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test renaming files picked by a filter, which must compile"""
+    assert main(["-p", "prep", "-e", "jpg,!j2.*", str(copy_files)]) == 0
+    filenames = get_filenames(copy_files)
+    assert "j2.jpg" in filenames and "prep_1.jpg" in filenames
+    with pytest.raises(SystemExit):
+        main(["-p", "prep", "-e", "re:(", str(copy_files)])
+    assert "--extensions: Bad regex '('" in capsys.readouterr().err
+
+
+def test_cli_rate_limit(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test renaming with a rate limit, which must be a positive number"""
+    assert (
+        main(["--rate-limit", "1000", "-p", "prep", "-e", "jpg", str(copy_files)]) == 0
+    )
+    assert "prep_3.jpg" in get_filenames(copy_files)
+    for rate_limit in ("0", "fast"):
+        with pytest.raises(SystemExit):
+            main(["--rate-limit", rate_limit, "-p", "p", "-e", "jpg", str(copy_files)])
+    assert (
+        "--rate-limit: must be a number of files per second" in capsys.readouterr().err
+    )
+
+
+def test_cli_requires_prepend(copy_files: Path) -> None:
+    """Test prepend and extensions are required to rename files"""
+    with pytest.raises(SystemExit):
+        main(["-e", "jpg", str(copy_files)])
+
+
+def test_cli_watch_recursive(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test watch mode refuses recursive runs, only one folder is watched"""
+    with pytest.raises(SystemExit):
+        main(["--watch", "-r", "-p", "p", "-e", "jpg", str(copy_files)])
+    assert "--watch only watches one folder" in capsys.readouterr().err
+
+
+def test_cli_dry_run(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test a dry run prints the plan to stdout and status to stderr"""
+    assert main(["-n", "-p", "x", "-e", "png", str(copy_files)]) == 0
+    captured = capsys.readouterr()
+    assert len(captured.out.splitlines()) == 3
+    assert '"new_name": "x_1.PNG"' in captured.out
+    assert captured.err == "Dry run! Would rename 3 files!\n"
+    assert get_filenames(copy_files) == TEST_FILES
+
+
+def test_cli_dry_run_csv(
+    copy_files: Path, tmp_path: Path, capsys: pytest.CaptureFixture
+) -> None:
+    """Test a dry run writes the plan to a file, format from its extension"""
+    plan = tmp_path.joinpath("plan.csv")
+    args = ["-n", "--plan-output", str(plan), "-p", "x", "-e", "jpg", str(copy_files)]
+    assert main(args) == 0
+    assert plan.read_text().splitlines()[:2] == [
+        "folder,name,new_name",
+        f"{copy_files},j1.jpg,x_1.jpg",
+    ]
+    assert capsys.readouterr().out == "Dry run! Would rename 3 files!\n"
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="needs bytes filenames")
+def test_cli_dry_run_undecodable(copy_files: Path, tmp_path: Path) -> None:
+    """Test names that aren't UTF-8 are written to the plan as their bytes"""
+    copy_files.joinpath(os.fsdecode(b"\xff.jpg")).touch()
+    plan = tmp_path.joinpath("plan.jsonl")
+    args = ["-n", "--plan-output", str(plan), "-p", "x", "-e", "jpg", str(copy_files)]
+    assert main(args) == 0
+    assert b'"name": "\xff.jpg"' in plan.read_bytes()
+    assert len(plan.read_bytes().splitlines()) == 4
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="needs bytes filenames")
+def test_cli_dry_run_undecodable_stdout(copy_files: Path) -> None:
+    """Test names that aren't UTF-8 are printed to a strict stdout as bytes"""
+    copy_files.joinpath(os.fsdecode(b"\xff.jpg")).touch()
+    args = ["-n", "-p", "x", "-e", "jpg", str(copy_files)]
+    result = subprocess.run(
+        [sys.executable, "-m", "file_renamer.src.cli", *args],
+        cwd=Path(__file__).parent.parent,
+        env={**os.environ, "PYTHONIOENCODING": "utf-8"},
+        capture_output=True,
+        check=True,
+    )
+    assert b'"name": "\xff.jpg"' in result.stdout
+    assert len(result.stdout.splitlines()) == 4
+
+
+def test_cli_report(copy_files: Path, tmp_path: Path) -> None:
+    """Test writing a JSON report of the run"""
+    report_path = tmp_path.joinpath("report.json")
+    assert (
+        main(["--report", str(report_path), "-p", "x", "-e", "jpg", str(copy_files)])
+        == 0
+    )
+    report = json.loads(report_path.read_text())
+    assert report["files"] == 3
+    assert report["calls"]["rename"] == 3
+
+
+def test_cli_report_bad_path(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test a report that can't be written is refused before renaming"""
+    report_path = copy_files.joinpath("missing", "report.json")
+    args = ["--report", str(report_path), "-p", "x", "-e", "jpg", str(copy_files)]
+    assert main(args) == 1
+    assert f"Can't write report to {report_path}:" in capsys.readouterr().err
+    assert get_filenames(copy_files) == TEST_FILES
@@ -0,0 +1,142 @@
+"""test_control: tests for src/control.py and cancelling runs"""
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src.control import RenameCancelled, RunControl
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.journal import Journal
+from file_renamer.src.noclobber import NoClobberRenamer
+from file_renamer.src.planner import is_temp_name
+
+from .conftest import get_filenames
+
+CANCELLED = "Cancelled! Files renamed so far keep their new names!"
+
+
+def cancel_on_rename(
+    monkeypatch: pytest.MonkeyPatch, control: RunControl, pause: bool = False
+) -> None:
+    """Cancel (or pause) the run while its first file is renamed"""
+    rename = NoClobberRenamer.rename
+
+    def rename_and_cancel(renamer: NoClobberRenamer, name: str, new_name: str) -> None:
+        """Rename, cancelling (or pausing) the run the first time"""
+        if pause:
+            control.pause()
+        else:
+            control.cancel()
+        monkeypatch.setattr(NoClobberRenamer, "rename", rename)
+        rename(renamer, name, new_name)
+
+    monkeypatch.setattr(NoClobberRenamer, "rename", rename_and_cancel)
+
+
+def test_run_control() -> None:
+    """Test check raises only once cancelled"""
+    control = RunControl()
+    control.check()
+    control.cancel()
+    with pytest.raises(RenameCancelled):
+        control.check()
+    with pytest.raises(ValueError):
+        RunControl(rate_limit=0)
+
+
+def test_cancel_wakes_paused() -> None:
+    """Test cancelling a paused run lets it stop"""
+    control = RunControl()
+    control.pause()
+    waiter = threading.Thread(target=control.wait)
+    waiter.start()
+    control.cancel()
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert not control.paused
+    control.pause()  # too late to pause
+    assert not control.paused
+
+
+def test_rate_limit() -> None:
+    """Test the rate limit spaces files out, without a burst to start"""
+    control = RunControl(rate_limit=100)
+    time.sleep(0.05)  # time before the first file isn't made up for
+    start = time.monotonic()
+    for _ in range(6):
+        control.wait()
+    assert time.monotonic() - start >= 0.05
+
+
+def test_pause_checkpoints(copy_files: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a paused journaled run commits its progress, then can be resumed"""
+    control = RunControl()
+    cancel_on_rename(monkeypatch, control, pause=True)
+    results: list[bool] = []
+    file_renamer = FileRenamer("prep", "jpg", copy_files, journal=True, control=control)
+    worker = threading.Thread(
+        target=lambda: results.append(file_renamer.rename_files())
+    )
+    worker.start()
+    # Only the pause commits progress before the end (batches are 1000 renames)
+    for _ in range(500):
+        journal = Journal.load(str(copy_files))
+        if journal and journal.done:
+            break
+        time.sleep(0.01)
+    assert journal and journal.done == 1 and not journal.complete
+    assert worker.is_alive()
+    control.resume()
+    worker.join(5)
+    assert results == [True]
+    journal = Journal.load(str(copy_files))
+    assert journal and journal.complete
+
+
+def test_cancel_before_run(copy_files: Path) -> None:
+    """Test a run cancelled before it starts renames nothing"""
+    before = get_filenames(copy_files)
+    control = RunControl()
+    control.cancel()
+    messages: list[str] = []
+    file_renamer = FileRenamer(
+        "prep", "jpg", copy_files, message=messages.append, control=control
+    )
+    assert file_renamer.rename_files() is False
+    assert messages == [CANCELLED]
+    assert get_filenames(copy_files) == before
+
+
+def test_cancel_between_files(
+    copy_files: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a run stops after the file being renamed when cancelled"""
+    control = RunControl()
+    cancel_on_rename(monkeypatch, control)
+    messages: list[str] = []
+    file_renamer = FileRenamer(
+        "prep", "jpg", copy_files, message=messages.append, control=control
+    )
+    assert file_renamer.rename_files() is False
+    assert messages == [CANCELLED]
+    filenames = get_filenames(copy_files)
+    assert sum(name.startswith("prep_") for name in filenames) == 1
+
+
+def test_cancel_finishes_cycle(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a cycle renamed through a temporary name isn't stopped midway"""
+    # Numbered by size, prep_1/prep_2 and prep_3/prep_4 swap names
+    for name, text in [("prep_1", "22"), ("prep_2", "1"), ("prep_3", "4444")]:
+        tmp_path.joinpath(f"{name}.jpg").write_text(text)
+    tmp_path.joinpath("prep_4.jpg").write_text("333")
+    control = RunControl()
+    cancel_on_rename(monkeypatch, control)
+    file_renamer = FileRenamer(
+        "prep", "jpg", tmp_path, sort_order="size", control=control
+    )
+    assert file_renamer.rename_files() is False
+    assert not any(map(is_temp_name, get_filenames(tmp_path)))
+    contents = [tmp_path.joinpath(f"prep_{num}.jpg").read_text() for num in range(1, 5)]
+    # The first cycle was finished, the second one never started
+    assert contents == ["1", "22", "4444", "333"]
@@ -0,0 +1,123 @@
+"""test_duplicates: tests for src/duplicates.py"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src import duplicates as duplicates_module
+from file_renamer.src.cli import main
+from file_renamer.src.duplicates import DuplicateFinder, HashCache, hash_file
+from file_renamer.src.file_renamer import FileRenamer
+
+from .conftest import get_filenames
+
+
+def make_files(folder: Path, contents: dict[str, str]) -> None:
+    """Make files with contents"""
+    for name, content in contents.items():
+        folder.joinpath(name).write_text(content)
+
+
+def test_find_duplicates(tmp_path: Path) -> None:
+    """Test only the first of identical files is kept, same sizes only hashed"""
+    make_files(
+        tmp_path,
+        {"a.jpg": "same", "b.jpg": "diff", "c.jpg": "same", "d.jpg": "longer"},
+    )
+    os.link(tmp_path.joinpath("a.jpg"), tmp_path.joinpath("e.jpg"))
+    finder = DuplicateFinder(max_workers=2)
+    try:
+        names = ["c.jpg", "a.jpg", "b.jpg", "d.jpg", "e.jpg"]
+        assert finder.find_duplicates(str(tmp_path), names) == ["a.jpg", "e.jpg"]
+    finally:
+        finder.close()
+    assert finder.hashed == 3  # d.jpg has a size of its own, e.jpg is a.jpg
+
+
+def test_hash_cache(tmp_path: Path) -> None:
+    """Test cached digests are used until the file changes"""
+    folder = tmp_path.joinpath("folder")
+    folder.mkdir()
+    make_files(folder, {"a.jpg": "same", "b.jpg": "same"})
+    cache_path = tmp_path.joinpath("cache.sqlite3")
+    for hashed in [2, 0]:
+        finder = DuplicateFinder(HashCache(cache_path))
+        assert finder.find_duplicates(str(folder), ["a.jpg", "b.jpg"]) == ["b.jpg"]
+        finder.close()
+        assert finder.hashed == hashed
+    folder.joinpath("b.jpg").write_text("diff")
+    os.utime(folder.joinpath("b.jpg"), ns=(1, 1))
+    finder = DuplicateFinder(HashCache(cache_path))
+    assert finder.find_duplicates(str(folder), ["a.jpg", "b.jpg"]) == []
+    finder.close()
+    assert finder.hashed == 1
+
+
+def test_hash_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test files are hashed in chunks"""
+    monkeypatch.setattr(duplicates_module, "HASH_CHUNK_SIZE", 3)
+    path = tmp_path.joinpath("a.jpg")
+    path.write_text("0123456789")
+    assert hash_file(str(path)) != hash_file(__file__)
+    assert len(hash_file(str(path))) == 128
+
+
+def test_rename_skips_duplicates(tmp_path: Path) -> None:
+    """Test duplicates are left out of the numbering"""
+    make_files(tmp_path, {"a.jpg": "1", "b.jpg": "1", "c.jpg": "2"})
+    messages: list[str] = []
+    finder = DuplicateFinder(HashCache(tmp_path.joinpath(".file_renamer_cache")))
+    FileRenamer(
+        "prep", "jpg", tmp_path, message=messages.append, duplicates=finder
+    ).rename_files()
+    finder.close()
+    assert messages == ["Done! Renamed 2 files (1 duplicates left alone)!"]
+    assert get_filenames(tmp_path) == [
+        ".file_renamer_cache",
+        "b.jpg",
+        "prep_1.jpg",
+        "prep_2.jpg",
+    ]
+
+
+def test_cli_skip_duplicates(tmp_path: Path) -> None:
+    """Test skipping duplicates from the command line"""
+    folder = tmp_path.joinpath("folder")
+    folder.mkdir()
+    make_files(folder, {"a.jpg": "1", "b.jpg": "1"})
+    cache = str(tmp_path.joinpath("cache.sqlite3"))
+    assert main(["-d", "--hash-cache", cache, "-p", "x", "-e", "jpg", str(folder)]) == 0
+    assert get_filenames(folder) == ["b.jpg", "x_1.jpg"]
+
+
+def test_find_duplicates_vanished(tmp_path: Path) -> None:
+    """Test files removed after listing are left out instead of failing"""
+    make_files(tmp_path, {"a.jpg": "same", "b.jpg": "same"})
+    finder = DuplicateFinder(max_workers=1)
+    try:
+        names = ["a.jpg", "gone.jpg", "b.jpg"]
+        assert finder.find_duplicates(str(tmp_path), names) == ["b.jpg"]
+    finally:
+        finder.close()
+
+
+def test_find_duplicates_unreadable(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test files that can't be hashed are left out instead of failing"""
+    make_files(tmp_path, {"a.jpg": "same", "b.jpg": "same", "c.jpg": "same"})
+    get_digests = DuplicateFinder.get_digests
+
+    def remove_then_hash(finder: DuplicateFinder, paths: dict) -> dict:
+        """Get digests, a.jpg removed since it was stat'ed"""
+        tmp_path.joinpath("a.jpg").unlink()
+        return get_digests(finder, paths)
+
+    monkeypatch.setattr(DuplicateFinder, "get_digests", remove_then_hash)
+    finder = DuplicateFinder(max_workers=1)
+    try:
+        names = ["a.jpg", "b.jpg", "c.jpg"]
+        assert finder.find_duplicates(str(tmp_path), names) == ["c.jpg"]
+    finally:
+        finder.close()
@@ -1,27 +1,15 @@
 """test_file_renamer: tests for src/file_renamer.py"""
+import errno
 from pathlib import Path
+from typing import Iterable
 
 import pytest
 
 from file_renamer.src.file_renamer import FileRenamer
-from file_renamer.src.gui import MainPage
-
-from .conftest import (
-    FOLDER_LOC_MSG,
-    TEST_FILES,
-    assert_changes,
-    get_filenames,
-    update_main_page,
-)
-
-
-@pytest.fixture
-def setup(copy_files: Path) -> tuple[MainPage, Path]:
-    """Set up the main page for use with FileRenamer"""
-    mp = MainPage()
-    mp.folder_loc_label.text = str(copy_files)
-    return mp, copy_files
+from file_renamer.src.noclobber import NoClobberRenamer
+from file_renamer.src.progress import Progress
 
+from .conftest import TEST_FILES, assert_changes, get_filenames
 
 GOOD_PARAMS = [
     pytest.param(
@@ -77,34 +65,42 @@ def test_file_renamer_success(
     extensions: str,
     expected_found: list[str],
     expected_missing: list[str],
-    setup: tuple[MainPage, Path],
+    copy_files: Path,
 ) -> None:
     """First go at tests"""
-    main_page, test_dir = setup
+    test_dir = copy_files
     assert get_filenames(test_dir) == TEST_FILES
-    update_main_page(main_page, prepend, extensions)
-    file_renamer = FileRenamer(main_page)
+    messages: list[str] = []
+    progress = Progress()
+    file_renamer = FileRenamer(
+        prepend=prepend,
+        extensions=extensions,
+        folder_loc=str(test_dir),
+        progress=progress,
+        message=messages.append,
+    )
     file_renamer.rename_files()
     assert_changes(test_dir, expected_found, expected_missing)
     if get_filenames(test_dir) == TEST_FILES:
         msg = "No files with provided file extension(s) found in folder!"
     else:
         msg = f"Done! Renamed {len(expected_found)} files!"
-    assert main_page.msg_label.text == msg
+    assert messages == [msg]
+    assert progress.total == progress.done == len(expected_found)
 
 
 BAD_INPUT_PARAMS = [
     pytest.param(
         "",
         "",
-        FOLDER_LOC_MSG,
+        "",
         "Add filename prepend! Add affected extensions! Select a folder!",
         id="all_bad",
     ),
     pytest.param(
         "prep",
         "ext",
-        FOLDER_LOC_MSG,
+        "",
         "Select a folder!",
         id="bad_folder",
     ),
@@ -130,9 +126,132 @@ def test_file_renamer_bad_input(
     copy_files: Path, prepend: str, extensions: str, folder_loc: str, msg: str
 ) -> None:
     """Test file_renamer with bad inputs"""
-    main_page = MainPage()
-    update_main_page(main_page, prepend, extensions, folder_loc)
-    file_renamer = FileRenamer(main_page)
+    messages: list[str] = []
+    file_renamer = FileRenamer(prepend, extensions, folder_loc, message=messages.append)
     file_renamer.rename_files()
     assert get_filenames(copy_files) == TEST_FILES
-    assert main_page.msg_label.text == msg
+    assert messages == [msg]
+
+
+def test_file_renamer_os_errors(
+    copy_files: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test failing to list a folder or rename a file is reported, not raised"""
+    messages: list[str] = []
+    gone = copy_files.joinpath("gone")
+    assert not FileRenamer("prep", "jpg", gone, message=messages.append).rename_files()
+    assert messages == [f"[Errno 2] No such file or directory: '{gone}'"]
+
+    def fail_rename(_renamer: NoClobberRenamer, src: str, _dst: str) -> None:
+        """Rename failing like one without permission"""
+        raise PermissionError(errno.EACCES, "Permission denied", src)
+
+    monkeypatch.setattr(NoClobberRenamer, "rename", fail_rename)
+    messages.clear()
+    file_renamer = FileRenamer("prep", "jpg", copy_files, message=messages.append)
+    assert not file_renamer.rename_files()
+    assert messages == ["[Errno 13] Permission denied: 'j1.jpg'"]
+    assert get_filenames(copy_files) == TEST_FILES
+
+
+def test_file_renamer_no_callbacks(copy_files: Path) -> None:
+    """Test the engine runs headless without any callbacks"""
+    file_renamer = FileRenamer("prep", "jpg", copy_files)
+    file_renamer.rename_files()
+    assert_changes(copy_files, ["prep_1.jpg", "prep_2.jpg", "prep_3.jpg"], ["j1.jpg"])
+
+
+def test_file_renamer_skips_folders(copy_files: Path) -> None:
+    """Test folders with matching names are not renamed"""
+    copy_files.joinpath("a_folder.jpg").mkdir()
+    file_renamer = FileRenamer("prep", "jpg", copy_files)
+    file_renamer.rename_files()
+    file_names = get_filenames(copy_files)
+    assert "a_folder.jpg" in file_names
+    assert "prep_3.jpg" in file_names
+    assert "prep_4.jpg" not in file_names
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_file_renamer_recursive(tmp_path: Path, max_workers: int) -> None:
+    """Test recursive mode numbers files of each folder on its own"""
+    folders = [tmp_path, *(tmp_path.joinpath(f"d{i}") for i in range(5))]
+    folders.append(folders[1].joinpath("nested"))
+    for count, folder in enumerate(folders, start=1):
+        folder.mkdir(exist_ok=True)
+        for i in range(count * 2):
+            folder.joinpath(f"f{i}.jpg").write_text(str(i))
+        folder.joinpath("skip.txt").touch()
+    total = sum(range(1, len(folders) + 1)) * 2
+    messages: list[str] = []
+    progress = Progress()
+    file_renamer = FileRenamer(
+        "prep",
+        "jpg",
+        tmp_path,
+        progress=progress,
+        message=messages.append,
+        recursive=True,
+        max_workers=max_workers,
+    )
+    file_renamer.rename_files()
+    for count, folder in enumerate(folders, start=1):
+        padding = len(str(count * 2))
+        expected = [f"prep_{i:0{padding}}.jpg" for i in range(1, count * 2 + 1)]
+        names = [path.name for path in folder.iterdir() if path.is_file()]
+        assert sorted(names) == sorted([*expected, "skip.txt"])
+    assert progress.total == progress.done == total
+    assert messages == [f"Done! Renamed {total} files in {len(folders)} folders!"]
+
+
+def test_file_renamer_not_recursive(copy_files: Path) -> None:
+    """Test subfolders are left alone without recursive mode"""
+    subfolder = copy_files.joinpath("sub")
+    subfolder.mkdir()
+    subfolder.joinpath("j1.jpg").touch()
+    FileRenamer("prep", "jpg", copy_files).rename_files()
+    assert get_filenames(subfolder) == ["j1.jpg"]
+    assert "prep_1.jpg" in get_filenames(copy_files)
+
+
+def make_numbered_files(folder: Path, numbers: Iterable[int], padding: int) -> None:
+    """Create files named prep_<number>.jpg"""
+    for number in numbers:
+        folder.joinpath(f"prep_{number:0{padding}}.jpg").touch()
+
+
+def test_file_renamer_stable(tmp_path: Path) -> None:
+    """Test stable renumbering only moves files numbered past the end into gaps"""
+    make_numbered_files(tmp_path, set(range(1, 21)) - {4, 9}, 2)
+    tmp_path.joinpath("prep_0003.jpg").touch()  # 3 again, with other padding
+    messages: list[str] = []
+    file_renamer = FileRenamer(
+        "prep", "jpg", tmp_path, message=messages.append, stable=True
+    )
+    assert file_renamer.rename_files()
+    assert messages == ["Done! Renamed 2 files (17 already named correctly)!"]
+    assert get_filenames(tmp_path) == [f"prep_{num:02}.jpg" for num in range(1, 20)]
+    assert file_renamer.stats.calls["rename"] == 2
+
+
+def test_file_renamer_stable_padding(tmp_path: Path) -> None:
+    """Test the padding changes (numbers kept) when the count's width does"""
+    make_numbered_files(tmp_path, range(1, 11), 2)
+    tmp_path.joinpath("prep_05.jpg").unlink()
+    assert FileRenamer("prep", "jpg", tmp_path, stable=True).rename_files()
+    assert get_filenames(tmp_path) == [f"prep_{num}.jpg" for num in range(1, 10)]
+
+
+def test_file_renamer_stable_incremental(copy_files: Path) -> None:
+    """Test stable renumbering isn't combined with incremental runs"""
+    messages: list[str] = []
+    file_renamer = FileRenamer(
+        "prep",
+        "jpg",
+        copy_files,
+        message=messages.append,
+        stable=True,
+        incremental=True,
+    )
+    assert not file_renamer.rename_files()
+    assert messages == ["Stable renumbering can't be used in incremental runs!"]
@@ -0,0 +1,85 @@
+"""test_folder_browser: tests for src/folder_browser.py"""
+import os
+from pathlib import Path
+
+import pytest
+from kivy.clock import Clock
+
+from file_renamer.src import folder_browser
+from file_renamer.src.folder_browser import FolderBrowser, list_folder
+
+
+def make_tree(folder: Path) -> None:
+    """Make subfolders, files and hidden entries in folder"""
+    for name in ["dir10", "dir2", "dir", ".hidden_dir"]:
+        folder.joinpath(name).mkdir()
+    for name in ["b.jpg", "a.jpg", ".hidden.jpg"]:
+        folder.joinpath(name).touch()
+
+
+def get_texts(rows: list) -> list[str]:
+    """Get texts of rows"""
+    return [row["text"] for row in rows]
+
+
+def test_list_folder(tmp_path: Path) -> None:
+    """Test folders are listed in natural order, files only when asked"""
+    make_tree(tmp_path)
+    rows = list_folder(str(tmp_path))
+    assert get_texts(rows) == [
+        f"..{os.sep}",
+        f"dir{os.sep}",
+        f"dir2{os.sep}",
+        f"dir10{os.sep}",
+    ]
+    assert rows[0]["path"] == str(tmp_path.parent)
+    assert rows[2] == {
+        "text": f"dir2{os.sep}",
+        "path": str(tmp_path.joinpath("dir2")),
+        "is_dir": True,
+    }
+    rows = list_folder(str(tmp_path), show_files=True)
+    assert get_texts(rows)[4:] == ["a.jpg", "b.jpg"]
+    assert not rows[4]["is_dir"]
+
+
+def wait_for_listing(browser: FolderBrowser) -> None:
+    """Wait for the background listing and show its rows"""
+    browser.loader.join()
+    Clock.tick()
+
+
+def test_folder_browser(tmp_path: Path) -> None:
+    """Test browsing lists folders in the background, newest path wins"""
+    make_tree(tmp_path)
+    browser = FolderBrowser(path=str(tmp_path.joinpath("dir2")))
+    browser.path = str(tmp_path)
+    assert get_texts(browser.data) == ["Loading..."]
+    wait_for_listing(browser)
+    assert len(browser.data) == 4
+    browser.show_files = True
+    wait_for_listing(browser)
+    assert len(browser.data) == 6
+
+
+def test_folder_browser_bad_path(tmp_path: Path) -> None:
+    """Test folders that can't be listed show why"""
+    browser = FolderBrowser(path=str(tmp_path.joinpath("missing")))
+    wait_for_listing(browser)
+    assert get_texts(browser.data)[0].startswith("Can't open folder")
+    assert browser.data[0]["path"] == ""
+
+
+def test_folder_browser_listing_error(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test unexpected listing errors are shown instead of loading forever"""
+
+    def broken_listing(_path: str, _show_files: bool) -> list:
+        """Fail like a bug in listing would"""
+        raise TypeError("broken")
+
+    monkeypatch.setattr(folder_browser, "list_folder", broken_listing)
+    browser = FolderBrowser(path=str(tmp_path))
+    wait_for_listing(browser)
+    assert get_texts(browser.data) == ["Can't list folder: TypeError('broken')"]
@@ -0,0 +1,119 @@
+"""test_index: tests for src/index.py and incremental renames"""
+from pathlib import Path
+
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.index import INDEX_NAME, FolderIndex
+
+from .conftest import get_filenames
+
+
+def rename_incremental(folder: Path, prepend: str = "prep") -> list[str]:
+    """Run an incremental rename of jpg files, return messages"""
+    messages: list[str] = []
+    FileRenamer(
+        prepend, "jpg", folder, message=messages.append, incremental=True
+    ).rename_files()
+    return messages
+
+
+def test_index_round_trip(tmp_path: Path) -> None:
+    """Test saving and loading an index"""
+    FolderIndex("prep", 3, 12, ["a.jpg", "b.jpg"]).save(str(tmp_path))
+    index = FolderIndex.load(str(tmp_path))
+    assert index is not None
+    assert (index.prepend, index.padding, index.last_number) == ("prep", 3, 12)
+    assert index.names == {"a.jpg", "b.jpg"}
+    assert get_filenames(tmp_path) == [INDEX_NAME]
+
+
+def test_index_load_bad(tmp_path: Path) -> None:
+    """Test missing or broken indexes load as None"""
+    assert FolderIndex.load(str(tmp_path)) is None
+    tmp_path.joinpath(INDEX_NAME).write_text("{not json")
+    assert FolderIndex.load(str(tmp_path)) is None
+    tmp_path.joinpath(INDEX_NAME).write_text('{"version": 1}')
+    assert FolderIndex.load(str(tmp_path)) is None
+
+
+def test_index_appends(tmp_path: Path) -> None:
+    """Test saves append added names until the file is written whole again"""
+    folder = str(tmp_path)
+    path = tmp_path.joinpath(INDEX_NAME)
+    index = FolderIndex("prep", 1, 2, ["a.jpg", "b.jpg"])
+    index.save(folder)
+    index.add(["c.jpg"])
+    index.save(folder)
+    index.save(folder)
+    assert len(path.read_text().splitlines()) == 2
+    loaded = FolderIndex.load(folder)
+    assert loaded is not None
+    assert (loaded.last_number, loaded.names) == (3, {"a.jpg", "b.jpg", "c.jpg"})
+    # Removed names, or appends outnumbering the rest, write it whole
+    loaded.keep(["a.jpg", "c.jpg"])
+    loaded.save(folder)
+    assert len(path.read_text().splitlines()) == 1
+    loaded.add(["d.jpg", "e.jpg"])
+    loaded.add(["f.jpg"])
+    loaded.give_back(["f.jpg"])
+    loaded.save(folder)
+    assert len(path.read_text().splitlines()) == 2
+    loaded.add(["g.jpg"])
+    loaded.save(folder)
+    assert len(path.read_text().splitlines()) == 1
+    reloaded = FolderIndex.load(folder)
+    assert reloaded is not None
+    assert (reloaded.last_number, len(reloaded.names)) == (6, 5)
+
+
+def test_index_load_torn(tmp_path: Path) -> None:
+    """Test an append cut short is dropped and the index written whole"""
+    folder = str(tmp_path)
+    path = tmp_path.joinpath(INDEX_NAME)
+    FolderIndex("prep", 1, 2, ["a.jpg", "b.jpg"]).save(folder)
+    with open(path, "a", encoding="utf-8") as index_file:
+        index_file.write('{"names":["c.jpg"],"last_number":3}')
+    index = FolderIndex.load(folder)
+    assert index is not None
+    assert (index.last_number, index.names) == (2, {"a.jpg", "b.jpg"})
+    index.add(["d.jpg"])
+    index.save(folder)
+    assert len(path.read_text().splitlines()) == 1
+    reloaded = FolderIndex.load(folder)
+    assert reloaded is not None
+    assert reloaded.names == {"a.jpg", "b.jpg", "d.jpg"}
+
+
+def test_incremental_appends(copy_files: Path) -> None:
+    """Test new files get the next numbers and numbered files stay put"""
+    assert rename_incremental(copy_files) == ["Done! Renamed 3 files!"]
+    index = FolderIndex.load(str(copy_files))
+    assert index is not None
+    assert index.names == {"prep_1.jpg", "prep_2.jpg", "prep_3.jpg"}
+    assert index.last_number == 3
+
+    copy_files.joinpath("z.jpg").write_text("z")
+    copy_files.joinpath("a.jpg").write_text("a")
+    assert rename_incremental(copy_files) == [
+        "Done! Renamed 2 files (3 already named correctly)!"
+    ]
+    assert copy_files.joinpath("prep_4.jpg").read_text() == "a"
+    assert copy_files.joinpath("prep_5.jpg").read_text() == "z"
+    # Padding is kept from the first run, numbers past it just get longer
+    for i in range(8):
+        copy_files.joinpath(f"new_{i}.jpg").touch()
+    rename_incremental(copy_files)
+    names = get_filenames(copy_files)
+    assert "prep_13.jpg" in names
+    assert INDEX_NAME in names
+
+
+def test_incremental_deleted_and_new_prepend(copy_files: Path) -> None:
+    """Test deleted files keep their numbers and a new prepend starts over"""
+    rename_incremental(copy_files)
+    copy_files.joinpath("prep_3.jpg").unlink()
+    copy_files.joinpath("new.jpg").touch()
+    rename_incremental(copy_files)
+    assert "prep_4.jpg" in get_filenames(copy_files)
+    assert rename_incremental(copy_files, "other") == ["Done! Renamed 3 files!"]
+    jpgs = [name for name in get_filenames(copy_files) if name.endswith(".jpg")]
+    assert jpgs == ["other_1.jpg", "other_2.jpg", "other_3.jpg"]
@@ -0,0 +1,136 @@
+"""test_jobs: tests for src/jobs.py"""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src import cli as cli_module
+from file_renamer.src.cli import main
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.jobs import JobQueue, RenameJob, read_jobs
+
+from .conftest import get_filenames
+from .test_progress import FakeClock
+
+
+def make_folders(folder: Path, count: int) -> list[RenameJob]:
+    """Make count folders with count jpg files each, return jobs for them"""
+    jobs = []
+    for folder_num in range(1, count + 1):
+        subfolder = folder.joinpath(f"folder{folder_num}")
+        subfolder.mkdir()
+        for file_num in range(folder_num):
+            subfolder.joinpath(f"f{file_num}.jpg").touch()
+        jobs.append(RenameJob(str(subfolder), f"pre{folder_num}", "jpg"))
+    return jobs
+
+
+def test_read_jobs(tmp_path: Path) -> None:
+    """Test reading jobs, extensions are the remaining columns"""
+    jobs_path = tmp_path.joinpath("jobs.csv")
+    jobs_path.write_text("# folder,prepend,extensions\n\na,cool pic,jpg,png\nb,x,txt\n")
+    assert read_jobs(jobs_path) == [
+        RenameJob("a", "cool pic", "jpg,png"),
+        RenameJob("b", "x", "txt"),
+    ]
+    jobs_path.write_text("a,missing extensions\n")
+    with pytest.raises(ValueError):
+        read_jobs(jobs_path)
+
+
+def test_job_queue(tmp_path: Path) -> None:
+    """Test every job is run with its own prepend and progress"""
+    jobs = make_folders(tmp_path, 3)
+    jobs.append(RenameJob(str(tmp_path.joinpath("missing")), "x", "jpg"))
+    messages: list[str] = []
+    queue = JobQueue(jobs, max_jobs=2, message=messages.append)
+    assert not queue.run()
+    assert get_filenames(Path(jobs[2].folder)) == [
+        "pre3_1.jpg",
+        "pre3_2.jpg",
+        "pre3_3.jpg",
+    ]
+    assert queue.results == [True, True, True, False]
+    assert [progress.done for progress in queue.job_progress] == [1, 2, 3, 0]
+    snapshot = queue.snapshot()
+    assert (snapshot.done, snapshot.total) == (6, 6)
+    assert f"{jobs[0].folder}: Done! Renamed 1 files!" in messages
+    assert messages[-1] == "Done! Ran 4 jobs (1 failed)!"
+
+
+def test_job_queue_concurrency(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test up to max_jobs jobs run at the same time"""
+    barrier = threading.Barrier(4, timeout=5)
+    rename_files = FileRenamer.rename_files
+
+    def wait_for_all(file_renamer: FileRenamer) -> bool:
+        """Only continue once all 4 jobs are running"""
+        barrier.wait()
+        return rename_files(file_renamer)
+
+    monkeypatch.setattr(FileRenamer, "rename_files", wait_for_all)
+    assert JobQueue(make_folders(tmp_path, 4), max_jobs=4).run()
+
+
+def test_cli_jobs(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test running a jobs file from the command line"""
+    jobs = make_folders(tmp_path, 2)
+    jobs_path = tmp_path.joinpath("jobs.csv")
+    jobs_path.write_text("".join(f"{job.folder},{job.prepend},jpg\n" for job in jobs))
+    assert main(["--jobs", str(jobs_path), "-J", "2"]) == 0
+    assert get_filenames(Path(jobs[1].folder)) == ["pre2_1.jpg", "pre2_2.jpg"]
+    assert capsys.readouterr().out.splitlines()[-1] == "Done! Ran 2 jobs!"
+
+
+def test_cli_jobs_ignored_options(
+    tmp_path: Path, capsys: pytest.CaptureFixture
+) -> None:
+    """Test options jobs aren't run with are refused, not silently ignored"""
+    jobs_path = tmp_path.joinpath("jobs.csv")
+    for options in (["-d"], ["--report", "r.json"], ["--copies", "2"]):
+        with pytest.raises(SystemExit):
+            main(["--jobs", str(jobs_path), *options])
+    err = capsys.readouterr().err
+    for option in ("--skip-duplicates", "--report", "--copies"):
+        assert f"--jobs can't be combined with {option}" in err
+
+
+def test_job_queue_describe_progress(tmp_path: Path) -> None:
+    """Test overall progress is described, then that of running jobs"""
+    clock = FakeClock()
+    jobs = make_folders(tmp_path, 3)
+    queue = JobQueue(jobs, clock=clock)
+    queue.job_progress[0].set_total(4)
+    queue.job_progress[0].add(2)
+    queue.job_progress[1].set_total(2)
+    queue.job_progress[1].add(2)
+    queue.results[1] = True
+    clock.time += 2
+    assert queue.describe_progress() == [
+        "Overall: 4/6 files, 2 files/s",
+        f"{jobs[0].folder}: 2/4 files, 1 files/s, ETA 0:00:02",
+    ]
+
+
+def test_cli_jobs_progress(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    """Test progress is printed while jobs run"""
+    rename_files = FileRenamer.rename_files
+
+    def slow_rename(file_renamer: FileRenamer) -> bool:
+        """Rename after a few progress intervals"""
+        time.sleep(0.2)
+        return rename_files(file_renamer)
+
+    monkeypatch.setattr(FileRenamer, "rename_files", slow_rename)
+    monkeypatch.setattr(cli_module, "PROGRESS_INTERVAL", 0.01)
+    jobs_path = tmp_path.joinpath("jobs.csv")
+    jobs = make_folders(tmp_path, 1)
+    jobs_path.write_text(f"{jobs[0].folder},x,jpg\n")
+    assert main(["--jobs", str(jobs_path)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("Overall: 0/0 files")
+    assert lines[-1] == "Done! Ran 1 jobs!"
@@ -0,0 +1,174 @@
+"""test_journal: tests for src/journal.py and resuming/undoing renames"""
+import os
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.journal import JOURNAL_NAME, Journal, JournalError
+from file_renamer.src.planner import plan_renames
+
+from .conftest import TEST_DATA_DIR, TEST_FILES, get_filenames
+
+# A chain (a -> b -> c -> new) and a cycle (x -> y -> z -> x)
+NAMES = ["a", "b", "c", "x", "y", "z"]
+RENAMES = [("a", "b"), ("b", "c"), ("c", "new"), ("x", "y"), ("y", "z"), ("z", "x")]
+
+
+def get_contents(folder: Path) -> dict[str, str]:
+    """Get name to contents mapping of files in folder, without the journal"""
+    return {
+        path.name: path.read_text()
+        for path in folder.iterdir()
+        if path.name != JOURNAL_NAME
+    }
+
+
+def interrupted_run(folder: Path, done: int, batch_size: int = 2) -> None:
+    """Start a journaled run of RENAMES, stopping after `done` renames"""
+    for name in NAMES:
+        folder.joinpath(name).write_text(name)
+    plan = plan_renames(str(folder), RENAMES)
+    journal = Journal(str(folder), batch_size=batch_size)
+    journal.start(plan.renames)
+    for name, new_name in plan.renames[:done]:
+        os.rename(folder.joinpath(name), folder.joinpath(new_name))
+        journal.record()
+    journal.close()
+
+
+@pytest.mark.parametrize("done", range(len(RENAMES) + 2))
+def test_resume(tmp_path: Path, done: int) -> None:
+    """Test resuming a run interrupted after any number of renames"""
+    interrupted_run(tmp_path, done)
+    messages: list[str] = []
+    file_renamer = FileRenamer("", "", tmp_path, message=messages.append)
+    assert file_renamer.resume_files() is True
+    assert get_contents(tmp_path) == {new: old for old, new in RENAMES}
+    journal = Journal.load(str(tmp_path))
+    assert journal is not None and journal.complete
+    assert messages[0].startswith("Done! Resumed")
+    # Nothing left to resume
+    assert file_renamer.resume_files() is True
+    assert messages[-1] == "No interrupted renames found in folder!"
+
+
+def test_resume_changed_files(tmp_path: Path) -> None:
+    """Test resuming refuses when files no longer match the journal"""
+    interrupted_run(tmp_path, 1)
+    tmp_path.joinpath("b").unlink()
+    journal = Journal.load(str(tmp_path))
+    assert journal is not None
+    with pytest.raises(JournalError):
+        journal.find_done()
+    messages: list[str] = []
+    FileRenamer("", "", tmp_path, message=messages.append).resume_files()
+    assert messages[0].startswith("Can't tell which renames were done")
+
+
+def test_journal_batches(tmp_path: Path) -> None:
+    """Test progress is only committed every batch"""
+    interrupted_run(tmp_path, 5, batch_size=2)
+    journal = Journal.load(str(tmp_path))
+    assert journal is not None
+    assert (journal.committed, journal.complete) == (4, False)
+    assert journal.find_done() == 5
+
+
+def test_journal_torn(tmp_path: Path) -> None:
+    """Test torn journals load as far as they were written"""
+    interrupted_run(tmp_path, 2, batch_size=1)
+    path = tmp_path.joinpath(JOURNAL_NAME)
+    path.write_text(path.read_text() + '{"do')
+    journal = Journal.load(str(tmp_path))
+    assert journal is not None and journal.committed == 2
+    assert journal.find_done() == 2
+    path.write_text(path.read_text().splitlines()[0] + "\n")
+    assert Journal.load(str(tmp_path)) is None
+
+
+def test_resume_half_linked(tmp_path: Path) -> None:
+    """Test resuming finishes a rename interrupted between link and unlink"""
+    interrupted_run(tmp_path, 1)
+    # The second rename (b -> c) linked c, but b wasn't unlinked yet
+    os.link(tmp_path.joinpath("b"), tmp_path.joinpath("c"))
+    journal = Journal.load(str(tmp_path))
+    assert journal is not None
+    assert journal.find_done() == 2
+    assert not tmp_path.joinpath("b").exists()
+    assert tmp_path.joinpath("c").read_text() == "b"
+
+
+def test_journaled_run_undo(copy_files: Path) -> None:
+    """Test undoing a journaled run, then undoing the undo"""
+    messages: list[str] = []
+    file_renamer = FileRenamer(
+        "prep", "txt", copy_files, message=messages.append, journal=True
+    )
+    assert file_renamer.rename_files() is True
+    renamed = get_filenames(copy_files)
+    assert "prep_10.txt" in renamed and JOURNAL_NAME in renamed
+    assert file_renamer.undo_files() is True
+    assert messages[-1] == "Done! Undid 10 renames!"
+    assert get_filenames(copy_files) == sorted([*TEST_FILES, JOURNAL_NAME])
+    for name in TEST_FILES:
+        original = TEST_DATA_DIR.joinpath(name).read_bytes()
+        assert copy_files.joinpath(name).read_bytes() == original
+    assert file_renamer.undo_files() is True
+    assert get_filenames(copy_files) == renamed
+
+
+def test_undo_interrupted(tmp_path: Path) -> None:
+    """Test undoing an interrupted run asks to resume it first"""
+    interrupted_run(tmp_path, 2)
+    messages: list[str] = []
+    assert FileRenamer("", "", tmp_path, message=messages.append).undo_files() is False
+    assert messages == ["Resume the interrupted renames before undoing them!"]
+
+
+def test_no_journal(copy_files: Path) -> None:
+    """Test nothing is journaled without the journal option"""
+    file_renamer = FileRenamer("prep", "jpg", copy_files)
+    file_renamer.rename_files()
+    assert JOURNAL_NAME not in get_filenames(copy_files)
+    messages: list[str] = []
+    file_renamer.message = messages.append
+    assert file_renamer.undo_files() is True
+    assert messages == ["No renames to undo found in folder!"]
+
+
+def test_resume_later_file_gone(tmp_path: Path) -> None:
+    """Test resuming renames nothing if a file renamed later on is gone"""
+    interrupted_run(tmp_path, 2, batch_size=1)
+    tmp_path.joinpath("y").unlink()
+    messages: list[str] = []
+    assert (
+        FileRenamer("", "", tmp_path, message=messages.append).resume_files() is False
+    )
+    assert messages == ["y is gone, files changed since the renames!"]
+    assert tmp_path.joinpath("a").exists()
+
+
+def test_undo_changed_files(copy_files: Path) -> None:
+    """Test undoing refuses when files changed, keeping the journal"""
+    FileRenamer("prep", "txt", copy_files, journal=True).rename_files()
+    copy_files.joinpath("prep_03.txt").unlink()
+    journal_text = copy_files.joinpath(JOURNAL_NAME).read_text()
+    messages: list[str] = []
+    file_renamer = FileRenamer("", "", copy_files, message=messages.append)
+    assert file_renamer.undo_files() is False
+    assert messages == [
+        "Can't undo: prep_03.txt is gone, files changed since the renames!"
+    ]
+    assert "prep_10.txt" in get_filenames(copy_files)
+    assert copy_files.joinpath(JOURNAL_NAME).read_text() == journal_text
+
+
+def test_run_without_journal_discards_journal(copy_files: Path) -> None:
+    """Test renaming without a journal removes the now stale journal"""
+    FileRenamer("prep", "txt", copy_files, journal=True).rename_files()
+    FileRenamer("other", "txt", copy_files).rename_files()
+    assert JOURNAL_NAME not in get_filenames(copy_files)
+    messages: list[str] = []
+    assert FileRenamer("", "", copy_files, message=messages.append).undo_files()
+    assert messages == ["No renames to undo found in folder!"]
@@ -1,4 +1,5 @@
 """test_main: tests for src/main.py"""
+
 from pathlib import Path
 
 import pytest
@@ -6,9 +7,11 @@ from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.uix.button import Button
 
+import file_renamer.src.gui as gui_module
+from file_renamer.src.control import RunControl
 from file_renamer.src.gui import FileRenamerApp
 
-from .conftest import FOLDER_LOC_MSG, assert_changes
+from .conftest import FOLDER_LOC_MSG, TEST_FILES, assert_changes, get_filenames
 
 setup_type = tuple[FileRenamerApp, str, str]
 
@@ -56,7 +59,9 @@ def test_rename_succeeds(setup: setup_type) -> None:
     # Test that button doesn't work while already running
     press_button(app.main_page.submit_btn)
     Clock.tick()
-    assert app.main_page.msg_label.text == "Done! Renamed 3 files!"
+    result, stats = app.main_page.msg_label.text.split("\n")
+    assert result == "Done! Renamed 3 files!"
+    assert stats.startswith("3 files in ")
     assert_changes(
         test_dir=Path(test_folder),
         expected_found=["foo_bar_1.jpg", "foo_bar_2.jpg", "foo_bar_3.jpg"],
@@ -64,6 +69,68 @@ def test_rename_succeeds(setup: setup_type) -> None:
     )
 
 
+def pause_at_start(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Make the GUI's runs start paused"""
+
+    def paused_control() -> RunControl:
+        """Get a control paused from the start"""
+        control = RunControl()
+        control.pause()
+        return control
+
+    monkeypatch.setattr(gui_module, "RunControl", paused_control)
+
+
+def test_pause_and_cancel(setup: setup_type, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test pausing and cancelling renames from the GUI"""
+    app, test_folder, _test_file = setup
+    pause_at_start(monkeypatch)
+    main_page = app.main_page
+    main_page.folder_loc_label.text = test_folder
+    main_page.prepend_filename_input.text = "prep"
+    main_page.extensions_input.text = "jpg"
+    press_button(main_page.submit_btn)
+    assert not main_page.pause_btn.disabled and not main_page.cancel_btn.disabled
+    main_page.update_progress_bar()
+    assert main_page.progress_label.text.endswith(" (paused)")
+    press_button(main_page.cancel_btn)
+    main_page.worker_thread.join(5)
+    main_page.update_progress_bar()
+    Clock.tick()
+    assert main_page.msg_label.text == (
+        "Cancelled! Files renamed so far keep their new names!"
+    )
+    assert get_filenames(Path(test_folder)) == TEST_FILES
+    assert not main_page.submit_btn.disabled
+    assert main_page.pause_btn.disabled and main_page.cancel_btn.disabled
+
+
+def test_stop_while_paused(setup: setup_type, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test closing the app stops a paused run instead of hanging"""
+    app, test_folder, _test_file = setup
+    pause_at_start(monkeypatch)
+    main_page = app.main_page
+    main_page.folder_loc_label.text = test_folder
+    main_page.prepend_filename_input.text = "prep"
+    main_page.extensions_input.text = "jpg"
+    press_button(main_page.submit_btn)
+    assert main_page.worker_thread.is_alive()
+    app.on_stop()
+    assert not main_page.worker_thread.is_alive()
+    assert get_filenames(Path(test_folder)) == TEST_FILES
+
+
+def test_pause_button(setup: setup_type) -> None:
+    """Test the pause button pauses and resumes the run"""
+    main_page = setup[0].main_page
+    press_button(main_page.pause_btn)
+    assert main_page.control.paused
+    assert main_page.pause_btn.text == "Resume"
+    press_button(main_page.pause_btn)
+    assert not main_page.control.paused
+    assert main_page.pause_btn.text == "Pause"
+
+
 def test_folder_selector(setup: setup_type) -> None:
     """Test the app folder selector page"""
     app, test_folder, test_file = setup
@@ -123,3 +190,16 @@ def test_filedrop(setup: setup_type) -> None:
     Window.dispatch("on_dropfile", test_file.encode("utf-8"))
     assert app.folder_selector_page.selected_label.text == test_folder
     assert app.folder_selector_page.folder_select.selection == [test_folder]
+
+
+def test_idle_without_polling(setup: setup_type) -> None:
+    """Test the app schedules no callbacks of its own while idle"""
+    app, _test_folder, _test_file = setup
+    pages = (app.main_page, app.folder_selector_page)
+    Clock.tick()  # Run pending one-off layout updates
+    callbacks = [event.get_callback() for event in Clock.get_events()]
+    assert not [
+        callback
+        for callback in callbacks
+        if getattr(callback, "__self__", None) in pages
+    ]
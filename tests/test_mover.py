@@ -0,0 +1,241 @@
+"""test_mover: tests for src/mover.py and moving to a destination"""
+
+import errno
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import file_renamer.src.mover as mover_module
+from file_renamer.src.cli import main
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.mover import copy_file
+from file_renamer.src.noclobber import NoClobberRenamer
+from file_renamer.src.progress import Progress
+
+from .conftest import TEST_DATA_DIR, TEST_FILES, get_filenames
+
+MOVED = ["prep_1.jpg", "prep_2.jpg", "prep_3.jpg"]
+
+
+def fail_rename(_renamer: NoClobberRenamer, src: str, dst: str) -> None:
+    """Rename failing like a rename across filesystems"""
+    raise OSError(errno.EXDEV, "Invalid cross-device link", src, None, dst)
+
+
+def check_moved(source: Path, destination: Path) -> None:
+    """Check the jpgs of source were moved to destination"""
+    assert get_filenames(destination) == MOVED
+    assert [name for name in get_filenames(source) if name.endswith(".jpg")] == []
+    j1_content = TEST_DATA_DIR.joinpath("j1.jpg").read_bytes()
+    assert destination.joinpath("prep_1.jpg").read_bytes() == j1_content
+
+
+def test_move_same_filesystem(copy_files: Path, tmp_path: Path) -> None:
+    """Test files are renamed into the destination on the same filesystem"""
+    destination = tmp_path.joinpath("out", "new")
+    messages: list[str] = []
+    progress = Progress()
+    file_renamer = FileRenamer(
+        "prep",
+        "jpg",
+        copy_files,
+        progress=progress,
+        message=messages.append,
+        destination=destination,
+    )
+    assert file_renamer.rename_files()
+    check_moved(copy_files, destination)
+    assert messages == ["Done! Moved 3 files!"]
+    assert progress.done == progress.total == 3
+    assert file_renamer.stats.calls["rename"] == 3
+    assert "copy" not in file_renamer.stats.calls
+
+
+@pytest.mark.parametrize("max_copies", [1, 4])
+def test_move_across_filesystems(
+    copy_files: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, max_copies: int
+) -> None:
+    """Test files are copied, with their times, when renaming fails with EXDEV"""
+    os.utime(copy_files.joinpath("j1.jpg"), (1_000_000, 1_000_000))
+    monkeypatch.setattr(NoClobberRenamer, "rename", fail_rename)
+    destination = tmp_path.joinpath("out")
+    file_renamer = FileRenamer(
+        "prep", "jpg", copy_files, destination=destination, max_copies=max_copies
+    )
+    assert file_renamer.rename_files()
+    check_moved(copy_files, destination)
+    assert destination.joinpath("prep_1.jpg").stat().st_mtime == 1_000_000
+    assert file_renamer.stats.calls["copy"] == 3
+
+
+def test_move_real_filesystems(copy_files: Path) -> None:
+    """Test moving to another mount (tmpfs), if there is one"""
+    if not os.path.isdir("/dev/shm"):
+        pytest.skip("no tmpfs")
+    if os.stat("/dev/shm").st_dev == copy_files.stat().st_dev:
+        pytest.skip("tmpfs on the same filesystem")
+    with tempfile.TemporaryDirectory(dir="/dev/shm") as shm_folder:
+        destination = Path(shm_folder)
+        file_renamer = FileRenamer("prep", "jpg", copy_files, destination=destination)
+        assert file_renamer.rename_files()
+        check_moved(copy_files, destination)
+        assert file_renamer.stats.calls["copy"] == 3
+
+
+def test_copy_file_fallback(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test copying through Python when the kernel can't copy the files"""
+
+    def fail_copy(_count: int) -> int:
+        """Kernel copy failing like one between unsupported filesystems"""
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(
+        mover_module, "get_kernel_copies", lambda _src, _dst: [fail_copy]
+    )
+    src = tmp_path.joinpath("a")
+    src.write_bytes(b"x" * 100_000)
+    copy_file(str(src), str(tmp_path.joinpath("b")))
+    assert tmp_path.joinpath("b").read_bytes() == src.read_bytes()
+
+
+def test_copy_file_no_overwrite(tmp_path: Path) -> None:
+    """Test copying never overwrites a file"""
+    src = tmp_path.joinpath("a")
+    dst = tmp_path.joinpath("b")
+    src.write_text("new")
+    dst.write_text("old")
+    with pytest.raises(FileExistsError):
+        copy_file(str(src), str(dst))
+    assert dst.read_text() == "old"
+
+
+def test_move_collision(copy_files: Path, tmp_path: Path) -> None:
+    """Test nothing is moved if a new name is taken in the destination"""
+    destination = tmp_path.joinpath("out")
+    destination.mkdir()
+    destination.joinpath("prep_2.jpg").touch()
+    messages: list[str] = []
+    file_renamer = FileRenamer(
+        "prep", "jpg", copy_files, message=messages.append, destination=destination
+    )
+    assert not file_renamer.rename_files()
+    assert messages == [
+        "Can't rename j2.jpg to prep_2.jpg, a different file with that name "
+        "already exists!"
+    ]
+    assert get_filenames(copy_files) == TEST_FILES
+
+
+@pytest.mark.parametrize("copied", [False, True])
+def test_move_collision_mid_run(
+    copy_files: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, copied: bool
+) -> None:
+    """Test a file showing up at a new name after planning stops the moves"""
+    destination = tmp_path.joinpath("out")
+    rename = NoClobberRenamer.rename
+    copy = mover_module.copy_file
+
+    def racing_rename(renamer: NoClobberRenamer, src: str, dst: str) -> None:
+        """Rename, another file showing up at prep_2.jpg first"""
+        if dst == "prep_2.jpg":
+            destination.joinpath(dst).touch()
+        if copied:
+            fail_rename(renamer, src, dst)
+        rename(renamer, src, dst)
+
+    def racing_copy(src: str, dst: str) -> None:
+        """Copy, another file showing up at prep_2.jpg first"""
+        if dst.endswith("prep_2.jpg"):
+            Path(dst).touch()
+        copy(src, dst)
+
+    monkeypatch.setattr(NoClobberRenamer, "rename", racing_rename)
+    monkeypatch.setattr(mover_module, "copy_file", racing_copy)
+    messages: list[str] = []
+    file_renamer = FileRenamer(
+        "prep",
+        "jpg",
+        copy_files,
+        message=messages.append,
+        destination=destination,
+        max_copies=1,
+    )
+    assert not file_renamer.rename_files()
+    assert messages == [
+        "Can't rename j2.jpg to prep_2.jpg, a different file with that name "
+        "already exists!"
+    ]
+    assert destination.joinpath("prep_2.jpg").read_bytes() == b""
+    assert copy_files.joinpath("j2.jpg").exists()
+
+
+def test_move_recursive(tmp_path: Path) -> None:
+    """Test recursive moves mirror subfolders in the destination"""
+    source = tmp_path.joinpath("in")
+    source.joinpath("sub").mkdir(parents=True)
+    for folder in (source, source.joinpath("sub")):
+        folder.joinpath("a.jpg").touch()
+    destination = tmp_path.joinpath("out")
+    file_renamer = FileRenamer(
+        "prep", "jpg", source, recursive=True, destination=destination
+    )
+    assert file_renamer.rename_files()
+    assert get_filenames(destination) == ["prep_1.jpg", "sub"]
+    assert get_filenames(destination.joinpath("sub")) == ["prep_1.jpg"]
+
+
+@pytest.mark.parametrize(
+    "destination, options, msg",
+    [
+        pytest.param(".", {}, "Destination must be another folder!", id="same"),
+        pytest.param(
+            "sub",
+            {"recursive": True},
+            "Destination can't be inside the folder in recursive mode!",
+            id="inside",
+        ),
+        pytest.param(
+            "../out",
+            {"incremental": True},
+            "Can't move to a destination in incremental or journal runs!",
+            id="incremental",
+        ),
+        pytest.param(
+            "j1.jpg/out", {}, "Can't use destination: Not a directory!", id="file"
+        ),
+    ],
+)
+def test_move_bad_destination(
+    copy_files: Path, destination: str, options: dict, msg: str
+) -> None:
+    """Test unusable destinations are refused"""
+    messages: list[str] = []
+    file_renamer = FileRenamer(
+        "prep",
+        "jpg",
+        copy_files,
+        message=messages.append,
+        destination=copy_files.joinpath(destination),
+        **options,
+    )
+    assert not file_renamer.rename_files()
+    assert messages == [msg]
+    assert get_filenames(copy_files) == TEST_FILES
+
+
+def test_cli_move_to(
+    copy_files: Path, tmp_path: Path, capsys: pytest.CaptureFixture
+) -> None:
+    """Test the CLI dry runs and moves files into a destination"""
+    destination = tmp_path.joinpath("out")
+    args = ["-p", "prep", "-e", "jpg", "--move-to", str(destination), str(copy_files)]
+    assert main([*args, "-n", "--plan-format", "csv"]) == 0
+    assert f"{copy_files},j1.jpg,{destination.joinpath('prep_1.jpg')}" in (
+        capsys.readouterr().out
+    )
+    assert not destination.exists()
+    assert main(args) == 0
+    assert capsys.readouterr().out == "Done! Moved 3 files!\n"
+    check_moved(copy_files, destination)
@@ -0,0 +1,104 @@
+"""test_noclobber: tests for src/noclobber.py"""
+
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from file_renamer.src import noclobber
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.noclobber import LINK, NO_REPLACE, PLAIN, NoClobberRenamer
+
+from .conftest import get_filenames
+
+METHODS = [NO_REPLACE, LINK, PLAIN]
+
+
+def make_renamer(
+    folder: Path, method: str, destination: Optional[Path] = None
+) -> NoClobberRenamer:
+    """Get a renamer for folder (into destination) using the given method"""
+    if method == NO_REPLACE and not noclobber.NO_REPLACE_RENAME:
+        pytest.skip("no atomic no-replace rename on this platform")
+    renamer = NoClobberRenamer(str(folder), str(destination) if destination else None)
+    if renamer.fd is None:
+        renamer.close()
+        pytest.skip("folders can't be opened on this platform")
+    renamer.method = method
+    return renamer
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_rename(tmp_path: Path, method: str) -> None:
+    """Test a file is renamed relative to the open folder"""
+    tmp_path.joinpath("a").write_text("a")
+    with make_renamer(tmp_path, method) as renamer:
+        renamer.rename("a", "b")
+    assert get_filenames(tmp_path) == ["b"]
+    assert tmp_path.joinpath("b").read_text() == "a"
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_rename_never_overwrites(tmp_path: Path, method: str) -> None:
+    """Test renaming onto an existing file raises and leaves both files be"""
+    tmp_path.joinpath("a").write_text("a")
+    tmp_path.joinpath("b").write_text("b")
+    with make_renamer(tmp_path, method) as renamer:
+        with pytest.raises(FileExistsError):
+            renamer.rename("a", "b")
+    assert tmp_path.joinpath("a").read_text() == "a"
+    assert tmp_path.joinpath("b").read_text() == "b"
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_rename_to_destination(tmp_path: Path, method: str) -> None:
+    """Test a file is renamed into another open folder"""
+    destination = tmp_path.joinpath("out")
+    destination.mkdir()
+    tmp_path.joinpath("a").write_text("a")
+    with make_renamer(tmp_path, method, destination) as renamer:
+        renamer.rename("a", "b")
+    assert get_filenames(tmp_path) == ["out"]
+    assert destination.joinpath("b").read_text() == "a"
+
+
+def test_unsupported_falls_back(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a method the filesystem doesn't support falls back to the next one"""
+
+    def fail_link(*_args: object, **_kwargs: object) -> None:
+        """Link failing like on a filesystem without hard links"""
+        raise PermissionError(1, "Operation not permitted")
+
+    monkeypatch.setattr(noclobber.os, "link", fail_link)
+    tmp_path.joinpath("a").write_text("a")
+    with make_renamer(tmp_path, LINK) as renamer:
+        renamer.rename("a", "b")
+        assert renamer.method == PLAIN
+    assert tmp_path.joinpath("b").read_text() == "a"
+
+
+def test_file_renamer_collision_at_run(
+    copy_files: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a file showing up at a new name after planning is never overwritten"""
+    rename = NoClobberRenamer.rename
+
+    def rename_after_file(renamer: NoClobberRenamer, name: str, new_name: str) -> None:
+        """Rename once another file took the new name"""
+        copy_files.joinpath(new_name).write_text("new")
+        rename(renamer, name, new_name)
+
+    monkeypatch.setattr(NoClobberRenamer, "rename", rename_after_file)
+    messages: list[str] = []
+    result = FileRenamer(
+        "prep", "jpg", copy_files, message=messages.append
+    ).rename_files()
+    assert result is False
+    assert messages == [
+        "Can't rename j1.jpg to prep_1.jpg, "
+        "a different file with that name already exists!"
+    ]
+    assert copy_files.joinpath("prep_1.jpg").read_text() == "new"
+    assert "j1.jpg" in get_filenames(copy_files)
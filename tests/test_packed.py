@@ -0,0 +1,54 @@
+"""test_packed: tests for src/packed.py"""
+import pytest
+
+from file_renamer.src import packed
+from file_renamer.src.packed import NameFilter, PackedNames, PackedRenames
+
+# Non ASCII, undecodable on POSIX (lone surrogate), empty and long names
+NAMES = ["a.jpg", "café.jpg", "\udc80.jpg", "", "x" * 300, "日本.png"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 4096])
+def test_packed_names(monkeypatch: pytest.MonkeyPatch, chunk_size: int) -> None:
+    """Test names come back the same, however they were added"""
+    monkeypatch.setattr(packed, "CHUNK_SIZE", chunk_size)
+    names = [*NAMES, *(f"IMG_{num}.jpg" for num in range(10))]
+    extended = PackedNames(names)
+    appended = PackedNames()
+    for name in names:
+        appended.append(name)
+    for packed_names in (extended, appended):
+        assert len(packed_names) == len(names)
+        assert list(packed_names) == names
+        assert [packed_names[num] for num in range(len(names))] == names
+        assert packed_names[-1] == names[-1]
+        assert packed_names[2:5] == names[2:5]
+        with pytest.raises(IndexError):
+            _ = packed_names[len(names)]
+    assert extended.data == appended.data
+    assert list(PackedNames()) == []
+
+
+def test_packed_names_size() -> None:
+    """Test packed names take their length plus 9 bytes each"""
+    names = [f"IMG_{num:06}.jpg" for num in range(1000)]
+    assert PackedNames(names).nbytes == sum(len(name) + 9 for name in names)
+
+
+def test_packed_renames() -> None:
+    """Test renames come back the same"""
+    renames = list(zip(NAMES, reversed(NAMES)))
+    packed_renames = PackedRenames(renames)
+    assert list(packed_renames) == renames
+    assert packed_renames[1] == renames[1]
+    assert packed_renames[1:] == renames[1:]
+    assert list(reversed(packed_renames)) == renames[::-1]
+
+
+def test_name_filter() -> None:
+    """Test names in the filter are always found, others seldom"""
+    names = [f"IMG_{num}.jpg" for num in range(10_000)]
+    name_filter = NameFilter(names, len(names))
+    assert all(name in name_filter for name in names)
+    others = sum(f"prep_{num}.jpg" in name_filter for num in range(10_000))
+    assert others < 1000
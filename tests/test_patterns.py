@@ -0,0 +1,109 @@
+"""test_patterns: tests for src/patterns.py"""
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.jobs import JobQueue, RenameJob
+from file_renamer.src.patterns import FileFilter, PatternError, split_patterns
+
+from .conftest import TEST_FILES, get_filenames
+
+
+@pytest.mark.parametrize(
+    "patterns, name, expected",
+    [
+        pytest.param([".jpg"], "pic.jpg", True, id="simple"),
+        pytest.param(["jpg"], "pic.jpg", True, id="without_dot"),
+        pytest.param([".jpg"], "PIC.JPG", True, id="case_insensitive"),
+        pytest.param([".jpg", ".png"], "pic.png", True, id="second_ext"),
+        pytest.param([".jpg"], "pic.jpg.bak", False, id="not_last_suffix"),
+        pytest.param([".jpg"], "picjpg", False, id="no_dot"),
+        pytest.param([".gz"], "a.tar.gz", True, id="last_of_multi_dot"),
+        pytest.param([".tar.gz"], "a.tar.gz", True, id="multi_dot"),
+        pytest.param([".tar.gz"], "a.gz", False, id="multi_dot_miss"),
+        pytest.param(["IMG_*.jpg"], "img_1.JPG", True, id="glob"),
+        pytest.param(["IMG_*.jpg"], "IMG.jpg", False, id="glob_miss"),
+        pytest.param(["ab*ba"], "aba", False, id="glob_affixes_overlap"),
+        pytest.param(["IMG_*"], "IMG_", True, id="glob_prefix"),
+        pytest.param(["*_?.jpg"], "a_1.jpg", True, id="glob_other"),
+        pytest.param(["*_?.jpg"], "a_12.jpg", False, id="glob_other_miss"),
+        pytest.param(["[ab]*.jpg"], "b1.jpg", True, id="glob_range"),
+        pytest.param([r"re:^\d+\.png$"], "12.PNG", True, id="regex"),
+        pytest.param([r"re:^\d+\.png$"], "a12.png", False, id="regex_miss"),
+        pytest.param(["jpg", "!*_thumb.jpg"], "a_thumb.jpg", False, id="exclude"),
+        pytest.param(["jpg", "!*_thumb.jpg"], "a.jpg", True, id="not_excluded"),
+    ],
+)
+def test_file_filter(patterns: list[str], name: str, expected: bool) -> None:
+    """Test matching filenames against patterns"""
+    assert FileFilter(patterns)(name) is expected
+
+
+@pytest.mark.parametrize("patterns", [["re:("], ["jpg", "!"], ["!re:tmp"], ["!*.jpg"]])
+def test_bad_patterns(patterns: list[str]) -> None:
+    """Test unusable patterns raise PatternError"""
+    with pytest.raises(PatternError):
+        FileFilter(patterns)
+
+
+def test_many_patterns() -> None:
+    """Test hundreds of patterns compile to a few lookups per filename"""
+    patterns = [f"ext{num}" for num in range(100)]
+    patterns.extend(f"IMG{num}_*.jpg" for num in range(100))
+    file_filter = FileFilter(patterns)
+    assert file_filter("a.EXT42") and file_filter("img7_x.jpg")
+    assert not file_filter("a.ext100") and not file_filter("img7_x.png")
+    assert file_filter.include
+    # One prefix length per digit count (plus extensions, no prefix)
+    assert file_filter.include.prefix_lengths == (0, 5, 6)
+    assert file_filter.include.glob is None and file_filter.include.regex is None
+
+
+@pytest.mark.parametrize(
+    "patterns, expected",
+    [
+        pytest.param(" png, .jpg,, ", ["png", ".jpg"], id="blanks"),
+        pytest.param(
+            r"re:^\d{1,3}\.png$,jpg", [r"re:^\d{1,3}\.png$", "jpg"], id="braces"
+        ),
+        pytest.param("!re:(a,b)x, png", ["!re:(a,b)x", "png"], id="parens"),
+        pytest.param("re:[,(]x,png", ["re:[,(]x", "png"], id="class"),
+        pytest.param(r"re:a\,b,png", [r"re:a\,b", "png"], id="escaped"),
+        pytest.param("re:a,b", ["re:a", "b"], id="top_level"),
+        pytest.param("jpg{1,2}", ["jpg{1", "2}"], id="not_regex"),
+    ],
+)
+def test_split_patterns(patterns: str, expected: list[str]) -> None:
+    """Test splitting patterns, only commas outside regex groups split"""
+    assert split_patterns(patterns) == expected
+
+
+def test_regex_with_commas() -> None:
+    """Test a regex with a comma in it matches as written"""
+    file_filter = FileFilter(split_patterns(r"re:^\d{1,3}\.png$"))
+    assert file_filter("12.png") and not file_filter("1234.png")
+
+
+def test_file_renamer_patterns(copy_files: Path) -> None:
+    """Test renaming the files passing a filter"""
+    FileRenamer("prep", "jpg, png, !j2.*, !re:^p3", copy_files).rename_files()
+    filenames = get_filenames(copy_files)
+    assert [name for name in filenames if name.startswith("prep_")] == [
+        "prep_1.jpg",
+        "prep_2.jpg",
+        "prep_3.PNG",
+        "prep_4.PNG",
+    ]
+    assert {"j2.jpg", "p3.PNG"} <= set(filenames)
+
+
+def test_job_bad_patterns(copy_files: Path) -> None:
+    """Test a job with an unusable pattern fails on its own"""
+    messages: list[str] = []
+    queue = JobQueue(
+        [RenameJob(str(copy_files), "prep", "re:(")], message=messages.append
+    )
+    assert not queue.run()
+    assert messages[0].startswith(f"{copy_files}: Bad regex '(': ")
+    assert get_filenames(copy_files) == TEST_FILES
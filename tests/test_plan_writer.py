@@ -0,0 +1,86 @@
+"""test_plan_writer: tests for src/plan_writer.py and dry runs"""
+import csv
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.plan_writer import PlanWriter
+
+from .conftest import TEST_FILES, get_filenames
+
+
+def test_plan_writer_jsonl() -> None:
+    """Test writing planned renames as JSON lines"""
+    output = io.StringIO()
+    writer = PlanWriter(output)
+    writer.write("/pics", "a.jpg", "prep_1.jpg")
+    writer.write("/pics", "ä.jpg", "prep_2.jpg")
+    assert writer.count == 2
+    assert output.getvalue().splitlines() == [
+        '{"folder": "/pics", "name": "a.jpg", "new_name": "prep_1.jpg"}',
+        '{"folder": "/pics", "name": "ä.jpg", "new_name": "prep_2.jpg"}',
+    ]
+
+
+def test_plan_writer_csv() -> None:
+    """Test writing planned renames as CSV with a header"""
+    output = io.StringIO()
+    writer = PlanWriter(output, "csv")
+    writer.write("/pics", "a, b.jpg", "prep_1.jpg")
+    assert list(csv.reader(io.StringIO(output.getvalue()))) == [
+        ["folder", "name", "new_name"],
+        ["/pics", "a, b.jpg", "prep_1.jpg"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "path, plan_format",
+    [("plan.CSV", "csv"), ("plan.jsonl", "jsonl"), ("-", "jsonl")],
+)
+def test_plan_writer_get_format(path: str, plan_format: str) -> None:
+    """Test guessing plan format from the output path"""
+    assert PlanWriter.get_format(path) == plan_format
+
+
+def test_plan_writer_bad_format() -> None:
+    """Test unknown plan formats are refused"""
+    with pytest.raises(ValueError):
+        PlanWriter(io.StringIO(), "xml")
+
+
+def test_dry_run(copy_files: Path) -> None:
+    """Test a dry run writes the plan without renaming anything"""
+    output = io.StringIO()
+    messages: list[str] = []
+    FileRenamer(
+        "prep",
+        "jpg",
+        copy_files,
+        message=messages.append,
+        plan_writer=PlanWriter(output),
+    ).rename_files()
+    assert messages == ["Dry run! Would rename 3 files!"]
+    assert get_filenames(copy_files) == TEST_FILES
+    plan = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [(row["name"], row["new_name"]) for row in plan] == [
+        ("j1.jpg", "prep_1.jpg"),
+        ("j2.jpg", "prep_2.jpg"),
+        ("j3.jpg", "prep_3.jpg"),
+    ]
+    assert {row["folder"] for row in plan} == {str(copy_files)}
+
+
+def test_dry_run_incremental(copy_files: Path) -> None:
+    """Test an incremental dry run only lists new files and saves no index"""
+    FileRenamer("prep", "jpg", copy_files, incremental=True).rename_files()
+    copy_files.joinpath("new.jpg").touch()
+    files = get_filenames(copy_files)
+    output = io.StringIO()
+    FileRenamer(
+        "prep", "jpg", copy_files, incremental=True, plan_writer=PlanWriter(output)
+    ).rename_files()
+    assert json.loads(output.getvalue())["new_name"] == "prep_4.jpg"
+    assert get_filenames(copy_files) == files
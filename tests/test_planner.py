@@ -0,0 +1,104 @@
+"""test_planner: tests for src/planner.py"""
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.planner import TEMP_PREFIX, RenameCollisionError, plan_renames
+
+from .conftest import TEST_DATA_DIR, get_filenames
+
+
+def make_files(folder: Path, names: list[str]) -> None:
+    """Create files in folder containing their own name"""
+    for name in names:
+        folder.joinpath(name).write_text(name)
+
+
+def run_plan(folder: Path, renames: list[tuple[str, str]]) -> int:
+    """Plan and run renames, return number of renames made"""
+    plan = plan_renames(str(folder), renames)
+    for name, new_name in plan.renames:
+        folder.joinpath(name).rename(folder.joinpath(new_name))
+    return len(plan.renames)
+
+
+def test_plan_drops_unchanged() -> None:
+    """Test renames that don't change a name are dropped"""
+    plan = plan_renames("/nonexistent", [("a", "a"), ("b", "b")])
+    assert list(plan.renames) == []
+    assert plan.skipped == 2
+    assert len(plan) == 0
+
+
+def test_plan_chain(tmp_path: Path) -> None:
+    """Test a chain of renames is ordered so nothing is overwritten"""
+    make_files(tmp_path, ["a", "b", "c"])
+    renames = [("a", "b"), ("b", "c"), ("c", "d")]
+    assert run_plan(tmp_path, renames) == 3
+    assert get_filenames(tmp_path) == ["b", "c", "d"]
+    for name, new_name in renames:
+        assert tmp_path.joinpath(new_name).read_text() == name
+
+
+@pytest.mark.parametrize("size", [2, 3, 10])
+def test_plan_cycle(tmp_path: Path, size: int) -> None:
+    """Test a cycle is broken with a single temporary rename"""
+    names = [f"f{i}" for i in range(size)]
+    make_files(tmp_path, names)
+    renames = [(name, names[(i + 1) % size]) for i, name in enumerate(names)]
+    plan = plan_renames(str(tmp_path), renames)
+    assert len(plan.renames) == size + 1
+    assert len(plan.temp_names) == 1
+    assert next(iter(plan.temp_names)).startswith(TEMP_PREFIX)
+    assert len(plan) == size
+    run_plan(tmp_path, renames)
+    assert get_filenames(tmp_path) == sorted(names)
+    for name, new_name in renames:
+        assert tmp_path.joinpath(new_name).read_text() == name
+
+
+def test_plan_collision(tmp_path: Path) -> None:
+    """Test renaming onto a file that isn't moved away raises"""
+    make_files(tmp_path, ["a", "b"])
+    with pytest.raises(RenameCollisionError, match="Can't rename a to b"):
+        plan_renames(str(tmp_path), [("a", "b")])
+
+
+def test_plan_collision_unchanged() -> None:
+    """Test renaming onto a file that keeps its name raises, without lstat"""
+    with pytest.raises(RenameCollisionError, match="Can't rename a to b"):
+        plan_renames("/nonexistent", [("b", "b"), ("a", "b")])
+
+
+def test_file_renamer_existing_name(copy_files: Path) -> None:
+    """Test a file already named like a new name is moved out of the way"""
+    make_files(copy_files, ["prep_2.jpg"])
+    FileRenamer("prep", "jpg", copy_files).rename_files()
+    for num in range(1, 4):
+        original = TEST_DATA_DIR.joinpath(f"j{num}.jpg").read_bytes()
+        assert copy_files.joinpath(f"prep_{num}.jpg").read_bytes() == original
+    assert copy_files.joinpath("prep_4.jpg").read_text() == "prep_2.jpg"
+
+
+def test_file_renamer_rerun_skips(copy_files: Path) -> None:
+    """Test re-running on a renamed folder renames nothing"""
+    FileRenamer("prep", "jpg", copy_files).rename_files()
+    messages: list[str] = []
+    FileRenamer("prep", "jpg", copy_files, message=messages.append).rename_files()
+    assert messages == ["Done! Renamed 0 files (3 already named correctly)!"]
+
+
+def test_file_renamer_collision(copy_files: Path) -> None:
+    """Test a collision with a non relevant file renames nothing"""
+    copy_files.joinpath("prep_1.jpg").mkdir()
+    messages: list[str] = []
+    result = FileRenamer(
+        "prep", "jpg", copy_files, message=messages.append
+    ).rename_files()
+    assert result is False
+    assert messages == [
+        "Can't rename j1.jpg to prep_1.jpg, "
+        "a different file with that name already exists!"
+    ]
+    assert "j1.jpg" in get_filenames(copy_files)
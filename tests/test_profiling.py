@@ -0,0 +1,85 @@
+"""test_profiling: tests for src/profiling.py"""
+import pstats
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src.cli import main
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.profiling import PROFILE_ENV, RunProfiler, get_profile_dir
+
+from .conftest import get_filenames
+
+
+def test_profile_run(copy_files: Path, tmp_path: Path) -> None:
+    """Test a profiled run writes a pstats dump and a memory report"""
+    profiler = RunProfiler(str(tmp_path.joinpath("profiles")), top=5)
+    with profiler.profile():
+        assert FileRenamer("prep", "jpg", copy_files).rename_files()
+    pstats_path, report_path = profiler.paths
+    assert pstats_path.endswith(".pstats") and report_path.endswith(".txt")
+    functions = pstats.Stats(pstats_path).stats  # type: ignore[attr-defined]
+    assert any(name == "rename_files" for _, _, name in functions)
+    report = Path(report_path).read_text(encoding="utf-8")
+    assert "Peak traced memory: " in report
+    assert "Top 5 allocations by line" in report
+    assert "Top 5 functions by cumulative time:" in report
+    assert profiler.describe() == f"Profile written to {pstats_path} and {report_path}"
+
+
+def test_profile_dir_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the profile folder is taken from the environment if not given"""
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    assert get_profile_dir() is None
+    monkeypatch.setenv(PROFILE_ENV, "/profiles")
+    assert get_profile_dir() == "/profiles"
+    assert get_profile_dir("other") == "other"
+
+
+def test_cli_profile(
+    copy_files: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+) -> None:
+    """Test --profile and the environment variable profile CLI runs"""
+    profiles = tmp_path.joinpath("profiles")
+    assert (
+        main(["--profile", str(profiles), "-p", "a", "-e", "jpg", str(copy_files)]) == 0
+    )
+    assert "Profile written to " in capsys.readouterr().out
+    assert len(get_filenames(profiles)) == 2
+    env_profiles = tmp_path.joinpath("env_profiles")
+    monkeypatch.setenv(PROFILE_ENV, str(env_profiles))
+    assert main(["-n", "-p", "b", "-e", "jpg", str(copy_files)]) == 0
+    assert [Path(name).suffix for name in get_filenames(env_profiles)] == [
+        ".pstats",
+        ".txt",
+    ]
+    # The files renamed are unaffected
+    assert "a_1.jpg" in get_filenames(copy_files)
+
+
+def test_profile_unwritable(copy_files: Path, tmp_path: Path) -> None:
+    """Test a profile that can't be written doesn't fail the run"""
+    not_a_dir = tmp_path.joinpath("file")
+    not_a_dir.touch()
+    profiler = RunProfiler(str(not_a_dir.joinpath("profiles")))
+    with pytest.raises(OSError):
+        profiler.check_folder()
+    with profiler.profile():
+        assert FileRenamer("prep", "jpg", copy_files).rename_files()
+    assert profiler.paths == []
+    assert profiler.describe().startswith("Couldn't write profile: ")
+
+
+def test_cli_profile_unwritable(
+    copy_files: Path, tmp_path: Path, capsys: pytest.CaptureFixture
+) -> None:
+    """Test the CLI checks the profile folder before renaming anything"""
+    not_a_dir = tmp_path.joinpath("file")
+    not_a_dir.touch()
+    args = ["--profile", str(not_a_dir.joinpath("x")), "-p", "a", "-e", "jpg"]
+    assert main([*args, str(copy_files)]) == 1
+    assert "Can't write profiles to " in capsys.readouterr().err
+    assert "a_1.jpg" not in get_filenames(copy_files)
@@ -0,0 +1,55 @@
+"""test_progress: tests for src/progress.py"""
+import threading
+
+from file_renamer.src.progress import Progress, format_seconds
+
+
+class FakeClock:
+    """Clock returning times set by the test"""
+
+    def __init__(self) -> None:
+        """Initialize class"""
+        self.time = 100.0
+
+    def __call__(self) -> float:
+        """Get current time"""
+        return self.time
+
+
+def test_snapshot() -> None:
+    """Test snapshots report throughput and ETA"""
+    clock = FakeClock()
+    progress = Progress(clock=clock)
+    snapshot = progress.snapshot()
+    assert (snapshot.done, snapshot.rate, snapshot.eta) == (0, 0.0, None)
+    progress.set_total(1000)
+    progress.add(200)
+    clock.time += 2
+    snapshot = progress.snapshot()
+    assert (snapshot.done, snapshot.total, snapshot.elapsed) == (200, 1000, 2)
+    assert (snapshot.rate, snapshot.eta) == (100, 8)
+    assert snapshot.describe() == "200/1,000 files, 100 files/s, ETA 0:00:08"
+
+
+def test_add_from_threads() -> None:
+    """Test updates from many worker threads are all counted"""
+    progress = Progress()
+
+    def work() -> None:
+        """Add files one by one"""
+        for _ in range(10_000):
+            progress.add()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert progress.snapshot().done == 80_000
+
+
+def test_format_seconds() -> None:
+    """Test formatting seconds as H:MM:SS"""
+    assert format_seconds(0) == "0:00:00"
+    assert format_seconds(61.4) == "0:01:01"
+    assert format_seconds(3 * 3600 + 5) == "3:00:05"
@@ -0,0 +1,23 @@
+"""test_scanner: tests for src/scanner.py"""
+from pathlib import Path
+
+from file_renamer.src.patterns import FileFilter
+from file_renamer.src.scanner import scan_files
+
+from .conftest import TEST_FILES
+
+
+def test_scan_files(copy_files: Path) -> None:
+    """Test scanning only yields matching regular files"""
+    copy_files.joinpath("folder.jpg").mkdir()
+    copy_files.joinpath("link.jpg").symlink_to(copy_files.joinpath("j1.jpg"))
+    entries = scan_files(copy_files, FileFilter(["jpg", "png"]))
+    names = sorted(entry.name for entry in entries)
+    expected = [name for name in TEST_FILES if not name.endswith(".txt")]
+    assert names == sorted([*expected, "link.jpg"])
+
+
+def test_scan_files_is_lazy(copy_files: Path) -> None:
+    """Test scanning streams entries instead of listing them up front"""
+    entries = scan_files(copy_files, FileFilter(["txt"]))
+    assert next(entries).name.endswith(".txt")
@@ -0,0 +1,87 @@
+"""test_sorting: tests for src/sorting.py and sort orders"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from file_renamer.src.cli import main
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.sorting import get_entry_key, natural_key
+
+from .conftest import get_filenames
+
+# Files modified in this order, with these sizes
+SIZES = {"IMG_10.jpg": 3, "IMG_2.jpg": 1, "IMG_1.jpg": 2}
+
+
+def test_natural_key() -> None:
+    """Test numbers in names sort by value, text case insensitively"""
+    names = ["IMG_10.jpg", "img_2.jpg", "IMG_1.jpg", "IMG_002.jpg", "a.jpg", "b1.jpg"]
+    assert sorted(names, key=natural_key) == [
+        "a.jpg",
+        "b1.jpg",
+        "IMG_1.jpg",
+        "IMG_002.jpg",
+        "img_2.jpg",
+        "IMG_10.jpg",
+    ]
+
+
+def test_natural_key_prefixes() -> None:
+    """Test names whose parts start with another name's parts sort after it"""
+    names = ["notes2", "notes", "IMG2", "IMG", "a.jpg2.jpg", "a.jpg", "b10", "b1"]
+    assert sorted(names, key=natural_key) == [
+        "a.jpg",
+        "a.jpg2.jpg",
+        "b1",
+        "b10",
+        "IMG",
+        "IMG2",
+        "notes",
+        "notes2",
+    ]
+
+
+def test_cli_natural_prefixes(tmp_path: Path) -> None:
+    """Test natural sorting of prefix related names from the command line"""
+    for name in ("IMG", "IMG2"):
+        tmp_path.joinpath(name).touch()
+    assert main(["-q", "-s", "natural", "-p", "p", "-e", "IMG*", str(tmp_path)]) == 0
+    assert get_filenames(tmp_path) == ["p_1", "p_2"]
+
+
+def test_get_entry_key_bad_order() -> None:
+    """Test unknown sort orders are refused"""
+    assert get_entry_key("name") is None
+    with pytest.raises(ValueError):
+        get_entry_key("color")
+
+
+def make_files(folder: Path, sizes: dict[str, int]) -> None:
+    """Make files of given sizes, modified in the order given"""
+    for mtime, (name, size) in enumerate(sizes.items(), start=1):
+        path = folder.joinpath(name)
+        path.write_bytes(b"x" * size)
+        os.utime(path, ns=(mtime * 10**9, mtime * 10**9))
+
+
+@pytest.mark.parametrize(
+    "sort_order, expected",
+    [
+        pytest.param("name", ["IMG_1.jpg", "IMG_10.jpg", "IMG_2.jpg"], id="name"),
+        pytest.param("natural", ["IMG_1.jpg", "IMG_2.jpg", "IMG_10.jpg"], id="natural"),
+        pytest.param("mtime", ["IMG_10.jpg", "IMG_2.jpg", "IMG_1.jpg"], id="mtime"),
+        pytest.param("size", ["IMG_2.jpg", "IMG_1.jpg", "IMG_10.jpg"], id="size"),
+    ],
+)
+def test_sort_orders(tmp_path: Path, sort_order: str, expected: list[str]) -> None:
+    """Test files are numbered in the chosen sort order"""
+    make_files(tmp_path, SIZES)
+    file_renamer = FileRenamer("prep", "jpg", tmp_path, sort_order=sort_order)
+    file_renamer.list_relevant_files()
+    assert list(file_renamer.folder_files[str(tmp_path)]) == expected
+    file_renamer.rename_files()
+    assert get_filenames(tmp_path) == ["prep_1.jpg", "prep_2.jpg", "prep_3.jpg"]
+    sizes = [tmp_path.joinpath(f"prep_{i}.jpg").stat().st_size for i in (1, 2, 3)]
+    assert sizes == [SIZES[name] for name in expected]
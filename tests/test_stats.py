@@ -0,0 +1,46 @@
+"""test_stats: tests for src/stats.py and run instrumentation"""
+from pathlib import Path
+
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.stats import PHASES, RunStats
+
+from .test_progress import FakeClock
+
+
+def test_stats_report() -> None:
+    """Test phases and the whole run are timed and calls counted"""
+    clock = FakeClock()
+    stats = RunStats(clock=clock)
+    with stats.run():
+        with stats.phase("scan"):
+            clock.time += 0.5
+        with stats.phase("rename"):
+            clock.time += 1.5
+        stats.count("rename", 400)
+        stats.count("stat", 0)
+    stats.files = 400
+    assert stats.report() == {
+        "files": 400,
+        "seconds": 2.0,
+        "files_per_s": 200.0,
+        "phases": {"scan": 0.5, "sort": 0.0, "plan": 0.0, "rename": 1.5},
+        "calls": {"rename": 400},
+    }
+    assert stats.describe() == (
+        "400 files in 2,000 ms (200 files/s): scan 500 ms, sort 0 ms, "
+        "plan 0 ms, rename 1,500 ms; calls: 400 rename"
+    )
+
+
+def test_stats_of_run(tmp_path: Path) -> None:
+    """Test a rename run records its phases and system calls"""
+    for name in ["b.jpg", "a.jpg", "prep_1.jpg", "c.txt"]:
+        tmp_path.joinpath(name).write_text(name)
+    stats = RunStats()
+    FileRenamer("prep", "jpg", tmp_path, stats=stats).rename_files()
+    report = stats.report()
+    assert report["files"] == 3
+    assert set(report["phases"]) == set(PHASES)  # type: ignore
+    assert report["seconds"] > 0  # type: ignore
+    # prep_1.jpg is moving away, only prep_2.jpg and prep_3.jpg are looked up
+    assert report["calls"] == {"rename": 3, "scandir": 1, "stat": 2}
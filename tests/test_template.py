@@ -0,0 +1,132 @@
+"""test_template: tests for src/template.py and naming templates"""
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from file_renamer.src.cli import main
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.template import NameTemplate, TemplateError, split_name
+
+from .conftest import get_filenames
+
+
+@pytest.mark.parametrize(
+    "template, expected",
+    [
+        pytest.param("{prefix}_{n}{ext}", "pic_007.jpg", id="default"),
+        pytest.param("{prepend}-{n:05}{ext}", "pic-00007.jpg", id="padded"),
+        pytest.param("{n:d}_{name}{ext}", "7_IMG 1.tar.jpg", id="name"),
+        pytest.param("{parent}_{n}{ext}", "holiday_007.jpg", id="parent"),
+        pytest.param("{{{prefix}}}{n}", "{pic}007", id="escaped_braces"),
+    ],
+)
+def test_compile(template: str, expected: str) -> None:
+    """Test templates give names without looking at files"""
+    format_names = NameTemplate(template).compile("pic", "holiday", 3)
+    name = "IMG 1.tar.jpg"
+    assert list(format_names("/missing", [name], 7)) == [(name, expected)]
+
+
+def test_compile_date(tmp_path: Path) -> None:
+    """Test {date} is the file's modification time"""
+    path = tmp_path.joinpath("a.jpg")
+    path.touch()
+    mtime = datetime(2021, 7, 4, 12).timestamp()
+    os.utime(path, (mtime, mtime))
+    template = NameTemplate("{prefix}-{date}-{date:%H}-{n:03}{ext}")
+    assert template.needs_stat
+    format_names = template.compile("pic", "", 1)
+    assert list(format_names(str(tmp_path), ["a.jpg"], 1)) == [
+        ("a.jpg", "pic-20210704-12-001.jpg")
+    ]
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        pytest.param("{prefix}{ext}", id="no_number"),
+        pytest.param("{n}{color}", id="unknown_field"),
+        pytest.param("{n!r}", id="conversion"),
+        pytest.param("{n:%Y}", id="bad_format"),
+        pytest.param("{n}/{ext}", id="folder"),
+        pytest.param("{n}{date:%Y/%m}", id="folder_in_date"),
+        pytest.param("{n", id="unclosed"),
+    ],
+)
+def test_bad_templates(template: str) -> None:
+    """Test unusable templates are refused before any run"""
+    with pytest.raises(TemplateError):
+        NameTemplate(template)
+
+
+@pytest.mark.parametrize(
+    "template, name, expected",
+    [
+        pytest.param("{prefix}_{n}{ext}", "pic_007.jpg", (7, True), id="default"),
+        pytest.param("{prefix}_{n}{ext}", "pic_7.JPG", (7, False), id="other_padding"),
+        pytest.param("{prefix}_{n}{ext}", "pic_x7.jpg", None, id="not_number"),
+        pytest.param("{prefix}_{n}{ext}", "cat_007.jpg", None, id="other_prefix"),
+        pytest.param("{prefix}-{n:05}{ext}", "pic-00012.jpg", (12, True), id="padded"),
+        pytest.param("{prefix}-{n:05}{ext}", "pic-012.jpg", None, id="bad_padding"),
+        pytest.param("{parent}_{n}_{n}", "holiday_003_003", (3, True), id="twice"),
+        pytest.param("{parent}_{n}_{n}", "holiday_003_004", None, id="twice_differ"),
+        pytest.param("{n}_{name}{ext}", "1_a.jpg", None, id="not_reproducible"),
+    ],
+)
+def test_compile_parser(
+    template: str, name: str, expected: Optional[tuple[int, bool]]
+) -> None:
+    """Test reading back the number a template named a file with"""
+    parse_number = NameTemplate(template).compile_parser("pic", "holiday", 3)
+    assert parse_number("/missing", name) == expected
+
+
+@pytest.mark.parametrize(
+    "name", ["a.jpg", ".bashrc", "..jpg", ".a.jpg", "a", "a.", "a.b.c", "..a.b", "."]
+)
+def test_split_name(name: str) -> None:
+    """Test filenames are split like os.path.splitext does"""
+    assert split_name(name) == os.path.splitext(name)
+
+
+def test_template_renames(copy_files: Path) -> None:
+    """Test files are renamed with the template"""
+    file_renamer = FileRenamer(
+        "pic", "jpg", copy_files, template="{n}-{prefix}-{parent}{ext}"
+    )
+    assert file_renamer.rename_files()
+    names = get_filenames(copy_files)
+    assert f"1-pic-{copy_files.name}.jpg" in names
+    assert not any(name.startswith("pic_") for name in names)
+
+
+def test_template_prepend_folder(copy_files: Path) -> None:
+    """Test a prepend making new names folders is reported, not renamed"""
+    messages: list[str] = []
+    before = get_filenames(copy_files)
+    file_renamer = FileRenamer("a/b", "jpg", copy_files, message=messages.append)
+    assert not file_renamer.rename_files()
+    assert "can't make folders" in messages[0]
+    assert get_filenames(copy_files) == before
+
+
+def test_template_change_restarts_index(copy_files: Path) -> None:
+    """Test incremental runs with another template renumber all files"""
+    FileRenamer("pic", "jpg", copy_files, incremental=True).rename_files()
+    file_renamer = FileRenamer(
+        "pic", "jpg", copy_files, incremental=True, template="{prefix}-{n}{ext}"
+    )
+    file_renamer.rename_files()
+    assert not any(name.startswith("pic_") for name in get_filenames(copy_files))
+
+
+def test_cli_template(copy_files: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test the CLI renames with a template and refuses bad ones"""
+    assert main([str(copy_files), "-p", "pic", "-e", "jpg", "-t", "{n}{ext}"]) == 0
+    assert "1.jpg" in get_filenames(copy_files)
+    with pytest.raises(SystemExit):
+        main([str(copy_files), "-p", "pic", "-e", "jpg", "-t", "{prefix}"])
+    assert "needs {n}" in capsys.readouterr().err
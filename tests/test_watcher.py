@@ -0,0 +1,153 @@
+"""test_watcher: tests for src/watcher.py"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+from file_renamer.src import watcher as watcher_module
+from file_renamer.src.file_renamer import FileRenamer
+from file_renamer.src.watcher import (
+    FileEvent,
+    FolderWatcher,
+    InotifyEvents,
+    PollingEvents,
+    get_event_source,
+)
+
+from .conftest import get_filenames
+from .test_progress import FakeClock
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 10) -> None:
+    """Wait until condition is true"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+LINUX_ONLY = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is Linux only"
+)
+SOURCES = [pytest.param(InotifyEvents, marks=LINUX_ONLY), PollingEvents]
+
+
+@pytest.fixture(params=SOURCES)
+def watching(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, request: pytest.FixtureRequest
+) -> Iterator[FolderWatcher]:
+    """Watch tmp_path for jpg files in a thread, numbering them with prep"""
+    monkeypatch.setattr(watcher_module, "get_event_source", request.param)
+    tmp_path.joinpath("old.jpg").touch()
+    messages: list[str] = []
+    watcher = FolderWatcher(
+        FileRenamer("prep", "jpg", tmp_path, message=messages.append),
+        settle_seconds=0.2,
+        poll_interval=0.05,
+        batch_size=50,
+    )
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.watch, args=(stop,))
+    thread.start()
+    wait_for(lambda: messages == ["Done! Renamed 1 files!"])
+    yield watcher
+    stop.set()
+    thread.join()
+
+
+def test_watch_renames_arrivals(watching: FolderWatcher) -> None:
+    """Test a burst of new files is numbered after the existing ones"""
+    folder = Path(watching.folder)
+    for i in range(200):
+        folder.joinpath(f"new_{i:03}.jpg").write_text(str(i))
+    folder.joinpath("skip.txt").touch()
+    wait_for(lambda: watching.renamed == 200)
+    names = get_filenames(folder)
+    assert "prep_1.jpg" in names and "prep_201.jpg" in names
+    assert not [name for name in names if name.startswith("new_")]
+    assert "skip.txt" in names
+    # Numbered in order of arrival
+    assert folder.joinpath("prep_2.jpg").read_text() == "0"
+
+
+def test_watch_waits_for_writer(watching: FolderWatcher) -> None:
+    """Test a file still open for writing isn't renamed"""
+    path = Path(watching.folder).joinpath("slow.jpg")
+    with open(path, "w") as slow_file:
+        for _ in range(5):
+            slow_file.write("x")
+            slow_file.flush()
+            time.sleep(0.1)
+            assert path.exists()
+    wait_for(lambda: watching.renamed == 1)
+    assert Path(watching.folder).joinpath("prep_2.jpg").read_text() == "xxxxx"
+
+
+def test_get_ready_settles(tmp_path: Path) -> None:
+    """Test files not seen closed are ready once unchanged for settle_seconds"""
+    clock = FakeClock()
+    renamer = FileRenamer("prep", "jpg", tmp_path)
+    watcher = FolderWatcher(renamer, settle_seconds=2, clock=clock)
+    tmp_path.joinpath("a.jpg").touch()
+    tmp_path.joinpath("dir.jpg").mkdir()
+    events = ["a.jpg", "dir.jpg", "gone.jpg", "a.txt"]
+    watcher.add_events([FileEvent(name, done=False) for name in events])
+    assert list(watcher.pending) == ["a.jpg", "dir.jpg", "gone.jpg"]
+    assert watcher.get_ready() == []
+    assert list(watcher.pending) == ["a.jpg"]
+    clock.time += 2
+    assert watcher.get_ready() == ["a.jpg"]
+    watcher.add_events([FileEvent("b.jpg", done=True)])
+    tmp_path.joinpath("b.jpg").touch()
+    assert watcher.get_ready() == ["b.jpg"]
+
+
+def test_rename_ready_retries(tmp_path: Path) -> None:
+    """Test files hitting a collision are renamed once it is out of the way"""
+    clock = FakeClock()
+    messages: list[str] = []
+    renamer = FileRenamer("prep", "jpg", tmp_path, message=messages.append)
+    watcher = FolderWatcher(renamer, settle_seconds=2, clock=clock)
+    tmp_path.joinpath("old.jpg").touch()
+    assert renamer.rename_files()
+    tmp_path.joinpath("prep_2.jpg").mkdir()
+    tmp_path.joinpath("new.jpg").touch()
+    watcher.add_events([FileEvent("new.jpg", done=True)])
+    for _ in range(3):
+        watcher.rename_ready()
+        clock.time += 2
+    assert messages[1:] == [
+        "Can't rename new.jpg to prep_2.jpg, a different file with that name "
+        "already exists!"
+    ]
+    assert list(watcher.pending) == ["new.jpg"]
+    tmp_path.joinpath("prep_2.jpg").rmdir()
+    for _ in range(2):
+        watcher.rename_ready()
+        clock.time += 2
+    assert watcher.renamed == 1
+    assert get_filenames(tmp_path)[1:] == ["prep_1.jpg", "prep_2.jpg"]
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_event_sources(tmp_path: Path, source: Callable) -> None:
+    """Test event sources report new files"""
+    tmp_path.joinpath("old.jpg").touch()
+    events = source(str(tmp_path))
+    try:
+        tmp_path.joinpath("new.jpg").write_text("x")
+        names = {event.name for event in events.read(1)}
+    finally:
+        events.close()
+    assert names == {"new.jpg"}
+
+
+def test_get_event_source(tmp_path: Path) -> None:
+    """Test inotify is used where available"""
+    events = get_event_source(str(tmp_path))
+    events.close()
+    assert isinstance(events, (InotifyEvents, PollingEvents))
@@ -0,0 +1,6 @@
+#!/usr/bin/env bash
+
+set -euo pipefail
+cd "$(dirname "$0")/.." || return
+
+python -m benchmarks.benchmark "$@"